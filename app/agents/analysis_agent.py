@@ -1,10 +1,18 @@
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.prompts import PromptTemplate
+from typing import Optional
+from langchain_core.language_models import BaseChatModel
 from app.models import ExtractedCVData, AnalysisResult, CVReviewState, ProcessingStatus
-from app.utils.llm_config import get_chat_model
+from app.utils.llm_config import get_stage_chat_model
+from app.utils.cache import prompt_fingerprint
+from app.utils.stage_cache import StageMemo, canonical_json
+from app.utils.streaming import astream_with_partials
+from app.utils.prompt_caching import cached_chat_prompt
+from app.utils.structured_output import output_tool, structured_output_chain
+from app.utils.usage import UsageCallbackHandler
+from app.utils.metrics import record_fallback
+from app.utils.prompt_payload import CV_DATA_KEY_LEGEND, compact_cv_payload, log_prompt_tokens
 
-ANALYSIS_PROMPT = PromptTemplate(
-    template="""You are an expert CV analyst and career consultant. Analyze the CV data and provide comprehensive insights.
+ANALYSIS_PROMPT = cached_chat_prompt(
+    instructions="""You are an expert CV analyst and career consultant. Analyze the CV data and provide comprehensive insights.
 
 Analyze the following aspects:
 1. Overall CV strength and market competitiveness
@@ -25,42 +33,76 @@ Provide a detailed analysis with:
 - Estimated years of experience
 - Suggested seniority level
 
-CV Data:
-{cv_data}
-
-{format_instructions}""",
-    input_variables=["cv_data"],
-    partial_variables={"format_instructions": "{format_instructions}"}
+""" + CV_DATA_KEY_LEGEND,
+    data_template="""CV Data:
+{cv_data}"""
 )
 
+ANALYSIS_TOOL = output_tool("record_analysis", "Record the analysis of the CV.", AnalysisResult)
+
 
 class AnalysisAgent:
-    def __init__(self):
-        self.llm = get_chat_model()
-        self.parser = JsonOutputParser(pydantic_object=AnalysisResult)
-        self.prompt = ANALYSIS_PROMPT.partial(format_instructions=self.parser.get_format_instructions())
-        self.chain = self.prompt | self.llm | self.parser
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_stage_chat_model("analysis")
+        self.prompt = ANALYSIS_PROMPT
+        self.tool = ANALYSIS_TOOL
+        self.chain = structured_output_chain(self.prompt, self.llm, self.tool, [UsageCallbackHandler("analysis")])
+        self.fingerprint = prompt_fingerprint(self.prompt, AnalysisResult, self.llm, self.tool)
+        self.memo = StageMemo("analysis", self.fingerprint, AnalysisResult)
     
+    def _cache_key(self, extracted_data: ExtractedCVData) -> str:
+        return self.memo.key(canonical_json(extracted_data))
+
+    def _inputs(self, extracted_data: ExtractedCVData) -> dict:
+        inputs = {"cv_data": compact_cv_payload(extracted_data)}
+        log_prompt_tokens("analysis", self.prompt, inputs)
+        return inputs
+
+    def _fallback(self) -> AnalysisResult:
+        # Fallback: create basic analysis
+        return AnalysisResult(
+            overall_score=50.0,
+            strengths=["Analysis could not be completed"],
+            weaknesses=["Analysis could not be completed"],
+            experience_analysis={},
+            skills_analysis={},
+            education_analysis={},
+            market_alignment={}
+        )
+
     def analyze_data(self, extracted_data: ExtractedCVData) -> AnalysisResult:
-        """Analyze extracted CV data and provide insights using JsonOutputParser."""
+        """Analyze extracted CV data and provide insights."""
+        
+        key = self._cache_key(extracted_data)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self.chain.invoke(self._inputs(extracted_data))
+            
+            return self.memo.set(key, result)
+            
+        except Exception as e:
+            record_fallback("analysis", e)
+            return self._fallback()
+
+    async def aanalyze_data(self, extracted_data: ExtractedCVData) -> AnalysisResult:
+        """Analyze extracted CV data without blocking the event loop."""
         
+        key = self._cache_key(extracted_data)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            data_json = extracted_data.model_dump_json()
-            result = self.chain.invoke({"cv_data": data_json})
+            result = await astream_with_partials(self.chain, self._inputs(extracted_data))
             
-            return result
+            return self.memo.set(key, result)
             
         except Exception as e:
-            # Fallback: create basic analysis
-            return AnalysisResult(
-                overall_score=50.0,
-                strengths=["Analysis could not be completed"],
-                weaknesses=["Analysis could not be completed"],
-                experience_analysis={},
-                skills_analysis={},
-                education_analysis={},
-                market_alignment={}
-            )
+            record_fallback("analysis", e)
+            return self._fallback()
     
     def process(self, state: CVReviewState) -> CVReviewState:
         """Process the CV review state and analyze data."""
@@ -76,4 +118,20 @@ class AnalysisAgent:
         except Exception as e:
             state.errors.append(f"Analysis failed: {str(e)}")
             state.processing_status = "analysis_failed"
-            return state 
\ No newline at end of file
+            return state
+
+    async def aprocess(self, state: CVReviewState) -> CVReviewState:
+        """Process the CV review state and analyze data asynchronously."""
+        try:
+            if not state.extracted_data:
+                state.errors.append("No extracted data to analyze")
+                return state
+
+            analysis_results = await self.aanalyze_data(state.extracted_data)
+            state.analysis_results = analysis_results
+            return state
+            
+        except Exception as e:
+            state.errors.append(f"Analysis failed: {str(e)}")
+            state.processing_status = "analysis_failed"
+            return state
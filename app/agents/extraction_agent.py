@@ -1,11 +1,21 @@
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.prompts import PromptTemplate
-from app.models import ExtractedCVData, CVReviewState, ProcessingStatus
-from app.utils.llm_config import get_chat_model
+import os
+from typing import List, Optional
+from langchain_core.language_models import BaseChatModel
+from app.models import ExtractedCVData, Experience, Skill, SkillLevel, CVReviewState, ProcessingStatus
+from app.utils.llm_config import get_stage_chat_model
+from app.utils.cache import hash_key, prompt_fingerprint
+from app.utils.stage_cache import StageMemo, normalize_cv_text
+from app.utils.streaming import astream_with_partials
+from app.utils.prompt_caching import cached_chat_prompt
+from app.utils.structured_output import output_tool, structured_output_chain
+from app.utils.usage import UsageCallbackHandler
+from app.utils.metrics import record_escalation, record_fallback
+from app.utils.prompt_payload import log_prompt_tokens
+from app.utils.cv_preprocessor import PreExtractedCV, pre_extract, split_into_chunks
 
 
-EXTRACTION_PROMPT = PromptTemplate(
-    template="""You are an expert CV parser. Extract structured information from the CV text and return it as a JSON object.
+EXTRACTION_PROMPT = cached_chat_prompt(
+    instructions="""You are an expert CV parser. Extract structured information from the CV text and record it with the record_cv_data tool.
 
 Extract the following information:
 - name: Full name of the person
@@ -21,41 +31,297 @@ Extract the following information:
 
 For dates, use format "YYYY-MM" or "YYYY" if only year is available.
 For skill levels, use: beginner, intermediate, advanced, or expert.
+Contact details may already have been read and left out of the text; return null for any field the text doesn't contain.""",
+    data_template="""CV Text:
+{cv_text}"""
+)
 
-CV Text:
-{cv_text}
-
-{format_instructions}""",
-    input_variables=["cv_text"],
-    partial_variables={"format_instructions": "{format_instructions}"}
+# The raw text is filled in from the CV, not generated
+EXTRACTION_TOOL = output_tool(
+    "record_cv_data", "Record the structured information extracted from the CV.", ExtractedCVData, exclude=("raw_text",)
 )
 
+# CVs longer than this are extracted in section-aligned chunks run concurrently
+CHUNKED_EXTRACTION_MIN_CHARS = int(os.getenv("CV_CHUNKED_EXTRACTION_MIN_CHARS", "12000"))
+EXTRACTION_CHUNK_CHARS = int(os.getenv("CV_EXTRACTION_CHUNK_CHARS", "6000"))
+EXTRACTION_CHUNK_CONCURRENCY = int(os.getenv("CV_EXTRACTION_CHUNK_CONCURRENCY", "4"))
+# Try a fast model first and redo the extraction with the main model only if its result is invalid
+EXTRACTION_TIERED = os.getenv("CV_EXTRACTION_TIERED", "true").lower() in ("1", "true", "yes")
+
+SKILL_LEVEL_ORDER = [SkillLevel.BEGINNER, SkillLevel.INTERMEDIATE, SkillLevel.ADVANCED, SkillLevel.EXPERT]
+
+
+def _normalized(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _merge_experience(existing: Experience, other: Experience) -> Experience:
+    achievements = existing.achievements + [a for a in other.achievements if a not in existing.achievements]
+    return existing.model_copy(update={
+        "start_date": existing.start_date or other.start_date,
+        "end_date": existing.end_date or other.end_date,
+        "description": max((existing.description or "", other.description or ""), key=len) or None,
+        "achievements": achievements,
+    })
+
+
+def _merge_skill(existing: Skill, other: Skill) -> Skill:
+    levels = [level for level in (existing.level, other.level) if level is not None]
+    years = [y for y in (existing.years_experience, other.years_experience) if y is not None]
+    return existing.model_copy(update={
+        "level": max(levels, key=SKILL_LEVEL_ORDER.index) if levels else None,
+        "years_experience": max(years) if years else None,
+    })
+
+
+def merge_extracted_data(parts: List[ExtractedCVData], raw_text: str = "") -> ExtractedCVData:
+    """Merge partial extractions of one CV, de-duplicating repeated entries.
+
+    Scalar fields take the first non-empty value. Experiences are matched on
+    company, position and start date; education on institution and degree;
+    skills, certifications and languages on their case-insensitive name.
+    """
+    merged = {"raw_text": raw_text}
+    for field in ("name", "email", "phone", "location", "summary"):
+        merged[field] = next((getattr(part, field) for part in parts if getattr(part, field)), None)
+
+    experiences = {}
+    education = {}
+    skills = {}
+    certifications = {}
+    languages = {}
+    for part in parts:
+        for experience in part.experience:
+            key = (_normalized(experience.company), _normalized(experience.position), _normalized(experience.start_date))
+            experiences[key] = _merge_experience(experiences[key], experience) if key in experiences else experience
+        for entry in part.education:
+            key = (_normalized(entry.institution), _normalized(entry.degree))
+            education.setdefault(key, entry)
+        for skill in part.skills:
+            key = _normalized(skill.name)
+            skills[key] = _merge_skill(skills[key], skill) if key in skills else skill
+        for certification in part.certifications:
+            certifications.setdefault(_normalized(certification), certification)
+        for language in part.languages:
+            languages.setdefault(_normalized(language), language)
+
+    return ExtractedCVData(
+        **merged,
+        experience=list(experiences.values()),
+        education=list(education.values()),
+        skills=list(skills.values()),
+        certifications=list(certifications.values()),
+        languages=list(languages.values()),
+    )
+
+
+def _require_content(data: ExtractedCVData) -> ExtractedCVData:
+    if not data.model_dump(exclude={"raw_text"}, exclude_defaults=True):
+        raise ValueError("Extraction returned no CV content")
+    return data
+
+
+def validate_extraction(result, require_content: bool = True) -> ExtractedCVData:
+    """Validate a raw model output, rejecting errors and outputs that extracted nothing.
+
+    A chunk of a CV may hold nothing to extract (only publications or
+    references, say), so chunks are validated without `require_content`.
+    """
+    if isinstance(result, Exception):
+        raise result
+    if not isinstance(result, dict):
+        raise ValueError(f"Expected a JSON object, got {type(result).__name__}")
+    data = ExtractedCVData.model_validate({**result, "raw_text": ""})
+    return _require_content(data) if require_content else data
+
+
+def _is_valid(result, require_content: bool = True) -> bool:
+    try:
+        validate_extraction(result, require_content)
+        return True
+    except Exception:
+        return False
+
+
+def _merge_chunk_results(results: list) -> dict:
+    """Validate per-chunk outputs and merge them.
+
+    Any failed chunk fails the whole extraction: a merge of the rest would
+    silently miss part of the CV and be cached as a complete result.
+    """
+    failed = sum(not _is_valid(result, require_content=False) for result in results)
+    if failed:
+        raise ValueError(f"{failed} of {len(results)} extraction chunks failed")
+    parts = [validate_extraction(result, require_content=False) for result in results]
+    return _require_content(merge_extracted_data(parts)).model_dump(exclude={"raw_text"})
+
 
 class ExtractionAgent:
-    def __init__(self):
-        self.llm = get_chat_model()
-        self.parser = JsonOutputParser(pydantic_object=ExtractedCVData)
-        self.prompt = EXTRACTION_PROMPT.partial(format_instructions=self.parser.get_format_instructions())
-        self.chain = self.prompt | self.llm | self.parser
+    def __init__(self, llm: Optional[BaseChatModel] = None, fast_llm: Optional[BaseChatModel] = None):
+        """`fast_llm` enables tiered extraction; without explicit models it follows CV_EXTRACTION_TIERED."""
+        if llm is None and fast_llm is None and EXTRACTION_TIERED:
+            fast_llm = get_stage_chat_model("extraction_fast")
+        self.llm = llm or get_stage_chat_model("extraction")
+        self.fast_llm = fast_llm
+        self.prompt = EXTRACTION_PROMPT
+        self.tool = EXTRACTION_TOOL
+        callbacks = [UsageCallbackHandler("extraction")]
+        self.chain = structured_output_chain(self.prompt, self.llm, self.tool, callbacks)
+        self.fast_chain = structured_output_chain(self.prompt, self.fast_llm, self.tool, callbacks) if fast_llm else None
+        self.fingerprint = prompt_fingerprint(self.prompt, ExtractedCVData, self.llm, self.tool)
+        if self.fast_llm is not None:
+            self.fingerprint = hash_key(self.fingerprint, getattr(self.fast_llm, "model", None) or type(self.fast_llm).__name__)
+        self.memo = StageMemo("extraction", self.fingerprint, ExtractedCVData)
     
+    def _cached(self, cv_text: str):
+        """Return the memo key and any cached extraction for this text."""
+        key = self.memo.key(normalize_cv_text(cv_text))
+        cached = self.memo.get(key)
+        if cached is not None:
+            cached = cached.model_copy(update={"raw_text": cv_text})
+        return key, cached
+
+    def _inputs(self, cv_text: str, pre_extracted: PreExtractedCV) -> dict:
+        # Only send the sections the model has to structure, when we could find them
+        inputs = {"cv_text": pre_extracted.llm_text() or cv_text}
+        log_prompt_tokens("extraction", self.prompt, inputs)
+        return inputs
+
+    def _chunk_inputs(self, cv_text: str, pre_extracted: PreExtractedCV) -> Optional[List[dict]]:
+        """Inputs for a chunked extraction, or None if the CV is short enough for one call."""
+        if len(cv_text) < CHUNKED_EXTRACTION_MIN_CHARS:
+            return None
+        chunks = split_into_chunks(pre_extracted, cv_text, EXTRACTION_CHUNK_CHARS)
+        if len(chunks) < 2:
+            return None
+        inputs = [{"cv_text": chunk} for chunk in chunks]
+        for chunk_inputs in inputs:
+            log_prompt_tokens("extraction", self.prompt, chunk_inputs)
+        return inputs
+
+    def _invoke(self, inputs: dict) -> dict:
+        if self.fast_chain is not None:
+            try:
+                result = self.fast_chain.invoke(inputs)
+                validate_extraction(result)
+                return result
+            except Exception as e:
+                record_escalation("extraction", e)
+        return self.chain.invoke(inputs)
+
+    async def _ainvoke(self, inputs: dict) -> dict:
+        if self.fast_chain is not None:
+            try:
+                result = await astream_with_partials(self.fast_chain, inputs)
+                validate_extraction(result)
+                return result
+            except Exception as e:
+                record_escalation("extraction", e)
+        return await astream_with_partials(self.chain, inputs)
+
+    def _batch(self, chunk_inputs: List[dict]) -> list:
+        """Extract chunks concurrently, redoing only the chunks the fast model got wrong."""
+        config = {"max_concurrency": EXTRACTION_CHUNK_CONCURRENCY}
+        if self.fast_chain is None:
+            return self.chain.batch(chunk_inputs, config=config, return_exceptions=True)
+        results = self.fast_chain.batch(chunk_inputs, config=config, return_exceptions=True)
+        failed = [i for i, result in enumerate(results) if not _is_valid(result, require_content=False)]
+        if failed:
+            record_escalation("extraction", ValueError(f"{len(failed)} of {len(results)} chunks failed validation"))
+            redone = self.chain.batch([chunk_inputs[i] for i in failed], config=config, return_exceptions=True)
+            for i, result in zip(failed, redone):
+                results[i] = result
+        return results
+
+    async def _abatch(self, chunk_inputs: List[dict]) -> list:
+        config = {"max_concurrency": EXTRACTION_CHUNK_CONCURRENCY}
+        if self.fast_chain is None:
+            return await self.chain.abatch(chunk_inputs, config=config, return_exceptions=True)
+        results = await self.fast_chain.abatch(chunk_inputs, config=config, return_exceptions=True)
+        failed = [i for i, result in enumerate(results) if not _is_valid(result, require_content=False)]
+        if failed:
+            record_escalation("extraction", ValueError(f"{len(failed)} of {len(results)} chunks failed validation"))
+            redone = await self.chain.abatch([chunk_inputs[i] for i in failed], config=config, return_exceptions=True)
+            for i, result in zip(failed, redone):
+                results[i] = result
+        return results
+
+    def _store(self, key: str, result: dict, cv_text: str, pre_extracted: PreExtractedCV) -> ExtractedCVData:
+        # Locally read contact details only fill in what the model left empty
+        result = dict(result)
+        for field in ("name", "email", "phone", "location"):
+            if not result.get(field) and getattr(pre_extracted, field):
+                result[field] = getattr(pre_extracted, field)
+        # The raw text is not cached, so the same CV in another format shares the entry
+        self.memo.set(key, {**result, "raw_text": ""})
+        return ExtractedCVData.model_validate({**result, "raw_text": cv_text})
+
+    def _fallback(self, cv_text: str) -> ExtractedCVData:
+        return ExtractedCVData(
+            raw_text=cv_text,
+            name="Could not extract",
+            experience=[],
+            education=[],
+            skills=[]
+        )
+
     def extract_data(self, cv_text: str) -> ExtractedCVData:
-        """Extract structured data from CV text using JsonOutputParser."""
+        """Extract structured data from CV text."""
         
+        key, cached = self._cached(cv_text)
+        if cached is not None:
+            return cached
+
         try:
-            result = self.chain.invoke({"cv_text": cv_text})
-            result.raw_text = cv_text
+            pre_extracted = pre_extract(cv_text)
+            chunk_inputs = self._chunk_inputs(cv_text, pre_extracted)
+            if chunk_inputs:
+                result = _merge_chunk_results(self._batch(chunk_inputs))
+            else:
+                result = self._invoke(self._inputs(cv_text, pre_extracted))
+            return self._store(key, result, cv_text, pre_extracted)
+            
+        except Exception as e:
+            record_fallback("extraction", e)
+            return self._fallback(cv_text)
 
-            return result
+    async def aextract_data(self, cv_text: str) -> ExtractedCVData:
+        """Extract structured data from CV text without blocking the event loop."""
+        
+        key, cached = self._cached(cv_text)
+        if cached is not None:
+            return cached
+
+        try:
+            pre_extracted = pre_extract(cv_text)
+            chunk_inputs = self._chunk_inputs(cv_text, pre_extracted)
+            if chunk_inputs:
+                # Chunks finish in the time of the slowest one; partial output isn't streamed
+                result = _merge_chunk_results(await self._abatch(chunk_inputs))
+            else:
+                result = await self._ainvoke(self._inputs(cv_text, pre_extracted))
+            return self._store(key, result, cv_text, pre_extracted)
             
         except Exception as e:
-            return ExtractedCVData(
-                raw_text=cv_text,
-                name="Could not extract",
-                experience=[],
-                education=[],
-                skills=[]
-            )
-    
+            record_fallback("extraction", e)
+            return self._fallback(cv_text)
+
+    async def aextract_sections(self, sections_text: str) -> ExtractedCVData:
+        """Extract a few labelled CV sections, e.g. the ones a revision changed.
+
+        Unlike aextract_data there is no fallback: a failed extraction raises,
+        so the caller can review the whole CV instead.
+        """
+        key, cached = self._cached(sections_text)
+        if cached is not None:
+            return cached
+        inputs = {"cv_text": sections_text}
+        log_prompt_tokens("extraction", self.prompt, inputs)
+        result = await self._ainvoke(inputs)
+        data = validate_extraction(result)
+        self.memo.set(key, {**result, "raw_text": ""})
+        return data.model_copy(update={"raw_text": sections_text})
+
     def process(self, state: CVReviewState) -> CVReviewState:
         """Process the CV review state and extract data."""
         try:
@@ -71,4 +337,20 @@ class ExtractionAgent:
         except Exception as e:
             state.errors.append(f"Extraction failed: {str(e)}")
             state.processing_status = "extraction_failed"
-            return state 
\ No newline at end of file
+            return state
+
+    async def aprocess(self, state: CVReviewState) -> CVReviewState:
+        """Process the CV review state and extract data asynchronously."""
+        try:
+            if not state.file_content:
+                state.errors.append("No file content to extract")
+                return state
+
+            extracted_data = await self.aextract_data(state.file_content)
+            state.extracted_data = extracted_data
+            return state
+            
+        except Exception as e:
+            state.errors.append(f"Extraction failed: {str(e)}")
+            state.processing_status = "extraction_failed"
+            return state
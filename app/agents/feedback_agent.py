@@ -1,11 +1,19 @@
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.prompts import PromptTemplate
+from typing import Optional
+from langchain_core.language_models import BaseChatModel
 from app.models import ExtractedCVData, AnalysisResult, Feedback, CVReviewState, ProcessingStatus
-from app.utils.llm_config import get_chat_model
+from app.utils.llm_config import get_stage_chat_model
+from app.utils.cache import prompt_fingerprint
+from app.utils.stage_cache import StageMemo, canonical_json
+from app.utils.streaming import astream_with_partials
+from app.utils.prompt_caching import cached_chat_prompt
+from app.utils.structured_output import output_tool, structured_output_chain
+from app.utils.usage import UsageCallbackHandler
+from app.utils.metrics import record_fallback
+from app.utils.prompt_payload import CV_DATA_KEY_LEGEND, compact_cv_payload, compact_json, log_prompt_tokens
 
 
-FEEDBACK_PROMPT = PromptTemplate(
-    template="""You are an expert career coach and CV reviewer. Generate constructive, actionable feedback based on the CV data and analysis.
+FEEDBACK_PROMPT = cached_chat_prompt(
+    instructions="""You are an expert career coach and CV reviewer. Generate constructive, actionable feedback based on the CV data and analysis.
 
 Provide feedback in the following areas:
 1. General feedback: Overall impression and key observations
@@ -23,48 +31,81 @@ Guidelines:
 - Focus on improvement opportunities
 - Consider market trends and best practices
 
-CV Data:
+""" + CV_DATA_KEY_LEGEND,
+    data_template="""CV Data:
 {cv_data}
 
 Analysis Results:
-{analysis_data}
-
-{format_instructions}""",
-    input_variables=["cv_data", "analysis_data"],
-    partial_variables={"format_instructions": "{format_instructions}"}
+{analysis_data}"""
 )
 
+FEEDBACK_TOOL = output_tool("record_feedback", "Record the feedback on the CV.", Feedback)
+
 
 class FeedbackAgent:
-    def __init__(self):
-        self.llm = get_chat_model()
-        self.parser = JsonOutputParser(pydantic_object=Feedback)
-        self.prompt = FEEDBACK_PROMPT.partial(format_instructions=self.parser.get_format_instructions())
-        self.chain = self.prompt | self.llm | self.parser
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_stage_chat_model("feedback")
+        self.prompt = FEEDBACK_PROMPT
+        self.tool = FEEDBACK_TOOL
+        self.chain = structured_output_chain(self.prompt, self.llm, self.tool, [UsageCallbackHandler("feedback")])
+        self.fingerprint = prompt_fingerprint(self.prompt, Feedback, self.llm, self.tool)
+        self.memo = StageMemo("feedback", self.fingerprint, Feedback)
     
+    def _cache_key(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult) -> str:
+        return self.memo.key(canonical_json(extracted_data), canonical_json(analysis_results))
+
+    def _inputs(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult) -> dict:
+        inputs = {
+            "cv_data": compact_cv_payload(extracted_data),
+            "analysis_data": compact_json(analysis_results)
+        }
+        log_prompt_tokens("feedback", self.prompt, inputs)
+        return inputs
+
+    def _fallback(self) -> Feedback:
+        return Feedback(
+            general_feedback="Feedback generation could not be completed due to technical issues.",
+            experience_feedback="Unable to provide specific experience feedback.",
+            skills_feedback="Unable to provide specific skills feedback.",
+            education_feedback="Unable to provide specific education feedback.",
+            presentation_feedback="Unable to provide specific presentation feedback.",
+            specific_improvements=["Please review the CV manually for improvements"],
+            positive_aspects=["CV contains valuable information"]
+        )
+
     def generate_feedback(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult) -> Feedback:
-        """Generate constructive feedback based on CV data and analysis using JsonOutputParser."""
+        """Generate constructive feedback based on CV data and analysis."""
+        
+        key = self._cache_key(extracted_data, analysis_results)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self.chain.invoke(self._inputs(extracted_data, analysis_results))
+            
+            return self.memo.set(key, result)
+            
+        except Exception as e:
+            record_fallback("feedback", e)
+            return self._fallback()
+
+    async def agenerate_feedback(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult) -> Feedback:
+        """Generate feedback without blocking the event loop."""
         
+        key = self._cache_key(extracted_data, analysis_results)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            data_json = extracted_data.model_dump_json()
-            analysis_json = analysis_results.model_dump_json()
-            result = self.chain.invoke({
-                "cv_data": data_json,
-                "analysis_data": analysis_json
-            })
+            result = await astream_with_partials(self.chain, self._inputs(extracted_data, analysis_results))
             
-            return result
+            return self.memo.set(key, result)
             
         except Exception as e:
-            return Feedback(
-                general_feedback="Feedback generation could not be completed due to technical issues.",
-                experience_feedback="Unable to provide specific experience feedback.",
-                skills_feedback="Unable to provide specific skills feedback.",
-                education_feedback="Unable to provide specific education feedback.",
-                presentation_feedback="Unable to provide specific presentation feedback.",
-                specific_improvements=["Please review the CV manually for improvements"],
-                positive_aspects=["CV contains valuable information"]
-            )
+            record_fallback("feedback", e)
+            return self._fallback()
     
     def process(self, state: CVReviewState) -> CVReviewState:
         """Process the CV review state and generate feedback."""
@@ -80,4 +121,20 @@ class FeedbackAgent:
         except Exception as e:
             state.errors.append(f"Feedback generation failed: {str(e)}")
             state.processing_status = "feedback_failed"
-            return state 
\ No newline at end of file
+            return state
+
+    async def aprocess(self, state: CVReviewState) -> CVReviewState:
+        """Process the CV review state and generate feedback asynchronously."""
+        try:
+            if not state.extracted_data or not state.analysis_results:
+                state.errors.append("Missing extracted data or analysis results for feedback")
+                return state
+
+            feedback = await self.agenerate_feedback(state.extracted_data, state.analysis_results)
+            state.feedback = feedback
+            return state
+            
+        except Exception as e:
+            state.errors.append(f"Feedback generation failed: {str(e)}")
+            state.processing_status = "feedback_failed"
+            return state
@@ -0,0 +1,69 @@
+from typing import Optional
+from langchain_core.language_models import BaseChatModel
+from app.models import ExtractedCVData, JobFit
+from app.utils.llm_config import get_stage_chat_model
+from app.utils.cache import prompt_fingerprint
+from app.utils.stage_cache import StageMemo, canonical_json
+from app.utils.prompt_caching import cached_chat_prompt
+from app.utils.structured_output import output_tool, structured_output_chain
+from app.utils.usage import UsageCallbackHandler
+from app.utils.metrics import record_fallback
+from app.utils.prompt_payload import CV_DATA_KEY_LEGEND, compact_cv_payload, log_prompt_tokens
+
+
+JOB_FIT_PROMPT = cached_chat_prompt(
+    instructions="""You are an expert technical recruiter. Assess how well a candidate fits a job, based on the job description and the candidate's CV data.
+
+Provide:
+- Fit score (0-100): how well the candidate meets the job's requirements
+- Matching requirements: requirements of the job the candidate clearly meets
+- Missing requirements: requirements the CV shows no evidence for
+- Summary: two or three sentences a hiring manager can act on
+
+Judge only on evidence in the CV data. Weigh must-have requirements above nice-to-haves.
+
+""" + CV_DATA_KEY_LEGEND,
+    data_template="""Job Description:
+{job_description}
+
+CV Data:
+{cv_data}"""
+)
+
+JOB_FIT_TOOL = output_tool("record_job_fit", "Record the assessment of the candidate's fit for the job.", JobFit)
+
+
+class JobFitAgent:
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_stage_chat_model("job_fit")
+        self.prompt = JOB_FIT_PROMPT
+        self.tool = JOB_FIT_TOOL
+        self.chain = structured_output_chain(self.prompt, self.llm, self.tool, [UsageCallbackHandler("job_fit")])
+        self.fingerprint = prompt_fingerprint(self.prompt, JobFit, self.llm, self.tool)
+        self.memo = StageMemo("job_fit", self.fingerprint, JobFit)
+
+    def _cache_key(self, job_description: str, extracted_data: ExtractedCVData) -> str:
+        return self.memo.key(" ".join(job_description.split()), canonical_json(extracted_data))
+
+    def _inputs(self, job_description: str, extracted_data: ExtractedCVData) -> dict:
+        inputs = {"job_description": job_description, "cv_data": compact_cv_payload(extracted_data)}
+        log_prompt_tokens("job_fit", self.prompt, inputs)
+        return inputs
+
+    async def aassess(self, job_description: str, extracted_data: ExtractedCVData) -> Optional[JobFit]:
+        """Assess a candidate against a job description.
+
+        Returns None if the assessment fails: a made-up score would rank the
+        candidate, so the caller keeps the lexical ranking instead.
+        """
+        key = self._cache_key(job_description, extracted_data)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self.chain.ainvoke(self._inputs(job_description, extracted_data))
+            return self.memo.set(key, result)
+        except Exception as e:
+            record_fallback("job_fit", e)
+            return None
@@ -1,11 +1,19 @@
-from langchain_core.output_parsers import JsonOutputParser
-from langchain.prompts import PromptTemplate
+from typing import Optional
+from langchain_core.language_models import BaseChatModel
 from app.models import ExtractedCVData, AnalysisResult, Feedback, Recommendation, CVReviewState, ProcessingStatus
-from app.utils.llm_config import get_chat_model
+from app.utils.llm_config import get_stage_chat_model
+from app.utils.cache import prompt_fingerprint
+from app.utils.stage_cache import StageMemo, canonical_json
+from app.utils.streaming import astream_with_partials
+from app.utils.prompt_caching import cached_chat_prompt
+from app.utils.structured_output import output_tool, structured_output_chain
+from app.utils.usage import UsageCallbackHandler
+from app.utils.metrics import record_fallback
+from app.utils.prompt_payload import CV_DATA_KEY_LEGEND, compact_cv_payload, compact_json, log_prompt_tokens
 
 
-RECOMMENDATION_PROMPT = PromptTemplate(
-    template="""You are an expert career development consultant and professional coach. Generate comprehensive recommendations for CV improvement and career development.
+RECOMMENDATION_PROMPT = cached_chat_prompt(
+    instructions="""You are an expert career development consultant and professional coach. Generate comprehensive recommendations for CV improvement and career development.
 
 Provide recommendations in the following areas:
 1. Skill development: Specific skills to acquire or improve
@@ -24,57 +32,96 @@ Guidelines:
 - Include both technical and soft skills
 - Suggest relevant certifications or training
 
-CV Data:
+""" + CV_DATA_KEY_LEGEND,
+    data_template="""CV Data:
 {cv_data}
 
 Analysis Results:
 {analysis_data}
 
 Feedback:
-{feedback_data}
-
-{format_instructions}""",
-    input_variables=["cv_data", "analysis_data", "feedback_data"],
-    partial_variables={"format_instructions": "{format_instructions}"}
+{feedback_data}"""
 )
 
+RECOMMENDATION_TOOL = output_tool("record_recommendations", "Record the recommendations for the candidate.", Recommendation)
+
+NO_FEEDBACK = "No feedback available yet. Base the recommendations on the CV data and analysis."
+
 
 class RecommendationAgent:
-    def __init__(self):
-        self.llm = get_chat_model()
-        self.parser = JsonOutputParser(pydantic_object=Recommendation)
-        self.prompt = RECOMMENDATION_PROMPT.partial(format_instructions=self.parser.get_format_instructions())
-        self.chain = self.prompt | self.llm | self.parser
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or get_stage_chat_model("recommendation")
+        self.prompt = RECOMMENDATION_PROMPT
+        self.tool = RECOMMENDATION_TOOL
+        self.chain = structured_output_chain(self.prompt, self.llm, self.tool, [UsageCallbackHandler("recommendation")])
+        self.fingerprint = prompt_fingerprint(self.prompt, Recommendation, self.llm, self.tool)
+        self.memo = StageMemo("recommendation", self.fingerprint, Recommendation)
     
-    def generate_recommendations(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult, feedback: Feedback) -> Recommendation:
-        """Generate improvement recommendations and career guidance using JsonOutputParser."""
+    def _cache_key(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult, feedback: Optional[Feedback]) -> str:
+        return self.memo.key(
+            canonical_json(extracted_data),
+            canonical_json(analysis_results),
+            canonical_json(feedback) if feedback else NO_FEEDBACK,
+        )
+
+    def _inputs(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult, feedback: Optional[Feedback]) -> dict:
+        inputs = {
+            "cv_data": compact_cv_payload(extracted_data),
+            "analysis_data": compact_json(analysis_results),
+            "feedback_data": compact_json(feedback) if feedback else NO_FEEDBACK
+        }
+        log_prompt_tokens("recommendation", self.prompt, inputs)
+        return inputs
+
+    def _fallback(self) -> Recommendation:
+        return Recommendation(
+            skill_development=["Focus on developing relevant technical and soft skills"],
+            experience_gaps=["Consider gaining more experience in key areas"],
+            career_path_suggestions=["Explore opportunities for career advancement"],
+            immediate_actions=["Review and update CV regularly"],
+            long_term_goals=["Set clear career objectives and milestones"],
+            industry_trends=["Stay updated with industry developments"]
+        )
+
+    def generate_recommendations(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult, feedback: Optional[Feedback] = None) -> Recommendation:
+        """Generate improvement recommendations and career guidance."""
         
+        key = self._cache_key(extracted_data, analysis_results, feedback)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
         try:
-            data_json = extracted_data.model_dump_json()
-            analysis_json = analysis_results.model_dump_json()
-            feedback_json = feedback.model_dump_json()
-            result = self.chain.invoke({
-                "cv_data": data_json,
-                "analysis_data": analysis_json,
-                "feedback_data": feedback_json
-            })
+            result = self.chain.invoke(self._inputs(extracted_data, analysis_results, feedback))
             
-            return result
+            return self.memo.set(key, result)
             
         except Exception as e:
-            return Recommendation(
-                skill_development=["Focus on developing relevant technical and soft skills"],
-                experience_gaps=["Consider gaining more experience in key areas"],
-                career_path_suggestions=["Explore opportunities for career advancement"],
-                immediate_actions=["Review and update CV regularly"],
-                long_term_goals=["Set clear career objectives and milestones"],
-                industry_trends=["Stay updated with industry developments"]
-            )
+            record_fallback("recommendation", e)
+            return self._fallback()
+
+    async def agenerate_recommendations(self, extracted_data: ExtractedCVData, analysis_results: AnalysisResult, feedback: Optional[Feedback] = None) -> Recommendation:
+        """Generate recommendations without blocking the event loop."""
+        
+        key = self._cache_key(extracted_data, analysis_results, feedback)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await astream_with_partials(self.chain, self._inputs(extracted_data, analysis_results, feedback))
+            
+            return self.memo.set(key, result)
+            
+        except Exception as e:
+            record_fallback("recommendation", e)
+            return self._fallback()
     
     def process(self, state: CVReviewState) -> dict:
         """Process the CV review state and generate recommendations."""
         try:
-            if not state.extracted_data or not state.analysis_results or not state.feedback:
+            # Feedback is optional so recommendations can run in parallel with it
+            if not state.extracted_data or not state.analysis_results:
                 state.errors.append("Missing required data for recommendations")
                 return state
 
@@ -89,4 +136,25 @@ class RecommendationAgent:
         except Exception as e:
             state.errors.append(f"Recommendation generation failed: {str(e)}")
             state.processing_status = "recommendations_failed"
-            return state 
\ No newline at end of file
+            return state
+
+    async def aprocess(self, state: CVReviewState) -> CVReviewState:
+        """Process the CV review state and generate recommendations asynchronously."""
+        try:
+            # Feedback is optional so recommendations can run in parallel with it
+            if not state.extracted_data or not state.analysis_results:
+                state.errors.append("Missing required data for recommendations")
+                return state
+
+            recommendations = await self.agenerate_recommendations(
+                state.extracted_data, 
+                state.analysis_results, 
+                state.feedback
+            )
+            state.recommendations = recommendations
+            return state
+            
+        except Exception as e:
+            state.errors.append(f"Recommendation generation failed: {str(e)}")
+            state.processing_status = "recommendations_failed"
+            return state
@@ -0,0 +1,67 @@
+import logging
+import threading
+from typing import Dict, Type, TypeVar
+
+from app.agents.extraction_agent import ExtractionAgent
+from app.agents.analysis_agent import AnalysisAgent
+from app.agents.feedback_agent import FeedbackAgent
+from app.agents.recommendation_agent import RecommendationAgent
+from app.utils.llm_config import get_chat_model, aopen_connections
+from app.utils.event_loop import run_in_background
+
+logger = logging.getLogger(__name__)
+
+AGENT_CLASSES = (ExtractionAgent, AnalysisAgent, FeedbackAgent, RecommendationAgent)
+
+AgentT = TypeVar("AgentT")
+
+_agents: Dict[type, object] = {}
+_agents_lock = threading.Lock()
+
+
+def get_agent(agent_cls: Type[AgentT]) -> AgentT:
+    """Get the process-wide instance of an agent.
+
+    Agents hold no per-review state, so their prompts, parsers and chains are
+    built once and shared by every workflow and session.
+    """
+    with _agents_lock:
+        agent = _agents.get(agent_cls)
+        if agent is None:
+            agent = agent_cls()
+            _agents[agent_cls] = agent
+        return agent
+
+
+def install_agents(*agents) -> None:
+    """Replace the shared agents of the given instances' classes.
+
+    Used to serve reviews from stub models in offline benchmarks. Call it
+    before the first workflow is built: compiled graphs keep the agents they
+    were created with.
+    """
+    with _agents_lock:
+        for agent in agents:
+            _agents[type(agent)] = agent
+
+
+async def awarm_up(connect: bool = True) -> None:
+    """Build every shared agent and open a pooled API connection on the running loop.
+
+    Call this once at startup so the first review doesn't pay for prompt
+    construction, schema generation or the TLS handshake.
+    """
+    for agent_cls in AGENT_CLASSES:
+        get_agent(agent_cls)
+
+    if connect:
+        try:
+            await aopen_connections(get_chat_model())
+        except Exception as e:
+            logger.warning("Could not pre-open API connection: %s", e)
+
+
+def warm_up(connect: bool = True) -> None:
+    """Warm up for reviews driven from synchronous code such as Streamlit."""
+    # Those reviews run on the background loop, so that's where the async pool must live
+    run_in_background(awarm_up(connect))
@@ -0,0 +1,195 @@
+import asyncio
+import io
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set, Union
+
+from pydantic import BaseModel, Field
+
+from app.graph.workflow import CVReviewWorkflow
+from app.models import CVReviewState, ProcessingStatus, ProgressEvent
+
+logger = logging.getLogger(__name__)
+
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "1000"))
+API_JOB_RETENTION = int(os.getenv("API_JOB_RETENTION", "1000"))
+
+FINISHED_STATUSES = (ProcessingStatus.COMPLETED, ProcessingStatus.FAILED)
+
+
+class JobEvent(BaseModel):
+    status: ProcessingStatus
+    timestamp: float
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    file_name: str
+    status: ProcessingStatus
+    created_at: float
+    finished_at: Optional[float] = None
+    errors: List[str] = Field(default_factory=list)
+    events: List[JobEvent] = Field(default_factory=list)
+    progress: Optional[ProgressEvent] = None
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more reviews."""
+
+
+class ReviewJob:
+    """A queued CV review and the progress events it has published."""
+
+    def __init__(self, file_name: str, data: bytes):
+        self.job_id = uuid.uuid4().hex
+        self.file_name = file_name
+        self.data = data
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.state: Optional[CVReviewState] = None
+        self.events: List[JobEvent] = []
+        self.progress: Optional[ProgressEvent] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.publish(ProcessingStatus.PENDING)
+
+    @property
+    def status(self) -> ProcessingStatus:
+        return self.events[-1].status
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def publish(self, status: ProcessingStatus) -> None:
+        """Record a status transition and notify subscribers."""
+        if self.events and self.events[-1].status == status:
+            return
+        event = JobEvent(status=status, timestamp=time.time())
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def publish_progress(self, progress: ProgressEvent) -> None:
+        """Record the latest progress estimate and notify subscribers."""
+        self.progress = progress
+        for queue in self._subscribers:
+            queue.put_nowait(progress)
+
+    async def subscribe(self) -> AsyncGenerator[Union[JobEvent, ProgressEvent], None]:
+        """Yield past status events, then new status and progress events until the job finishes."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if isinstance(event, JobEvent) and event.status in FINISHED_STATUSES:
+                    return
+        finally:
+            self._subscribers.discard(queue)
+
+    def info(self) -> JobInfo:
+        return JobInfo(
+            job_id=self.job_id,
+            file_name=self.file_name,
+            status=self.status,
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            errors=self.state.errors if self.state else [],
+            events=self.events,
+            progress=self.progress,
+        )
+
+
+class ReviewJobQueue:
+    """Runs submitted reviews on a fixed pool of asyncio workers."""
+
+    def __init__(self, workers: int = API_WORKERS, max_queued: int = API_QUEUE_SIZE, retention: int = API_JOB_RETENTION):
+        self.workers = workers
+        self.retention = retention
+        self._queue: "asyncio.Queue[ReviewJob]" = asyncio.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, ReviewJob]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, file_name: str, data: bytes) -> ReviewJob:
+        job = ReviewJob(file_name, data)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Review queue is full, try again later")
+        self._jobs[job.job_id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self._jobs.values() if not job.finished and job.status != ProcessingStatus.PENDING)
+        return {"queued": self._queue.qsize(), "running": running, "workers": self.workers}
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond the retention limit."""
+        excess = len(self._jobs) - self.retention
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+                excess -= 1
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ReviewJob) -> None:
+        cv_file = io.BytesIO(job.data)
+        cv_file.name = job.file_name
+        cv_file.size = len(job.data)
+        try:
+            workflow = CVReviewWorkflow(cv_file, on_progress=job.publish_progress)
+            async for state in workflow.run_async():
+                job.state = state
+                if state.processing_status not in FINISHED_STATUSES:
+                    job.publish(state.processing_status)
+        except Exception as e:
+            logger.exception("Review job %s failed", job.job_id)
+            job.state = CVReviewState(
+                file_name=job.file_name,
+                processing_status=ProcessingStatus.FAILED,
+                errors=[f"Review failed: {str(e)}"]
+            )
+        finally:
+            # Release the upload now that it has been processed
+            job.data = b""
+            job.finished_at = time.time()
+            if job.state is None:
+                # Cancelled (e.g. on shutdown) before the workflow produced a state
+                job.state = CVReviewState(
+                    file_name=job.file_name,
+                    processing_status=ProcessingStatus.FAILED,
+                    errors=["Review was cancelled"]
+                )
+            if job.state.processing_status != ProcessingStatus.COMPLETED:
+                job.publish(ProcessingStatus.FAILED)
+            else:
+                job.publish(ProcessingStatus.COMPLETED)
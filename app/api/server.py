@@ -0,0 +1,182 @@
+"""HTTP review API for applicant tracking systems.
+
+Reviews are queued and run on an internal worker pool, so submitting a CV
+returns immediately with a job id that can be polled or streamed.
+
+    uvicorn app.api.server:app --host 0.0.0.0 --port 8000
+"""
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from app.agents.registry import awarm_up
+from app.api.jobs import JobInfo, QueueFullError, ReviewJobQueue
+from app.graph.job_matching import amatch_candidates
+from app.models import CandidateMatch, CVReviewState, ProgressEvent, ReviewPage, SkillMatch, SkillRequirement
+from app.utils.file_processor import MAX_FILE_SIZE_MB
+from app.utils.metrics import get_metrics_registry
+from app.utils.review_store import ORDER_COLUMNS, get_review_store
+from app.utils.shortlist import SHORTLIST_SIZE
+from app.utils.skill_matrix import get_skill_matrix, parse_requirements
+
+SUPPORTED_EXTENSIONS = ("pdf", "docx", "txt")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await awarm_up()
+    app.state.jobs = ReviewJobQueue()
+    await app.state.jobs.start()
+    yield
+    await app.state.jobs.stop()
+
+
+app = FastAPI(title="AI CV Reviewer", lifespan=lifespan)
+
+
+def _get_job(job_id: str):
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Review job not found")
+    return job
+
+
+@app.get("/health")
+async def health() -> dict:
+    return {"status": "ok", **app.state.jobs.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Per-stage latency histograms and token, retry, fallback and cost counters for Prometheus."""
+    return PlainTextResponse(get_metrics_registry().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/reviews", status_code=202, response_model=JobInfo)
+async def submit_review(file: UploadFile = File(...)) -> JobInfo:
+    """Queue a CV for review and return its job id."""
+    file_name = file.filename or "cv"
+    extension = file_name.lower().split(".")[-1]
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=415, detail=f"Unsupported file format: {extension}. Please upload PDF, DOCX, or TXT files.")
+
+    data = await file.read()
+    if len(data) > MAX_FILE_SIZE_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_FILE_SIZE_MB} MB limit")
+
+    try:
+        job = app.state.jobs.submit(file_name, data)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.info()
+
+
+@app.get("/reviews/{job_id}", response_model=JobInfo)
+async def get_review(job_id: str) -> JobInfo:
+    """Poll the status and progress events of a review."""
+    return _get_job(job_id).info()
+
+
+@app.get("/reviews/{job_id}/events")
+async def stream_review_events(job_id: str) -> StreamingResponse:
+    """Stream status transitions and progress estimates as server-sent events."""
+    job = _get_job(job_id)
+
+    async def events():
+        async for event in job.subscribe():
+            kind = "progress" if isinstance(event, ProgressEvent) else "status"
+            yield f"event: {kind}\ndata: {event.model_dump_json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/reviews/{job_id}/result", response_model=CVReviewState)
+async def get_review_result(job_id: str) -> CVReviewState:
+    """Fetch the final review state of a finished job."""
+    job = _get_job(job_id)
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"Review is not finished yet ({job.status.value})")
+    return job.state
+
+
+
+def _get_store():
+    store = get_review_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Review history is disabled")
+    return store
+
+
+# Plain def endpoints: SQLite reads run on the threadpool, not the event loop
+@app.get("/history", response_model=ReviewPage)
+def list_past_reviews(
+    name: Optional[str] = Query(None, description="Start of the candidate's name"),
+    email: Optional[str] = None,
+    file_hash: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    max_score: Optional[float] = Query(None, ge=0, le=100),
+    seniority: Optional[str] = None,
+    since: Optional[float] = Query(None, description="Unix time"),
+    until: Optional[float] = Query(None, description="Unix time"),
+    order_by: str = Query("created_at", pattern=f"^({'|'.join(ORDER_COLUMNS)})$"),
+    descending: bool = True,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+) -> ReviewPage:
+    """Page through finished reviews, newest first."""
+    return _get_store().query(
+        name=name, email=email, file_hash=file_hash, min_score=min_score, max_score=max_score, seniority=seniority,
+        since=since, until=until, order_by=order_by, descending=descending, page=page, page_size=page_size,
+    )
+
+
+@app.get("/history/{review_id}", response_model=CVReviewState)
+def get_past_review(review_id: int) -> CVReviewState:
+    """Fetch a stored review without recomputing it."""
+    state = _get_store().get(review_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return state
+
+
+class MatchRequest(BaseModel):
+    job_description: str = Field(min_length=1)
+    top_k: int = Field(SHORTLIST_SIZE, ge=1, le=100, description="Candidates to shortlist")
+    assess: bool = Field(True, description="Have the model assess the fit of each shortlisted candidate")
+
+
+@app.post("/matches", response_model=List[CandidateMatch])
+async def match_candidates(request: MatchRequest) -> List[CandidateMatch]:
+    """Shortlist reviewed candidates for a job description and assess their fit."""
+    _get_store()
+    return await amatch_candidates(request.job_description, request.top_k, request.assess)
+
+
+class SkillSearchRequest(BaseModel):
+    query: Optional[str] = Field(None, description='Requirements like "Python >= advanced, Kubernetes >= 3y"')
+    requirements: List[SkillRequirement] = Field(default_factory=list)
+    require_all: bool = False
+    top_k: int = Field(50, ge=1, le=1000)
+
+
+@app.post("/skill-search", response_model=List[SkillMatch])
+def search_skills(request: SkillSearchRequest) -> List[SkillMatch]:
+    """Rank reviewed candidates by how many weighted skill requirements they meet."""
+    _get_store()
+    try:
+        requirements = request.requirements + (parse_requirements(request.query) if request.query else [])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not requirements:
+        raise HTTPException(status_code=422, detail="Give a query or at least one requirement")
+    return get_skill_matrix().search(requirements, request.top_k, request.require_all)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("API_HOST", "0.0.0.0"), port=int(os.getenv("API_PORT", "8000")))
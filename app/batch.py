@@ -0,0 +1,283 @@
+"""Headless batch review of many CVs.
+
+Reviews every CV in a directory (or listed in a manifest) with bounded
+concurrency and appends one JSON line per finished review to the output file.
+Files already reviewed successfully in the output are skipped and failed ones
+are retried, so an interrupted run can be resumed by running the same command
+again.
+
+With --message-batches every stage is sent for all CVs at once through the
+Message Batches API instead of as interactive calls: half the price and no
+rate-limit pressure, but results only arrive once the last stage's batch has
+ended, so it suits overnight runs.
+
+    python -m app.batch cvs/ --output reviews.jsonl --concurrency 8
+    python -m app.batch --manifest files.txt --output reviews.jsonl
+    python -m app.batch cvs/ --output reviews.jsonl --message-batches
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Set
+
+from app.graph.batch_workflow import MessageBatchReviewWorkflow
+from app.graph.workflow import CVReviewWorkflow
+from app.models import CVReviewState, ProcessingStatus
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+
+def collect_files(directory: Optional[Path], manifest: Optional[Path]) -> List[Path]:
+    """List the CV files to review from a directory and/or a manifest file."""
+    files = []
+    if directory is not None:
+        files.extend(
+            path for path in sorted(directory.rglob("*"))
+            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+        )
+    if manifest is not None:
+        for line in manifest.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = Path(line)
+            if not path.is_absolute():
+                path = manifest.parent / path
+            files.append(path)
+    # Keep the first occurrence of each file
+    return list(dict.fromkeys(path.resolve() for path in files))
+
+
+def _completed_record(line: str) -> Optional[dict]:
+    try:
+        record = json.loads(line)
+        return record if record["status"] == "completed" and record["source"] else None
+    except (ValueError, KeyError, TypeError):
+        # A truncated last line from an interrupted run is simply retried
+        return None
+
+
+def load_completed(output: Path) -> Set[str]:
+    """Return the source paths already reviewed successfully in the output file."""
+    completed = set()
+    if not output.exists():
+        return completed
+    with output.open(encoding="utf-8") as f:
+        for line in f:
+            record = _completed_record(line)
+            if record is not None:
+                completed.add(record["source"])
+    return completed
+
+
+def drop_failed_records(output: Path) -> int:
+    """Remove failed and truncated records from the output file, so their retries replace them.
+
+    Returns the number of lines removed.
+    """
+    if not output.exists():
+        return 0
+    with output.open(encoding="utf-8") as f:
+        lines = f.readlines()
+    kept = [line for line in lines if _completed_record(line) is not None]
+    if len(kept) == len(lines):
+        return 0
+    # Rewrite through a temporary file so an interruption can't lose completed records
+    tmp = output.with_name(output.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.writelines(line if line.endswith("\n") else line + "\n" for line in kept)
+    os.replace(tmp, output)
+    return len(lines) - len(kept)
+
+
+def open_cv_file(path: Path) -> io.BytesIO:
+    """Load a file into the same file-like shape Streamlit uploads have."""
+    data = path.read_bytes()
+    cv_file = io.BytesIO(data)
+    cv_file.name = path.name
+    cv_file.size = len(data)
+    return cv_file
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def build_record(path: Path, state: Optional[CVReviewState], latency: float, error: Optional[str] = None) -> dict:
+    """Build the JSONL record for one review."""
+    errors = list(state.errors) if state else []
+    if error:
+        errors.append(error)
+    # A fallback result is placeholder data, so the review is retried on the next run
+    failed = (
+        bool(errors) or state is None or state.processing_status != ProcessingStatus.COMPLETED
+        or any(metrics.fallback_used for metrics in state.stage_metrics.values())
+    )
+    result = None
+    cost = 0.0
+    if state is not None:
+        cost = sum(metrics.cost_usd for metrics in state.stage_metrics.values())
+        result = state.model_dump(
+            mode="json",
+            exclude={"file_content": True, "extracted_data": {"raw_text"}}
+        )
+    return {
+        "source": str(path),
+        "file_name": path.name,
+        "status": "failed" if failed else "completed",
+        "latency_seconds": round(latency, 3),
+        "cost_usd": round(cost, 6),
+        "errors": errors,
+        "result": result,
+    }
+
+
+async def review_file(path: Path, semaphore: asyncio.Semaphore, parallel: Optional[bool]) -> dict:
+    """Review one file once a concurrency slot is free."""
+    async with semaphore:
+        started = time.perf_counter()
+        state = None
+        try:
+            loop = asyncio.get_running_loop()
+            cv_file = await loop.run_in_executor(None, open_cv_file, path)
+            workflow = CVReviewWorkflow(cv_file, parallel=parallel)
+            async for state in workflow.run_async():
+                pass
+            return build_record(path, state, time.perf_counter() - started)
+        except Exception as e:
+            logger.exception("Review of %s failed", path)
+            return build_record(path, state, time.perf_counter() - started, error=str(e))
+
+
+def _pending_files(files: List[Path], output: Path) -> List[Path]:
+    dropped = drop_failed_records(output)
+    if dropped:
+        logger.info("Retrying %d failed or incomplete records from %s", dropped, output)
+    completed = load_completed(output)
+    pending = [path for path in files if str(path) not in completed]
+    skipped = len(files) - len(pending)
+    if skipped:
+        logger.info("Skipping %d files already in %s", skipped, output)
+    return pending
+
+
+def _summarize(reviewed: int, skipped: int, failures: int, elapsed: float, latencies: List[float], cost: float) -> dict:
+    return {
+        "reviewed": reviewed,
+        "skipped": skipped,
+        "failures": failures,
+        "elapsed_seconds": elapsed,
+        "throughput_per_minute": reviewed / elapsed * 60 if elapsed > 0 else 0.0,
+        "p50_latency_seconds": percentile(latencies, 50),
+        "p95_latency_seconds": percentile(latencies, 95),
+        "cost_usd": cost,
+    }
+
+
+async def run_batch(files: List[Path], output: Path, concurrency: int, parallel: Optional[bool] = None) -> dict:
+    """Review files concurrently, appending each record as soon as it finishes."""
+    pending = _pending_files(files, output)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(review_file(path, semaphore, parallel)) for path in pending]
+
+    latencies = []
+    failures = 0
+    cost = 0.0
+    started = time.perf_counter()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("a", encoding="utf-8") as f:
+        for done, task in enumerate(asyncio.as_completed(tasks), 1):
+            record = await task
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            latencies.append(record["latency_seconds"])
+            cost += record["cost_usd"]
+            if record["status"] == "failed":
+                failures += 1
+            logger.info("[%d/%d] %s %s in %.1fs", done, len(pending), record["status"], record["file_name"], record["latency_seconds"])
+
+    elapsed = time.perf_counter() - started
+    return _summarize(len(pending), len(files) - len(pending), failures, elapsed, latencies, cost)
+
+
+async def run_message_batches(files: List[Path], output: Path, parallel: Optional[bool] = None) -> dict:
+    """Review files stage by stage through the Message Batches API, then append every record.
+
+    Finished stages are kept in the stage cache, so an interrupted run resumes
+    from the last stage whose batch ended.
+    """
+    pending = _pending_files(files, output)
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    cv_files = await asyncio.gather(*(loop.run_in_executor(None, open_cv_file, path) for path in pending))
+    states = await MessageBatchReviewWorkflow(cv_files, parallel=parallel).run() if cv_files else []
+    elapsed = time.perf_counter() - started
+
+    records = [build_record(path, state, elapsed) for path, state in zip(pending, states)]
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + "\n")
+    failures = sum(1 for record in records if record["status"] == "failed")
+    cost = sum(record["cost_usd"] for record in records)
+    return _summarize(len(pending), len(files) - len(pending), failures, elapsed, [elapsed] * len(records), cost)
+
+
+def print_summary(summary: dict) -> None:
+    print(
+        f"Reviewed {summary['reviewed']} files ({summary['skipped']} skipped, {summary['failures']} failed) "
+        f"in {summary['elapsed_seconds']:.1f}s\n"
+        f"Throughput: {summary['throughput_per_minute']:.1f} reviews/min\n"
+        f"Latency: p50 {summary['p50_latency_seconds']:.1f}s, p95 {summary['p95_latency_seconds']:.1f}s\n"
+        f"Estimated model cost: ${summary['cost_usd']:.4f}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", type=Path, help="Directory of CVs to review (searched recursively)")
+    parser.add_argument("--manifest", type=Path, help="File listing one CV path per line")
+    parser.add_argument("--output", type=Path, required=True, help="JSONL file to append results to")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum reviews in flight (default 4)")
+    parser.add_argument("--parallel-graph", action="store_true", default=None, help="Run feedback and recommendations in parallel")
+    parser.add_argument("--message-batches", action="store_true",
+                        help="Send each stage for all CVs through the Message Batches API (half price, slower)")
+    args = parser.parse_args(argv)
+
+    if args.directory is None and args.manifest is None:
+        parser.error("Provide a directory and/or --manifest")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    files = collect_files(args.directory, args.manifest)
+    if not files:
+        print("No CV files found", file=sys.stderr)
+        return 1
+
+    if args.message_batches:
+        summary = asyncio.run(run_message_batches(files, args.output, args.parallel_graph))
+    else:
+        summary = asyncio.run(run_batch(files, args.output, args.concurrency, args.parallel_graph))
+    print_summary(summary)
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
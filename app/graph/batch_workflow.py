@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+from app.models import CVReviewState, ProcessingStatus, StageMetrics
+from app.agents.extraction_agent import ExtractionAgent, _merge_chunk_results, validate_extraction
+from app.agents.analysis_agent import AnalysisAgent
+from app.agents.feedback_agent import FeedbackAgent
+from app.agents.recommendation_agent import RecommendationAgent
+from app.agents.registry import get_agent
+from app.graph.workflow import PARALLEL_GRAPH, CVReviewWorkflow
+from app.utils.cv_preprocessor import pre_extract
+from app.utils.message_batches import BatchResult, arun_message_batch
+from app.utils.structured_output import tool_call_params
+from app.utils.metrics import collect_stage_metrics, publish_stage_metrics, record_escalation, record_fallback
+from app.utils.usage import record_call_usage
+
+logger = logging.getLogger(__name__)
+
+
+class _StageJob:
+    """The model calls one review needs for a stage, and how to turn their outputs into its result."""
+
+    def __init__(self, workflow: CVReviewWorkflow, metrics: StageMetrics, inputs: List[dict],
+                 finish: Callable[[list], object], fallback: Callable[[], object]):
+        self.workflow = workflow
+        self.metrics = metrics
+        self.inputs = inputs
+        self.finish = finish
+        self.fallback = fallback
+        self.outputs: list = [None] * len(inputs)
+
+
+def _single_output(outputs: list):
+    output = outputs[0]
+    if isinstance(output, Exception):
+        raise output
+    return output
+
+
+class MessageBatchReviewWorkflow:
+    """Review many CVs together, one stage at a time, through the Message Batches API.
+
+    Each stage's requests for every CV still in the run are submitted as one
+    batch (split only above ANTHROPIC_BATCH_MAX_REQUESTS), and the next stage
+    starts once the batch has ended. Batched calls cost half the interactive
+    price and don't count against the Messages API rate limits, at the price
+    of latency: a stage takes as long as its batch, usually minutes.
+
+    The same agents, prompts, review cache and stage memos as
+    CVReviewWorkflow are used, so finished stages of an interrupted run are
+    not paid for again. In the parallel graph mode feedback and
+    recommendation batches run at the same time.
+    """
+
+    def __init__(self, cv_files: list, parallel: Optional[bool] = None):
+        self.parallel = PARALLEL_GRAPH if parallel is None else parallel
+        self.workflows = [CVReviewWorkflow(cv_file, parallel=self.parallel) for cv_file in cv_files]
+        self.extraction_agent = get_agent(ExtractionAgent)
+        self.analysis_agent = get_agent(AnalysisAgent)
+        self.feedback_agent = get_agent(FeedbackAgent)
+        self.recommendation_agent = get_agent(RecommendationAgent)
+
+    async def _prepare(self, workflow: CVReviewWorkflow) -> None:
+        """Hash and parse one file, or finish it from the review cache."""
+        loop = asyncio.get_running_loop()
+        try:
+            workflow.state.file_hash = await loop.run_in_executor(None, workflow._hash_file)
+            cached_state = workflow._load_cached_review()
+            if cached_state is not None:
+                workflow.state = cached_state
+                return
+            await workflow._process_file()
+        except Exception as e:
+            logger.exception("Could not process %s", getattr(workflow.cv_file, "name", None))
+            workflow.state.errors.append(f"File processing failed: {str(e)}")
+            workflow.state.processing_status = ProcessingStatus.FAILED
+
+    def _plan_extraction(self, workflow: CVReviewWorkflow, metrics: StageMetrics) -> _StageJob:
+        agent = self.extraction_agent
+        cv_text = workflow.state.file_content
+        if not cv_text:
+            raise ValueError("No file content to extract")
+        key, cached = agent._cached(cv_text)
+        if cached is not None:
+            return cached
+        pre_extracted = pre_extract(cv_text)
+        chunk_inputs = agent._chunk_inputs(cv_text, pre_extracted)
+        if chunk_inputs:
+            finish = lambda outputs: agent._store(key, _merge_chunk_results(outputs), cv_text, pre_extracted)
+            return _StageJob(workflow, metrics, chunk_inputs, finish, lambda: agent._fallback(cv_text))
+        finish = lambda outputs: agent._store(key, _single_output(outputs), cv_text, pre_extracted)
+        return _StageJob(workflow, metrics, [agent._inputs(cv_text, pre_extracted)], finish, lambda: agent._fallback(cv_text))
+
+    def _plan_analysis(self, workflow: CVReviewWorkflow, metrics: StageMetrics) -> _StageJob:
+        agent = self.analysis_agent
+        extracted_data = workflow.state.extracted_data
+        if not extracted_data:
+            raise ValueError("No extracted data to analyze")
+        key = agent._cache_key(extracted_data)
+        cached = agent.memo.get(key)
+        if cached is not None:
+            return cached
+        finish = lambda outputs: agent.memo.set(key, _single_output(outputs))
+        return _StageJob(workflow, metrics, [agent._inputs(extracted_data)], finish, agent._fallback)
+
+    def _plan_feedback(self, workflow: CVReviewWorkflow, metrics: StageMetrics) -> _StageJob:
+        agent = self.feedback_agent
+        state = workflow.state
+        if not state.extracted_data or not state.analysis_results:
+            raise ValueError("Missing extracted data or analysis results for feedback")
+        key = agent._cache_key(state.extracted_data, state.analysis_results)
+        cached = agent.memo.get(key)
+        if cached is not None:
+            return cached
+        finish = lambda outputs: agent.memo.set(key, _single_output(outputs))
+        return _StageJob(workflow, metrics, [agent._inputs(state.extracted_data, state.analysis_results)], finish, agent._fallback)
+
+    def _plan_recommendation(self, workflow: CVReviewWorkflow, metrics: StageMetrics) -> _StageJob:
+        agent = self.recommendation_agent
+        state = workflow.state
+        if not state.extracted_data or not state.analysis_results:
+            raise ValueError("Missing required data for recommendations")
+        # In the parallel mode the feedback is still being generated and isn't used
+        feedback = None if self.parallel else state.feedback
+        key = agent._cache_key(state.extracted_data, state.analysis_results, feedback)
+        cached = agent.memo.get(key)
+        if cached is not None:
+            return cached
+        finish = lambda outputs: agent.memo.set(key, _single_output(outputs))
+        inputs = agent._inputs(state.extracted_data, state.analysis_results, feedback)
+        return _StageJob(workflow, metrics, [inputs], finish, agent._fallback)
+
+    @staticmethod
+    def _parse(result: BatchResult, stage: str, metrics: StageMetrics):
+        """Record a batched call's usage and return its tool input, or the error on failure."""
+        if result.error is not None:
+            return result.error
+        with collect_stage_metrics(metrics):
+            record_call_usage(stage, result.usage, result.model, batch=True)
+        if result.tool_input is None:
+            return ValueError(f"The {stage} response has no tool call")
+        return result.tool_input
+
+    async def _call_models(self, stage: str, agent, jobs: List[_StageJob]) -> None:
+        """Fill in every job's outputs with one batch per model tier.
+
+        With tiered extraction the fast model answers first, and only the
+        requests whose output fails validation are batched again for the main
+        model.
+        """
+        fast_llm = getattr(agent, "fast_llm", None)
+        tiers = [fast_llm, agent.llm] if fast_llm is not None else [agent.llm]
+        pending = [(job, i) for job in jobs for i in range(len(job.inputs))]
+        for tier, llm in enumerate(tiers):
+            if not pending:
+                break
+            requests = {f"{stage}-{n}": call for n, call in enumerate(pending)}
+            results = await arun_message_batch(llm, [
+                (custom_id, agent.prompt.format_messages(**job.inputs[i])) for custom_id, (job, i) in requests.items()
+            ], **tool_call_params(agent.tool))
+            pending = []
+            for custom_id, (job, i) in requests.items():
+                output = self._parse(results[custom_id], stage, job.metrics)
+                if tier < len(tiers) - 1:
+                    try:
+                        # Chunks may legitimately be empty; the merged result is checked instead
+                        validate_extraction(output, require_content=len(job.inputs) == 1)
+                    except Exception as e:
+                        with collect_stage_metrics(job.metrics):
+                            record_escalation(stage, e)
+                        pending.append((job, i))
+                        continue
+                job.outputs[i] = output
+
+    async def _run_stage(self, stage: str, agent, field: str, plan, workflows: List[CVReviewWorkflow]) -> None:
+        """Run one stage for every review that is still going."""
+        started_at = time.time()
+        started = time.perf_counter()
+        model = getattr(agent.llm, "model", None)
+        jobs = []
+        results = {}
+        all_metrics = {}
+        for workflow in workflows:
+            metrics = StageMetrics(stage=stage, model=model, started_at=started_at)
+            all_metrics[id(workflow)] = metrics
+            with collect_stage_metrics(metrics):
+                try:
+                    planned = plan(workflow, metrics)
+                except Exception as e:
+                    workflow.state.errors.append(str(e))
+                    continue
+            if isinstance(planned, _StageJob):
+                jobs.append(planned)
+            else:
+                results[id(workflow)] = planned
+
+        logger.info("stage=%s reviews=%d cached=%d batched=%d", stage, len(workflows), len(results), len(jobs))
+        try:
+            await self._call_models(stage, agent, jobs)
+        except Exception as e:
+            # Each job falls back on its own below
+            for job in jobs:
+                job.outputs = [e] * len(job.inputs)
+
+        batch_seconds = time.perf_counter() - started
+        for job in jobs:
+            with collect_stage_metrics(job.metrics):
+                try:
+                    results[id(job.workflow)] = job.finish(job.outputs)
+                except Exception as e:
+                    record_fallback(stage, e)
+                    results[id(job.workflow)] = job.fallback()
+            job.metrics.wall_seconds = batch_seconds
+
+        for workflow in workflows:
+            metrics = all_metrics[id(workflow)]
+            if id(workflow) in results:
+                workflow.state = workflow.state.model_copy(update={
+                    field: results[id(workflow)],
+                    "stage_metrics": {**workflow.state.stage_metrics, stage: metrics},
+                })
+                workflow.state.processing_status = workflow._processing_status_from_state()
+            publish_stage_metrics(metrics)
+
+    @staticmethod
+    def _running(workflows: List[CVReviewWorkflow]) -> List[CVReviewWorkflow]:
+        return [workflow for workflow in workflows if not workflow.state.errors
+                and workflow.state.processing_status not in (ProcessingStatus.COMPLETED, ProcessingStatus.FAILED)]
+
+    async def run(self) -> List[CVReviewState]:
+        """Review every file and return their final states, in input order."""
+        await asyncio.gather(*(self._prepare(workflow) for workflow in self.workflows))
+
+        await self._run_stage("extraction", self.extraction_agent, "extracted_data", self._plan_extraction, self._running(self.workflows))
+        await self._run_stage("analysis", self.analysis_agent, "analysis_results", self._plan_analysis, self._running(self.workflows))
+        if self.parallel:
+            running = self._running(self.workflows)
+            await asyncio.gather(
+                self._run_stage("feedback", self.feedback_agent, "feedback", self._plan_feedback, running),
+                self._run_stage("recommendation", self.recommendation_agent, "recommendations", self._plan_recommendation, running),
+            )
+        else:
+            await self._run_stage("feedback", self.feedback_agent, "feedback", self._plan_feedback, self._running(self.workflows))
+            await self._run_stage("recommendation", self.recommendation_agent, "recommendations", self._plan_recommendation, self._running(self.workflows))
+
+        for workflow in self.workflows:
+            if workflow.state.processing_status in (ProcessingStatus.COMPLETED, ProcessingStatus.FAILED):
+                continue
+            # Like CVReviewWorkflow, a review that stopped on an error is complete but not cached
+            workflow._complete()
+        return [workflow.state for workflow in self.workflows]
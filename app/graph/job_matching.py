@@ -0,0 +1,49 @@
+import asyncio
+import os
+from typing import List
+
+from app.agents.job_fit_agent import JobFitAgent
+from app.agents.registry import get_agent
+from app.models import CandidateMatch
+from app.utils.metrics import stage_scope
+from app.utils.review_store import get_review_store
+from app.utils.shortlist import SHORTLIST_SIZE, get_shortlist_index
+
+# Fit assessments of one job in flight at once; the rate governor still applies
+FIT_ASSESSMENT_CONCURRENCY = int(os.getenv("CV_FIT_ASSESSMENT_CONCURRENCY", "8"))
+
+
+async def amatch_candidates(job_description: str, top_k: int = SHORTLIST_SIZE, assess: bool = True) -> List[CandidateMatch]:
+    """Rank the reviewed candidates against a job description.
+
+    The lexical shortlist index picks the `top_k` best matching candidates
+    from the review history without any model calls. Only those are then
+    assessed by the model, so the cost of a job is bounded by `top_k` however
+    many candidates there are. Assessed candidates come first, by fit score;
+    any whose assessment failed follow in lexical order.
+    """
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(None, get_shortlist_index)
+    if index is None:
+        raise RuntimeError("Candidate matching needs the review store")
+    matches = await loop.run_in_executor(None, index.search, job_description, top_k)
+    if not assess or not matches:
+        return matches
+
+    store = get_review_store()
+    agent = get_agent(JobFitAgent)
+    model = getattr(agent.llm, "model", None)
+    semaphore = asyncio.Semaphore(FIT_ASSESSMENT_CONCURRENCY)
+
+    async def assess_match(match: CandidateMatch) -> CandidateMatch:
+        state = await loop.run_in_executor(None, store.get, match.review_id)
+        if state is None or state.extracted_data is None:
+            return match
+        async with semaphore:
+            with stage_scope("job_fit", model=model):
+                fit = await agent.aassess(job_description, state.extracted_data)
+        return match.model_copy(update={"fit": fit})
+
+    assessed = await asyncio.gather(*(assess_match(match) for match in matches))
+    # The sort is stable, so unassessed candidates keep their lexical order
+    return sorted(assessed, key=lambda match: (match.fit is None, -match.fit.fit_score if match.fit else 0.0))
@@ -1,27 +1,126 @@
-from typing import Dict, Any, AsyncGenerator
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, AsyncGenerator, Callable, Optional
 
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
-from app.models import CVReviewState, ProcessingStatus
-from app.agents.extraction_agent import ExtractionAgent
+from app.models import CVReviewState, ProcessingStatus, ProgressEvent
+from app.agents.extraction_agent import EXTRACTION_TIERED, ExtractionAgent
 from app.agents.analysis_agent import AnalysisAgent
 from app.agents.feedback_agent import FeedbackAgent
 from app.agents.recommendation_agent import RecommendationAgent
-from app.utils.file_processor import process_uploaded_file
+from app.agents.registry import get_agent
+from app.utils.llm_config import get_stage_chat_model
+from app.utils.file_processor import MAX_PDF_PAGES, MAX_TEXT_CHARS, process_uploaded_file
+from app.utils.cache import get_review_cache, hash_key
+from app.utils.review_store import get_review_store
+from app.utils.revision import (
+    INCREMENTAL_REVIEW_ENABLED, SECTION_GROUPS, changed_groups, changed_sections_text, find_revision_base,
+    patch_extracted_data,
+)
+from app.utils.cv_preprocessor import PreExtractedCV, pre_extract
+from app.utils.stage_cache import canonical_json
+from app.utils.streaming import partial_output_listener
+from app.utils.metrics import record_cache_hit, stage_scope
+from app.utils.progress import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_GRAPH = os.getenv("CV_REVIEW_PARALLEL_GRAPH", "false").lower() in ("1", "true", "yes")
+# Minimum gap between partial-output updates of one stage, to bound UI re-renders
+STREAM_MIN_INTERVAL_SECONDS = float(os.getenv("CV_REVIEW_STREAM_INTERVAL_SECONDS", "0.25"))
 
 class CVReviewWorkflow:
     """CV Review workflow using LangGraph for orchestration."""
     
-    def __init__(self, cv_file):
-        """Initialize the workflow with agents."""
+    _shared_workflows: Dict[bool, Any] = {}
+
+    def __init__(self, cv_file, shared_agents: bool = True, parallel: Optional[bool] = None,
+                 on_progress: Optional[Callable[[ProgressEvent], None]] = None):
+        """Initialize the workflow with agents.
+
+        By default the agents and the compiled graph are process-wide singletons;
+        pass `shared_agents=False` to build everything from scratch (e.g. to
+        measure setup overhead). `parallel` selects the fan-out graph and
+        defaults to the CV_REVIEW_PARALLEL_GRAPH setting. `on_progress` is
+        called with a ProgressEvent whenever a stage starts or finishes; the
+        latest event is also available as `state.progress`.
+        """
+        setup_started = time.perf_counter()
         self.cv_file = cv_file
+        self.parallel = PARALLEL_GRAPH if parallel is None else parallel
         self.state = CVReviewState(
             processing_status=ProcessingStatus.STARTED
         )
-        self.extraction_agent = ExtractionAgent()
-        self.analysis_agent = AnalysisAgent()
-        self.feedback_agent = FeedbackAgent()
-        self.recommendation_agent = RecommendationAgent()
-        self._workflow = self._create_workflow()
+        if shared_agents:
+            self.extraction_agent = get_agent(ExtractionAgent)
+            self.analysis_agent = get_agent(AnalysisAgent)
+            self.feedback_agent = get_agent(FeedbackAgent)
+            self.recommendation_agent = get_agent(RecommendationAgent)
+            if self.parallel not in CVReviewWorkflow._shared_workflows:
+                CVReviewWorkflow._shared_workflows[self.parallel] = self._create_workflow()
+            self._workflow = CVReviewWorkflow._shared_workflows[self.parallel]
+        else:
+            self.extraction_agent = ExtractionAgent(
+                get_stage_chat_model("extraction", shared=False),
+                get_stage_chat_model("extraction_fast", shared=False) if EXTRACTION_TIERED else None
+            )
+            self.analysis_agent = AnalysisAgent(get_stage_chat_model("analysis", shared=False))
+            self.feedback_agent = FeedbackAgent(get_stage_chat_model("feedback", shared=False))
+            self.recommendation_agent = RecommendationAgent(get_stage_chat_model("recommendation", shared=False))
+            self._workflow = self._create_workflow()
+        self._review_cache = get_review_cache()
+        self.progress = ProgressTracker(self.parallel, on_progress)
+        self.setup_seconds = time.perf_counter() - setup_started
+        logger.debug("Review workflow setup took %.2f ms", self.setup_seconds * 1000)
+
+    @staticmethod
+    def _stage_node(stage: str, agent, field: str):
+        """Wrap an agent's aprocess so the node returns only the fields it changed.
+
+        Partial updates let parallel branches write to the state in the same
+        step; errors and stage metrics are merged by the reducers on
+        CVReviewState. While the agent streams, its partially parsed output is
+        forwarded to the graph's custom stream. A result already in the state,
+        carried over from an earlier review of the same CV, is kept.
+        """
+        model = getattr(agent.llm, "model", None)
+
+        async def node(state: CVReviewState) -> dict:
+            if getattr(state, field) is not None:
+                if stage in state.stage_metrics:
+                    return {}
+                with stage_scope(stage, model=model) as metrics:
+                    record_cache_hit()
+                return {"stage_metrics": {stage: metrics}}
+
+            writer = get_stream_writer()
+            last_emitted = 0.0
+
+            def on_partial(partial: dict) -> None:
+                nonlocal last_emitted
+                now = time.monotonic()
+                if now - last_emitted >= STREAM_MIN_INTERVAL_SECONDS:
+                    last_emitted = now
+                    writer({"field": field, "partial": partial})
+
+            # The stage could start as soon as the last upstream stage finished
+            ready_at = max((metrics.finished_at for metrics in state.stage_metrics.values()), default=None)
+            writer({"stage_started": stage, "at": time.time()})
+            errors_before = len(state.errors)
+            with stage_scope(stage, model=model, ready_at=ready_at) as metrics, partial_output_listener(on_partial):
+                result = await agent.aprocess(state.model_copy(update={"errors": list(state.errors)}))
+            return {
+                field: getattr(result, field),
+                "errors": result.errors[errors_before:],
+                "stage_metrics": {stage: metrics},
+            }
+
+        return node
     
     def _create_workflow(self) -> StateGraph:
         """Create the CV review workflow using LangGraph."""
@@ -30,10 +129,10 @@ class CVReviewWorkflow:
         workflow = StateGraph(CVReviewState)
         
         # Add nodes
-        workflow.add_node("extract", self.extraction_agent.process)
-        workflow.add_node("analyze", self.analysis_agent.process)
-        workflow.add_node("feedback", self.feedback_agent.process)
-        workflow.add_node("recommend", self.recommendation_agent.process)
+        workflow.add_node("extract", self._stage_node("extraction", self.extraction_agent, "extracted_data"))
+        workflow.add_node("analyze", self._stage_node("analysis", self.analysis_agent, "analysis_results"))
+        workflow.add_node("feedback", self._stage_node("feedback", self.feedback_agent, "feedback"))
+        workflow.add_node("recommend", self._stage_node("recommendation", self.recommendation_agent, "recommendations"))
         
         # Set entry point
         workflow.set_entry_point("extract")
@@ -56,6 +155,12 @@ class CVReviewWorkflow:
             if state.errors:
                 return END
             return "recommend"
+
+        def should_fan_out_after_analysis(state: CVReviewState):
+            """Run feedback and recommendations together unless analysis failed."""
+            if state.errors:
+                return END
+            return ["feedback", "recommend"]
         
         # Add conditional edges
         workflow.add_conditional_edges(
@@ -66,6 +171,25 @@ class CVReviewWorkflow:
                 END: END
             }
         )
+
+        if self.parallel:
+            workflow.add_node("join", lambda state: {})
+
+            workflow.add_conditional_edges(
+                "analyze",
+                should_fan_out_after_analysis,
+                {
+                    "feedback": "feedback",
+                    "recommend": "recommend",
+                    END: END
+                }
+            )
+
+            # Wait for both branches, in whichever order they finish
+            workflow.add_edge(["feedback", "recommend"], "join")
+            workflow.add_edge("join", END)
+
+            return workflow.compile()
         
         workflow.add_conditional_edges(
             "analyze",
@@ -87,60 +211,240 @@ class CVReviewWorkflow:
         
         return workflow.compile()
     
-    def _map_node_name_to_processing_status(self, node_name: str) -> ProcessingStatus:
-        """Map node name to processing status."""
-        if node_name == "extract":
-            return ProcessingStatus.EXTRACTION_COMPLETE
-        elif node_name == "analyze":
-            return ProcessingStatus.ANALYSIS_COMPLETE
-        elif node_name == "feedback":
-            return ProcessingStatus.FEEDBACK_COMPLETE
-        elif node_name == "recommend":
+    def _processing_status_from_state(self) -> ProcessingStatus:
+        """Derive the processing status from which stage results are present.
+
+        Deriving it from the results rather than the node that just finished
+        keeps progress monotonic when parallel branches complete out of order.
+        """
+        if self.state.feedback and self.state.recommendations:
             return ProcessingStatus.RECOMMEND_COMPLETE
+        if self.state.feedback:
+            return ProcessingStatus.FEEDBACK_COMPLETE
+        if self.state.analysis_results:
+            return ProcessingStatus.ANALYSIS_COMPLETE
+        if self.state.extracted_data:
+            return ProcessingStatus.EXTRACTION_COMPLETE
+        return self.state.processing_status
     
     def _set_state_from_step(self, step: dict) -> None:
-        """Set the state from a step."""
-        for node_name, state_data in step.items():
-            self.state = CVReviewState(**state_data)
-            status = self._map_node_name_to_processing_status(node_name)
-            self.state.processing_status = status
+        """Merge the partial updates of a step into the state."""
+        for node_name, update in step.items():
+            if not update:
+                continue
+            update = dict(update)
+            errors = update.pop("errors", None) or []
+            new_metrics = update.pop("stage_metrics", None) or {}
+            stage_metrics = {**self.state.stage_metrics, **new_metrics}
+            partial_results = {field: partial for field, partial in self.state.partial_results.items() if field not in update}
+            self.state = self.state.model_copy(update={
+                **update,
+                "errors": self.state.errors + errors,
+                "stage_metrics": stage_metrics,
+                "partial_results": partial_results,
+            })
+            self.state.processing_status = self._processing_status_from_state()
+            for metrics in new_metrics.values():
+                self.state.progress = self.progress.stage_completed(metrics, self.state.processing_status)
     
     async def _run_workflow(self) -> AsyncGenerator[CVReviewState, None]:
         """Run the CV review workflow."""
         try:
-            async for step in self._workflow.astream(self.state):
-                self._set_state_from_step(step)
+            async for mode, chunk in self._workflow.astream(self.state, stream_mode=["updates", "custom"]):
+                if mode == "custom" and "stage_started" in chunk:
+                    progress = self.progress.stage_started(chunk["stage_started"], self.state.processing_status, chunk["at"])
+                    self.state = self.state.model_copy(update={"progress": progress})
+                elif mode == "custom":
+                    partial_results = {**self.state.partial_results, chunk["field"]: chunk["partial"]}
+                    # Copy rather than mutate: consumers may still be rendering the previous state
+                    self.state = self.state.model_copy(update={"partial_results": partial_results})
+                else:
+                    self._set_state_from_step(chunk)
                 yield self.state
 
         except Exception as e:
-            print("Error", e)
-            error_state = CVReviewState(
+            logger.exception("Review workflow failed for %s", self.state.file_name)
+            self.state = CVReviewState(
                 file_name=self.state.file_name,
+                file_hash=self.state.file_hash,
                 file_content=self.state.file_content,
+                stage_metrics=self.state.stage_metrics,
                 processing_status=ProcessingStatus.FAILED,
                 errors=[f"Workflow execution failed: {str(e)}"]
             )
-            yield error_state
+            yield self.state
+
+
+    def _read_file_bytes(self) -> bytes:
+        """Read the raw uploaded bytes, leaving the file positioned at the start."""
+        self.cv_file.seek(0)
+        data = self.cv_file.read()
+        self.cv_file.seek(0)
+        return data
+
+    def _pipeline_fingerprint(self) -> str:
+        """Fingerprint of every prompt, schema and model involved in a review."""
+        agents = (
+            self.extraction_agent,
+            self.analysis_agent,
+            self.feedback_agent,
+            self.recommendation_agent,
+        )
+        state_schema = json.dumps(CVReviewState.model_json_schema(), sort_keys=True)
+        graph_mode = "parallel" if self.parallel else "sequential"
+        text_budget = f"{MAX_PDF_PAGES}:{MAX_TEXT_CHARS}"
+        return hash_key(state_schema, graph_mode, text_budget, *(agent.fingerprint for agent in agents))
+
+    def _review_cache_key(self) -> str:
+        """Key a review on the file contents plus the pipeline that reviewed it."""
+        return hash_key(self.state.file_hash, self._pipeline_fingerprint())
+
+    def _load_cached_review(self) -> Optional[CVReviewState]:
+        """Return a finished review of identical content, if one is cached."""
+        if self._review_cache is None:
+            return None
+        try:
+            cached = self._review_cache.get(self._review_cache_key())
+            if cached is None:
+                return None
+            state = CVReviewState.model_validate_json(cached)
+        except Exception as e:
+            logger.warning("Ignoring unreadable cached review: %s", e)
+            return None
+        state.file_name = self.cv_file.name
+        state.processing_status = ProcessingStatus.COMPLETED
+        # Timings of the original run don't describe this one
+        state.stage_metrics = {}
+        return state
+
+    def _store_cached_review(self) -> None:
+        """Cache the finished review if every stage produced a real result."""
+        if self._review_cache is None:
+            return
+        state = self.state
+        if state.errors or not all((state.extracted_data, state.analysis_results, state.feedback, state.recommendations)):
+            return
+        if any(metrics.fallback_used for metrics in state.stage_metrics.values()):
+            return
+        try:
+            self._review_cache.set(self._review_cache_key(), state.model_dump_json())
+        except Exception as e:
+            logger.warning("Could not cache review: %s", e)
+
+    def _save_review(self) -> None:
+        """Queue the finished review for the history store; the write happens off the review path."""
+        store = get_review_store()
+        if store is not None:
+            store.save_in_background(self.state)
 
+    def _complete(self) -> None:
+        """Mark the review finished, then cache and store it."""
+        self.state.processing_status = ProcessingStatus.COMPLETED
+        self.state.pipeline_fingerprint = self._pipeline_fingerprint()
+        self._store_cached_review()
+        self._save_review()
+
+    def _hash_file(self) -> str:
+        return hashlib.sha256(self._read_file_bytes()).hexdigest()
 
-    def _process_file(self) -> None:
-        """Process the file."""
-        file_name, file_content = process_uploaded_file(self.cv_file)
+    async def _process_file(self) -> None:
+        """Process the file on an executor so parsing doesn't block the event loop."""
+        loop = asyncio.get_running_loop()
+        self.state.progress = self.progress.stage_started("file_processing", self.state.processing_status)
+        with stage_scope("file_processing") as metrics:
+            file_name, file_content = await loop.run_in_executor(None, process_uploaded_file, self.cv_file)
         self.state.file_name = file_name
         self.state.file_content = file_content
+        self.state.stage_metrics = {**self.state.stage_metrics, "file_processing": metrics}
         self.state.processing_status = ProcessingStatus.PROCESSED_FILE_COMPLETE
+        self.state.progress = self.progress.stage_completed(metrics, self.state.processing_status)
     
+    def _find_revision_base(self, pre_extracted: PreExtractedCV) -> Optional[CVReviewState]:
+        store = get_review_store()
+        if store is None:
+            return None
+        candidates = store.recent_for_candidate(email=pre_extracted.email, name=pre_extracted.name)
+        return find_revision_base(self.state.file_content, candidates, self._pipeline_fingerprint())
+
+    async def _reuse_earlier_review(self) -> bool:
+        """Carry over what a revision leaves unchanged from a stored review of the same CV.
+
+        Only the sections that differ from the earlier version are extracted
+        and patched into its data. If the data comes out the same, the
+        earlier analysis, feedback and recommendations are kept as well;
+        otherwise the graph runs them again. Returns whether anything was
+        reused; if not, the graph reviews the whole CV.
+        """
+        cv_text = self.state.file_content
+        if not INCREMENTAL_REVIEW_ENABLED or not cv_text:
+            return False
+        pre_extracted = pre_extract(cv_text)
+        if not pre_extracted.sections:
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            base = await loop.run_in_executor(None, self._find_revision_base, pre_extracted)
+        except Exception as e:
+            logger.warning("Could not look up earlier reviews: %s", e)
+            return False
+        if base is None:
+            return False
+        groups = changed_groups(base.extracted_data.raw_text, pre_extracted)
+        present = {SECTION_GROUPS[label] for label in pre_extracted.sections if label in SECTION_GROUPS}
+        if present <= groups:
+            return False
+
+        self.state.progress = self.progress.stage_started("extraction", self.state.processing_status)
+        model = getattr(self.extraction_agent.llm, "model", None)
+        with stage_scope("extraction", model=model) as metrics:
+            sections_text = changed_sections_text(pre_extracted, groups)
+            try:
+                partial = await self.extraction_agent.aextract_sections(sections_text) if sections_text else None
+            except Exception as e:
+                logger.warning("Re-extracting the changed sections of %s failed, reviewing it in full: %r",
+                               self.state.file_name, e)
+                return False
+            if not groups:
+                record_cache_hit()
+        extracted_data = patch_extracted_data(base.extracted_data, partial, groups, pre_extracted, cv_text)
+
+        update = {"extracted_data": extracted_data, "stage_metrics": {**self.state.stage_metrics, "extraction": metrics}}
+        unchanged = canonical_json(extracted_data) == canonical_json(base.extracted_data)
+        if unchanged:
+            update.update(analysis_results=base.analysis_results, feedback=base.feedback,
+                          recommendations=base.recommendations)
+        logger.info("Revision of %s: re-extracted %s, %s downstream stages", self.state.file_name,
+                    ", ".join(sorted(groups)) or "nothing", "reused" if unchanged else "re-running")
+        self.state = self.state.model_copy(update=update)
+        self.state.processing_status = self._processing_status_from_state()
+        self.state.progress = self.progress.stage_completed(metrics, self.state.processing_status)
+        return True
+
     async def run_async(self) -> AsyncGenerator[CVReviewState, None]:
         """Run the CV review workflow asynchronously with real-time status updates."""
+        loop = asyncio.get_running_loop()
+        self.state.file_hash = await loop.run_in_executor(None, self._hash_file)
         yield self.state
 
-        self._process_file()
+        cached_state = self._load_cached_review()
+        if cached_state is not None:
+            self.state = cached_state
+            yield self.state
+            return
+
+        await self._process_file()
         yield self.state
+
+        if await self._reuse_earlier_review():
+            yield self.state
        
         async for state in self._run_workflow():
             yield state
 
-        self.state.processing_status = ProcessingStatus.COMPLETED
+        if self.state.processing_status == ProcessingStatus.FAILED:
+            return
+
+        self._complete()
         yield self.state
 
 
@@ -1,4 +1,5 @@
-from typing import List, Optional, Dict, Any
+import operator
+from typing import Annotated, List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from datetime import date
 from enum import Enum
@@ -93,12 +94,107 @@ class ProcessingStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class StageMetrics(BaseModel):
+    stage: str
+    model: Optional[str] = Field(default=None, description="Main model of the stage; costs use each call's own model")
+    started_at: float = Field(description="Unix time the stage started")
+    wall_seconds: float = 0.0
+    queue_seconds: float = Field(default=0.0, description="Time between the upstream stage finishing and this one starting")
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    llm_calls: int = 0
+    retries: int = 0
+    cache_hit: bool = False
+    escalated: bool = Field(default=False, description="A fast-model result failed validation and was redone")
+    fallback_used: bool = False
+    cost_usd: float = 0.0
+
+    @property
+    def finished_at(self) -> float:
+        return self.started_at + self.wall_seconds
+
+
+class ProgressEvent(BaseModel):
+    event: str = Field(description="stage_started or stage_completed")
+    stage: str
+    status: ProcessingStatus
+    fraction: float = Field(ge=0, le=1, description="Share of the expected work done")
+    eta_seconds: float
+    elapsed_seconds: float
+    timestamp: float
+
+
+class ReviewSummary(BaseModel):
+    review_id: int
+    file_hash: Optional[str] = None
+    file_name: Optional[str] = None
+    candidate_name: Optional[str] = None
+    candidate_email: Optional[str] = None
+    overall_score: Optional[float] = None
+    seniority_level: Optional[str] = None
+    created_at: float = Field(description="Unix time the review was stored")
+
+
+class ReviewPage(BaseModel):
+    items: List[ReviewSummary] = Field(default_factory=list)
+    total: int = Field(description="Reviews matching the query across all pages")
+    page: int
+    page_size: int
+
+
+class JobFit(BaseModel):
+    fit_score: float = Field(ge=0, le=100, description="How well the candidate fits the job, out of 100")
+    matching_requirements: List[str] = Field(default_factory=list)
+    missing_requirements: List[str] = Field(default_factory=list)
+    summary: str
+
+
+class CandidateMatch(BaseModel):
+    review_id: int
+    candidate_name: Optional[str] = None
+    candidate_email: Optional[str] = None
+    file_name: Optional[str] = None
+    lexical_score: float = Field(description="BM25 score of the CV against the job description")
+    matched_terms: List[str] = Field(default_factory=list)
+    fit: Optional[JobFit] = Field(default=None, description="Model assessment, for shortlisted candidates only")
+
+
+class SkillRequirement(BaseModel):
+    skill: str
+    min_level: Optional[SkillLevel] = None
+    min_years: Optional[float] = Field(default=None, ge=0)
+    weight: float = Field(default=1.0, gt=0)
+
+
+class SkillMatch(BaseModel):
+    review_id: int
+    candidate_name: Optional[str] = None
+    candidate_email: Optional[str] = None
+    file_name: Optional[str] = None
+    score: float = Field(ge=0, le=1, description="Weighted share of the requirements met")
+    strength: float = Field(description="Weighted levels and years of the required skills, to rank equal scores")
+    met: List[str] = Field(default_factory=list)
+    missing: List[str] = Field(default_factory=list)
+
+
 class CVReviewState(BaseModel):
     file_name: Optional[str] = None
+    file_hash: Optional[str] = None
     file_content: Optional[str] = None
     extracted_data: Optional[ExtractedCVData] = None
     analysis_results: Optional[AnalysisResult] = None
     feedback: Optional[Feedback] = None
     recommendations: Optional[Recommendation] = None
-    errors: List[str] = Field(default_factory=list)
-    processing_status: ProcessingStatus = ProcessingStatus.PENDING
\ No newline at end of file
+    # Prompts, schemas and models that produced the review; an earlier review is only reused if it matches
+    pipeline_fingerprint: Optional[str] = None
+    # Reducer lets parallel graph branches report errors in the same step
+    errors: Annotated[List[str], operator.add] = Field(default_factory=list)
+    processing_status: ProcessingStatus = ProcessingStatus.PENDING
+    # Per-stage timings and usage; parallel branches add their own keys
+    stage_metrics: Annotated[Dict[str, StageMetrics], operator.or_] = Field(default_factory=dict)
+    # Partially streamed output of stages still running, keyed by state field
+    partial_results: Dict[str, Dict[str, Any]] = Field(default_factory=dict, exclude=True)
+    # Latest progress event of the running review
+    progress: Optional[ProgressEvent] = Field(default=None, exclude=True)
\ No newline at end of file
@@ -1,9 +1,56 @@
 import streamlit as st
 import json
-from typing import Optional
+from typing import Optional, Type, get_origin
+from pydantic import BaseModel, ValidationError
 from app.models import CVReviewState, ExtractedCVData, AnalysisResult, Feedback, Recommendation
 
 
+def _placeholder(annotation):
+    """Neutral value for a required field that hasn't been streamed yet."""
+    origin = get_origin(annotation) or annotation
+    if origin is str:
+        return ""
+    if origin in (int, float):
+        return 0
+    if origin is list:
+        return []
+    if origin is dict:
+        return {}
+    return None
+
+
+def build_partial_model(model_cls: Type[BaseModel], data: dict) -> Optional[BaseModel]:
+    """Build a renderable model from partially streamed JSON.
+
+    Missing required fields get neutral placeholders and incomplete items of
+    nested lists (e.g. an experience whose company hasn't arrived) are dropped.
+    """
+    values = {}
+    for name, field in model_cls.model_fields.items():
+        if name in data:
+            values[name] = data[name]
+        elif field.is_required():
+            values[name] = _placeholder(field.annotation)
+
+    for _ in range(3):
+        try:
+            return model_cls.model_validate(values)
+        except ValidationError as e:
+            bad_items = {}
+            for error in e.errors():
+                loc = error["loc"]
+                name = loc[0]
+                if len(loc) > 1 and isinstance(loc[1], int) and isinstance(values.get(name), list):
+                    bad_items.setdefault(name, set()).add(loc[1])
+                elif model_cls.model_fields[name].is_required():
+                    values[name] = _placeholder(model_cls.model_fields[name].annotation)
+                else:
+                    values.pop(name, None)
+            for name, indexes in bad_items.items():
+                values[name] = [item for i, item in enumerate(values[name]) if i not in indexes]
+    return None
+
+
 
 def dict_to_markdown(data: dict, indent: int = 0) -> str:
     """Convert dictionary to markdown key-value format."""
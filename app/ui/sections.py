@@ -1,9 +1,10 @@
+from datetime import datetime
+
 import streamlit as st
-import asyncio
-import time
 from streamlit_pdf_viewer import pdf_viewer
-from app.models import CVReviewState
+from app.models import CVReviewState, ExtractedCVData, AnalysisResult, Feedback, Recommendation
 from app.ui.components import (
+    build_partial_model,
     render_processing_status, 
     render_extracted_data, 
     render_analysis_results, 
@@ -13,6 +14,8 @@ from app.ui.components import (
     render_errors
 )
 from app.graph.workflow import CVReviewWorkflow
+from app.utils.event_loop import iterate_in_background
+from app.utils.review_store import get_review_store
 from .session_state import (
     set_uploaded_file, 
     has_file_uploaded, 
@@ -22,7 +25,8 @@ from .session_state import (
     set_progress,
     get_current_progress,
     set_cv_review_result,
-    get_processing_status
+    get_processing_status,
+    open_past_review
 )
 
 def render_about_section():
@@ -164,8 +168,21 @@ def get_completed_text(status: ProcessingStatus):
 def get_progressing_text(status: ProcessingStatus):
     return PROGRESSING_TEXT_MAP[PROGRESS.index(status)]
 
-def calculate_progress(status: ProcessingStatus):
-    return PROGRESS.index(status) / len(PROGRESS) * 100
+def format_eta(eta_seconds: float) -> str:
+    if eta_seconds < 1:
+        return "⏱️ Almost done..."
+    if eta_seconds < 60:
+        return f"⏱️ About {eta_seconds:.0f}s remaining"
+    return f"⏱️ About {eta_seconds / 60:.0f} min remaining"
+
+# Live result sections in display order: state field -> (model, renderer)
+STAGE_RENDERERS = {
+    "extracted_data": (ExtractedCVData, render_extracted_data),
+    "analysis_results": (AnalysisResult, render_analysis_results),
+    "feedback": (Feedback, render_feedback),
+    "recommendations": (Recommendation, render_recommendations),
+}
+
 
 def build_progress_text(status: ProcessingStatus):
     progressing_step = status
@@ -187,30 +204,51 @@ def render_processing_progress_section():
             progress_bar = st.progress(0)
             status_text = st.empty()
 
-            def refresh_progress(progress: int, texts: list[str]):
-                progress_bar.progress(progress / 100)
+            results_area = st.container(height=600)
+            stage_placeholders = {field: results_area.empty() for field in STAGE_RENDERERS}
+            finished_stages = set()
+
+            def refresh_progress(fraction: float, texts: list[str]):
+                progress_bar.progress(fraction)
                 with status_text.container():
                     for text in texts:
                         st.text(text)
 
-            async def process_cv():
+            def refresh_results(state: CVReviewState):
+                """Render each stage as it streams, and for good once it finishes."""
+                for field, (model_cls, render) in STAGE_RENDERERS.items():
+                    if field in finished_stages:
+                        continue
+                    model = getattr(state, field)
+                    if model is not None:
+                        finished_stages.add(field)
+                    elif field in state.partial_results:
+                        model = build_partial_model(model_cls, state.partial_results[field])
+                    if model is not None:
+                        with stage_placeholders[field].container():
+                            render(model)
+
+            def process_cv():
                 workflow = CVReviewWorkflow(st.session_state.uploaded_file)
-                async for state in workflow.run_async():
+                last_progress = None
+                # Run on the shared background loop so pooled connections are reused across reruns
+                for state in iterate_in_background(workflow.run_async()):
 
                     if state.processing_status == ProcessingStatus.FAILED:
                         refresh_progress(0, ["❌ Processing failed"])
                         st.stop()
 
-                    if state.processing_status in PROGRESS:
-                        refresh_progress(calculate_progress(state.processing_status), build_progress_text(state.processing_status))
-                        # Small delay to show progress
-                        await asyncio.sleep(0.5)
+                    refresh_results(state)
+
+                    # Progress events arrive as stages start and finish; redraw only on a new one
+                    if state.progress is not None and state.progress is not last_progress and state.processing_status in PROGRESS:
+                        last_progress = state.progress
+                        texts = build_progress_text(state.processing_status) + [format_eta(state.progress.eta_seconds)]
+                        refresh_progress(state.progress.fraction, texts)
                 
                 return workflow.state
 
-            result = asyncio.run(process_cv())
-            
-            time.sleep(0.5)
+            result = process_cv()
 
             progress_bar.empty()
             status_text.empty()
@@ -223,6 +261,42 @@ def render_processing_progress_section():
         set_processing_status('failed')
         st.stop()
 
+HISTORY_PAGE_SIZE = 10
+
+
+def render_history_section():
+    """Render past reviews from the review store, newest first."""
+    store = get_review_store()
+    if store is None:
+        return
+
+    st.header("🗂️ Past Reviews")
+    name = st.text_input("Candidate name", placeholder="Starts with...")
+    min_score = st.slider("Minimum score", 0, 100, 0, step=5)
+    seniority = st.text_input("Seniority level", placeholder="e.g. senior")
+    page_number = st.number_input("Page", min_value=1, value=1, step=1)
+
+    page = store.query(
+        name=name or None,
+        min_score=min_score or None,
+        seniority=seniority or None,
+        page=int(page_number),
+        page_size=HISTORY_PAGE_SIZE,
+    )
+    if not page.items:
+        st.caption("No stored reviews match.")
+        return
+
+    st.caption(f"{page.total} reviews")
+    for summary in page.items:
+        score = f"{summary.overall_score:.0f}" if summary.overall_score is not None else "–"
+        reviewed_at = datetime.fromtimestamp(summary.created_at).strftime("%Y-%m-%d %H:%M")
+        label = f"{summary.candidate_name or summary.file_name} · {score} · {reviewed_at}"
+        if st.button(label, key=f"past-review-{summary.review_id}", use_container_width=True):
+            state = store.get(summary.review_id)
+            if state is not None:
+                open_past_review(state)
+
 def render_left_section():
     if has_file_uploaded():
         render_file_preview_section(st.session_state.uploaded_file)
@@ -232,6 +306,10 @@ def render_left_section():
 def render_right_section():
     processing_status = get_processing_status()
 
+    if processing_status == 'history':
+        render_complete_results_section(st.session_state.cv_review_result)
+        return
+
     if has_file_uploaded():
         if processing_status == 'pending':
             render_processing_actions_section()
@@ -20,11 +20,11 @@ def set_progress(progress: int, status_text: str):
 def get_current_progress() -> tuple[int, str]:
     return st.session_state.progress
 
-def set_processing_status(processing_status: Literal['pending', 'processing', 'completed', 'failed']):
+def set_processing_status(processing_status: Literal['pending', 'processing', 'completed', 'failed', 'history']):
     st.session_state.processing_status = processing_status
     st.rerun()
 
-def get_processing_status() -> Literal['pending', 'processing', 'completed', 'failed']:
+def get_processing_status() -> Literal['pending', 'processing', 'completed', 'failed', 'history']:
     return st.session_state.get('processing_status', 'pending')
 
 def set_uploaded_file(uploaded_file):
@@ -38,3 +38,10 @@ def clear_uploaded_file():
 
 def has_file_uploaded() -> bool:
     return st.session_state.get('uploaded_file', None) is not None
+
+
+def open_past_review(cv_review_result: CVReviewState):
+    """Show a stored review in place of the current upload."""
+    st.session_state.uploaded_file = None
+    st.session_state.cv_review_result = cv_review_result
+    set_processing_status('history')
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CV_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_DIR = os.getenv("CV_CACHE_DIR", ".cache/cv-reviewer")
+CACHE_TTL_SECONDS = int(os.getenv("CV_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_DISK_MB = int(os.getenv("CV_CACHE_MAX_DISK_MB", "256"))
+CACHE_MEMORY_ITEMS = int(os.getenv("CV_CACHE_MEMORY_ITEMS", "128"))
+
+
+def hash_key(*parts) -> str:
+    """Build a stable SHA-256 key from str/bytes parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        # Hash each part separately so ("ab", "c") and ("a", "bc") differ
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+def prompt_fingerprint(prompt, output_model: Type[BaseModel], llm, tool: Optional[dict] = None) -> str:
+    """Fingerprint a prompt template, its output schema and tool, and the model serving it."""
+    placeholders = {name: "{" + name + "}" for name in prompt.input_variables}
+    schema = json.dumps(output_model.model_json_schema(), sort_keys=True)
+    model_name = getattr(llm, "model", None) or type(llm).__name__
+    return hash_key(prompt.format(**placeholders), schema, json.dumps(tool, sort_keys=True), model_name)
+
+
+class MemoryLRU:
+    """Thread-safe in-memory LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_items: int, ttl_seconds: int):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = (time.time(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class DiskCache:
+    """File-per-entry cache with TTL and total-size based eviction."""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                self._remove(path)
+                return None
+            value = path.read_text(encoding="utf-8")
+            # Touch on read so eviction drops the least recently used entries
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Disk cache read failed for %s: %s", path, e)
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        data = value.encode("utf-8")
+        with self._lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                previous_size = path.stat().st_size if path.exists() else 0
+                tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning("Disk cache write failed for %s: %s", path, e)
+                return
+
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data) - previous_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._entries():
+                self._remove(path)
+            self._size = 0
+
+    def _entries(self) -> list:
+        if not self.directory.exists():
+            return []
+        return list(self.directory.glob("*/*.json"))
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the oldest ones until under the size limit."""
+        now = time.time()
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+        self._size = total
+
+
+class TieredCache:
+    """In-memory LRU tier in front of an optional on-disk tier."""
+
+    def __init__(self, memory: MemoryLRU, disk: Optional[DiskCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_review_cache: Optional[TieredCache] = None
+
+
+def get_review_cache() -> Optional[TieredCache]:
+    """Get the process-wide cache of complete CV reviews, or None if disabled."""
+    global _review_cache
+    if not CACHE_ENABLED:
+        return None
+    if _review_cache is None:
+        _review_cache = TieredCache(
+            MemoryLRU(CACHE_MEMORY_ITEMS, CACHE_TTL_SECONDS),
+            DiskCache(
+                os.path.join(CACHE_DIR, "reviews"),
+                CACHE_MAX_DISK_MB * 1024 * 1024,
+                CACHE_TTL_SECONDS,
+            ),
+        )
+    return _review_cache
@@ -0,0 +1,199 @@
+import re
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"(?<![\w])(?:\+?\d[\d\s().-]{7,}\d)(?![\w])")
+LABELLED_LOCATION_RE = re.compile(r"^\s*(?:location|address|based in)\s*[:\-]\s*(.+)$", re.IGNORECASE)
+CITY_COUNTRY_RE = re.compile(r"^[A-Z][\w.' -]+,\s*[A-Z][\w.' -]+$")
+NAME_RE = re.compile(r"^[A-Z][\w.'-]*(?:\s+[A-Z][\w.'-]*){1,3}$")
+HEADER_SEPARATOR_RE = re.compile(r"\s*[|•·]\s*")
+URL_RE = re.compile(r"(?:https?://|www\.|linkedin\.com/|github\.com/)\S*", re.IGNORECASE)
+CONTACT_LABEL_RE = re.compile(r"\b(?:e-?mail|phone|tel|mobile|cell|web|website|linkedin|github)\b|[\s:.,()]", re.IGNORECASE)
+
+# Titles a CV may open with, which must not be taken for the candidate's name
+DOCUMENT_TITLES = {"curriculum vitae", "resume", "résumé", "cv", "profile"}
+
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "professional profile", "about me", "objective", "career objective"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "career history"],
+    "education": ["education", "academic background", "education and training", "qualifications"],
+    "skills": ["skills", "technical skills", "core skills", "key skills", "competencies", "core competencies", "technologies"],
+    "certifications": ["certifications", "certificates", "licenses", "licenses and certifications", "courses"],
+    "languages": ["languages", "language skills"],
+    "projects": ["projects", "selected projects", "key projects"],
+    "publications": ["publications", "research", "papers"],
+    "awards": ["awards", "honors", "honours", "awards and honors"],
+    "interests": ["interests", "hobbies", "hobbies and interests"],
+    "references": ["references", "referees"],
+}
+_HEADING_LOOKUP = {variant: label for label, variants in SECTION_HEADINGS.items() for variant in variants}
+_HEADING_RE = re.compile(r"^\s*([A-Za-z&' ]{3,40}?)\s*:?\s*$")
+
+# Sections whose content the extraction model has to structure
+LLM_SECTIONS = ("summary", "experience", "projects", "education", "skills", "certifications", "languages")
+
+
+class PreExtractedCV(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    location: Optional[str] = None
+    header: str = ""
+    sections: Dict[str, str] = Field(default_factory=dict)
+
+    def header_text(self) -> str:
+        """The header lines the extraction model needs.
+
+        That is the whole header if we couldn't read the contact details
+        ourselves, otherwise only the lines that aren't contact details, such
+        as an unheaded summary.
+        """
+        if not (self.name and (self.email or self.phone)):
+            return self.header
+        lines = []
+        for line in self.header.splitlines():
+            parts = [part for part in HEADER_SEPARATOR_RE.split(line.strip()) if part and not self._is_contact(part)]
+            if parts:
+                lines.append(" | ".join(parts))
+        return "\n".join(lines)
+
+    def _is_contact(self, part: str) -> bool:
+        if part in (self.name, self.location) or _is_document_title(part) or LABELLED_LOCATION_RE.match(part):
+            return True
+        remainder = URL_RE.sub("", EMAIL_RE.sub("", part))
+        remainder = PHONE_RE.sub(lambda m: "" if _is_phone(m.group(0)) else m.group(0), remainder)
+        return not CONTACT_LABEL_RE.sub("", remainder)
+
+    def llm_text(self) -> Optional[str]:
+        """Text the extraction model still needs, or None if no sections were found."""
+        if not any(label in self.sections for label in LLM_SECTIONS):
+            return None
+        parts = []
+        header = self.header_text()
+        if header:
+            parts.append(header)
+        for label in LLM_SECTIONS:
+            if label in self.sections:
+                parts.append(f"{label.upper()}\n{self.sections[label]}")
+        return "\n\n".join(parts)
+
+
+def detect_heading(line: str) -> Optional[str]:
+    """Return the section label if the line is a known section heading."""
+    match = _HEADING_RE.match(line)
+    if not match:
+        return None
+    return _HEADING_LOOKUP.get(" ".join(match.group(1).lower().replace("&", "and").split()))
+
+
+def split_sections(text: str) -> tuple:
+    """Split CV text into the header before the first heading and labelled sections."""
+    header: List[str] = []
+    sections: Dict[str, List[str]] = {}
+    current = None
+    for line in text.splitlines():
+        label = detect_heading(line)
+        if label is not None:
+            current = label
+            sections.setdefault(current, [])
+        elif current is None:
+            header.append(line)
+        else:
+            sections[current].append(line)
+    return (
+        "\n".join(header).strip(),
+        {label: "\n".join(lines).strip() for label, lines in sections.items() if "".join(lines).strip()},
+    )
+
+
+def _is_document_title(text: str) -> bool:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split()) in DOCUMENT_TITLES
+
+
+def _is_phone(text: str) -> bool:
+    # Require enough digits to rule out date ranges such as "2010 - 2014"
+    return sum(c.isdigit() for c in text) >= 9
+
+
+def _find_name(header_lines: List[str]) -> Optional[str]:
+    for line in header_lines[:5]:
+        candidate = HEADER_SEPARATOR_RE.split(line.strip())[0]
+        if _is_document_title(candidate):
+            continue
+        if NAME_RE.match(candidate) and not EMAIL_RE.search(candidate) and detect_heading(candidate) is None:
+            return candidate
+    return None
+
+
+def _find_location(header_lines: List[str]) -> Optional[str]:
+    for line in header_lines:
+        labelled = LABELLED_LOCATION_RE.match(line)
+        if labelled:
+            return labelled.group(1).strip()
+        for part in HEADER_SEPARATOR_RE.split(line.strip()):
+            if CITY_COUNTRY_RE.match(part) and not EMAIL_RE.search(part):
+                return part
+    return None
+
+
+def pre_extract(text: str) -> PreExtractedCV:
+    """Read contact details and section structure with regexes, without an LLM call."""
+    header, sections = split_sections(text)
+    # Without headings the whole CV is "header"; only trust its first lines for contacts
+    header_lines = [line for line in header.splitlines() if line.strip()][:10]
+    contact_text = "\n".join(header_lines) or text[:1000]
+
+    email = EMAIL_RE.search(contact_text)
+    phone = next((m.group(0) for m in PHONE_RE.finditer(contact_text) if _is_phone(m.group(0))), None)
+    return PreExtractedCV(
+        name=_find_name(header_lines),
+        email=email.group(0) if email else None,
+        phone=" ".join(phone.split()) if phone else None,
+        location=_find_location(header_lines),
+        header=header,
+        sections=sections,
+    )
+
+
+def _split_paragraphs(text: str, target_chars: int) -> List[str]:
+    """Split text on blank lines into pieces of at most roughly target_chars."""
+    pieces, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        if current and len(current) + len(paragraph) > target_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(pre_extracted: PreExtractedCV, cv_text: str, target_chars: int) -> List[str]:
+    """Split a CV into section-aligned chunks of roughly target_chars each.
+
+    Small sections are packed together; a section larger than the target is
+    split on paragraph boundaries and each piece keeps its section heading.
+    """
+    blocks = []
+    if pre_extracted.llm_text() is None:
+        blocks = _split_paragraphs(cv_text, target_chars)
+    else:
+        header = pre_extracted.header_text()
+        if header:
+            blocks.append(header)
+        for label in LLM_SECTIONS:
+            if label in pre_extracted.sections:
+                for piece in _split_paragraphs(pre_extracted.sections[label], target_chars):
+                    blocks.append(f"{label.upper()}\n{piece}")
+
+    chunks, current = [], ""
+    for block in blocks:
+        if current and len(current) + len(block) > target_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{block}" if current else block
+    if current:
+        chunks.append(current)
+    return chunks
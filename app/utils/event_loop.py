@@ -0,0 +1,58 @@
+import asyncio
+import queue
+import threading
+from typing import AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_DONE = object()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the long-lived event loop shared by synchronous callers such as Streamlit.
+
+    Pooled async HTTP connections are bound to the loop that opened them, so
+    running every review on one loop (instead of a fresh `asyncio.run` per
+    Streamlit rerun) is what lets them be reused.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="cv-reviewer-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+def run_in_background(coro: Coroutine) -> T:
+    """Run a coroutine on the background loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result()
+
+
+def iterate_in_background(agen: AsyncIterator[T]) -> Iterator[T]:
+    """Drive an async generator on the background loop and yield its items here."""
+    items: "queue.Queue[tuple]" = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((_DONE, e))
+        else:
+            items.put((_DONE, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_background_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
@@ -1,48 +1,86 @@
 import io
+import logging
+import os
 import PyPDF2
 from docx import Document
-from typing import Optional, Tuple
-import streamlit as st
+from typing import Iterator, Tuple
+
+logger = logging.getLogger(__name__)
 
 MAX_FILE_SIZE_MB = 20
+# CVs past these limits are almost always attachment dumps; stop reading there
+MAX_PDF_PAGES = int(os.getenv("CV_MAX_PDF_PAGES", "15"))
+MAX_TEXT_CHARS = int(os.getenv("CV_MAX_TEXT_CHARS", "60000"))
+
+
+def iter_pdf_pages(pdf_file, max_pages: int = MAX_PDF_PAGES, max_chars: int = MAX_TEXT_CHARS) -> Iterator[str]:
+    """Yield the text of each PDF page lazily, stopping at the page or character budget."""
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    total_chars = 0
+    for page_number, page in enumerate(pdf_reader.pages):
+        if page_number >= max_pages:
+            logger.info("PDF truncated at the %d page limit", max_pages)
+            return
+        text = page.extract_text() or ""
+        remaining = max_chars - total_chars
+        if len(text) >= remaining:
+            logger.info("PDF truncated at the %d character limit", max_chars)
+            yield text[:remaining]
+            return
+        total_chars += len(text)
+        yield text
+
 
-def extract_text_from_pdf(pdf_file) -> str:
+def extract_text_from_pdf(pdf_file, max_pages: int = MAX_PDF_PAGES, max_chars: int = MAX_TEXT_CHARS) -> str:
     """Extract text from PDF file."""
     try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        return "\n".join(iter_pdf_pages(pdf_file, max_pages, max_chars)).strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from PDF: {str(e)}")
 
 
-def extract_text_from_docx(docx_file) -> str:
+def extract_text_from_docx(docx_file, max_chars: int = MAX_TEXT_CHARS) -> str:
     """Extract text from DOCX file."""
     try:
         doc = Document(docx_file)
-        text = ""
+        paragraphs = []
+        total_chars = 0
         for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+            paragraphs.append(paragraph.text)
+            total_chars += len(paragraph.text) + 1
+            if total_chars >= max_chars:
+                break
+        return "\n".join(paragraphs)[:max_chars].strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from DOCX: {str(e)}")
 
 
-def extract_text_from_txt(txt_file) -> str:
+def extract_text_from_txt(txt_file, max_chars: int = MAX_TEXT_CHARS) -> str:
     """Extract text from TXT file."""
     try:
         text = txt_file.read().decode('utf-8')
-        return text.strip()
+        return text[:max_chars].strip()
     except Exception as e:
         raise ValueError(f"Error extracting text from TXT: {str(e)}")
 
 
+def get_file_size(uploaded_file) -> int:
+    """Size of an uploaded file in bytes, without reading it."""
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        position = uploaded_file.tell()
+        size = uploaded_file.seek(0, io.SEEK_END)
+        uploaded_file.seek(position)
+    return size
+
+
 def process_uploaded_file(uploaded_file) -> Tuple[str, str]:
     """Process uploaded file and extract text content."""
     if uploaded_file is None:
         raise ValueError("No file uploaded")
+
+    if get_file_size(uploaded_file) > MAX_FILE_SIZE_MB * 1024 * 1024:
+        raise ValueError(f"File is too large. The maximum size is {MAX_FILE_SIZE_MB} MB.")
     
     file_name = uploaded_file.name
     file_extension = file_name.lower().split('.')[-1]
@@ -1,30 +1,225 @@
+import asyncio
+import logging
 import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.ai import add_usage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+from app.utils.metrics import record_retry
+from app.utils.prompt_payload import estimate_tokens
+from app.utils.rate_limit import MAX_RETRIES, RateGovernor, get_rate_governor, is_retryable, retry_delay
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
+DEFAULT_MAX_TOKENS = 4000
+DEFAULT_TEMPERATURE = 0.1
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("ANTHROPIC_TIMEOUT_SECONDS", "120"))
+
+# Stage-specific defaults; anything not listed uses the defaults above
+STAGE_DEFAULTS = {
+    # First tier of tiered extraction: a small, fast model
+    "extraction_fast": {"model": "claude-haiku-4-5-20251001"},
+}
+
+_chat_models: Dict[Tuple[str, int, float], ChatAnthropic] = {}
+_chat_models_lock = threading.Lock()
+
+
+def _result_usage(result: ChatResult) -> Optional[dict]:
+    usage = None
+    for generation in result.generations:
+        usage = add_usage(usage, getattr(generation.message, "usage_metadata", None))
+    return usage
+
+
+class GovernedChatAnthropic(ChatAnthropic):
+    """ChatAnthropic whose calls go through the shared rate governor.
+
+    Every call first reserves a request and its estimated input and output
+    tokens, so concurrent reviews queue for quota instead of being rejected.
+    Rate limits, overloads, server errors and timeouts are retried here with
+    the SDK's own retries turned off; a stream is only retried if it fails
+    before yielding anything.
+    """
+
+    governor: Optional[RateGovernor] = Field(default=None, exclude=True)
+
+    def _get_governor(self) -> RateGovernor:
+        return self.governor or get_rate_governor()
+
+    def _reservation(self, messages: List[BaseMessage]) -> tuple:
+        return estimate_tokens("".join(str(message.content) for message in messages)), self.max_tokens
+
+    def _on_error(self, error: Exception, attempt: int, governor: RateGovernor, reservation: tuple) -> float:
+        """Return the delay before the next attempt, or re-raise if the error is final."""
+        governor.settle(*reservation, None)
+        if attempt >= MAX_RETRIES or not is_retryable(error):
+            raise error
+        delay = retry_delay(error, attempt, governor)
+        record_retry()
+        logger.warning("model=%s attempt=%d retrying after %r", self.model, attempt + 1, error)
+        return delay
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            # Routed to _stream, which is governed itself
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        governor = self._get_governor()
+        reservation = self._reservation(messages)
+        for attempt in range(MAX_RETRIES + 1):
+            governor.acquire(*reservation)
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, governor, reservation))
+                continue
+            governor.settle(*reservation, _result_usage(result))
+            return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        governor = self._get_governor()
+        reservation = self._reservation(messages)
+        for attempt in range(MAX_RETRIES + 1):
+            await governor.aacquire(*reservation)
+            try:
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, governor, reservation))
+                continue
+            governor.settle(*reservation, _result_usage(result))
+            return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        governor = self._get_governor()
+        reservation = self._reservation(messages)
+        for attempt in range(MAX_RETRIES + 1):
+            governor.acquire(*reservation)
+            chunks = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                time.sleep(self._on_error(e, attempt, governor, reservation))
+                continue
+            usage = None
+            try:
+                for chunk in ([first] if first is not None else []):
+                    usage = add_usage(usage, chunk.message.usage_metadata)
+                    yield chunk
+                for chunk in chunks:
+                    usage = add_usage(usage, chunk.message.usage_metadata)
+                    yield chunk
+            finally:
+                governor.settle(*reservation, usage)
+            return
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        governor = self._get_governor()
+        reservation = self._reservation(messages)
+        for attempt in range(MAX_RETRIES + 1):
+            await governor.aacquire(*reservation)
+            chunks = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first = await anext(chunks, None)
+            except Exception as e:
+                await asyncio.sleep(self._on_error(e, attempt, governor, reservation))
+                continue
+            usage = None
+            try:
+                for chunk in ([first] if first is not None else []):
+                    usage = add_usage(usage, chunk.message.usage_metadata)
+                    yield chunk
+                async for chunk in chunks:
+                    usage = add_usage(usage, chunk.message.usage_metadata)
+                    yield chunk
+            finally:
+                governor.settle(*reservation, usage)
+            return
 
-def get_chat_model(model: str = DEFAULT_MODEL) -> ChatAnthropic:
-    """Get LangChain ChatAnthropic model instance."""
+
+def _get_api_key() -> str:
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY environment variable is required")
-    
-    return ChatAnthropic(
+    return api_key
+
+
+class ModelConfig(BaseModel):
+    model: str = DEFAULT_MODEL
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    temperature: float = DEFAULT_TEMPERATURE
+
+
+def get_stage_model_config(stage: str) -> ModelConfig:
+    """Model settings for a stage from CV_<STAGE>_MODEL, _MAX_TOKENS and _TEMPERATURE."""
+    defaults = STAGE_DEFAULTS.get(stage, {})
+    prefix = f"CV_{stage.upper()}_"
+    return ModelConfig(
+        model=os.getenv(prefix + "MODEL") or defaults.get("model", DEFAULT_MODEL),
+        max_tokens=int(os.getenv(prefix + "MAX_TOKENS") or defaults.get("max_tokens", DEFAULT_MAX_TOKENS)),
+        temperature=float(os.getenv(prefix + "TEMPERATURE") or defaults.get("temperature", DEFAULT_TEMPERATURE)),
+    )
+
+
+def _create_chat_model(model: str, max_tokens: int, temperature: float) -> ChatAnthropic:
+    return GovernedChatAnthropic(
         model=model,
-        anthropic_api_key=api_key,
-        temperature=0.1,
-        max_tokens=4000
+        anthropic_api_key=_get_api_key(),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        default_request_timeout=REQUEST_TIMEOUT_SECONDS,
+        # Retries are handled by GovernedChatAnthropic so they respect the shared quota
+        max_retries=0
     )
 
 
+def get_chat_model(model: str = DEFAULT_MODEL, shared: bool = True, max_tokens: int = DEFAULT_MAX_TOKENS,
+                   temperature: float = DEFAULT_TEMPERATURE) -> ChatAnthropic:
+    """Get LangChain ChatAnthropic model instance.
+
+    Shared instances are cached per model and settings for the whole process,
+    so every agent and workflow reuses the same underlying HTTP clients and
+    their keep-alive connection pools.
+    """
+    if not shared:
+        return _create_chat_model(model, max_tokens, temperature)
+
+    key = (model, max_tokens, temperature)
+    with _chat_models_lock:
+        chat_model = _chat_models.get(key)
+        if chat_model is None:
+            chat_model = _create_chat_model(model, max_tokens, temperature)
+            _chat_models[key] = chat_model
+        return chat_model
+
+
+def get_stage_chat_model(stage: str, shared: bool = True) -> ChatAnthropic:
+    """Get the chat model configured for an agent stage."""
+    config = get_stage_model_config(stage)
+    return get_chat_model(config.model, shared=shared, max_tokens=config.max_tokens, temperature=config.temperature)
+
+
+async def aopen_connections(chat_model: ChatAnthropic) -> None:
+    """Open a pooled async connection to the API with a free metadata request."""
+    # ChatAnthropic creates its SDK client lazily; listing models is not billed
+    await chat_model._async_client.models.list(limit=1)
+
+
 def validate_api_key() -> bool:
     """Validate that the API key is set and working."""
     try:
         get_chat_model()
         return True
     except Exception as e:
-        print(f"API key validation failed: {e}")
-        return False 
\ No newline at end of file
+        logger.warning("API key validation failed: %s", e)
+        return False
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import anthropic
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import BaseMessage
+
+from app.utils.rate_limit import MAX_RETRIES, backoff_seconds, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Seconds between status checks of a submitted batch; most batches end within an hour
+BATCH_POLL_SECONDS = float(os.getenv("ANTHROPIC_BATCH_POLL_SECONDS", "30"))
+# Requests per submission; the API accepts up to 100,000 requests or 256 MB per batch
+BATCH_MAX_REQUESTS = int(os.getenv("ANTHROPIC_BATCH_MAX_REQUESTS", "10000"))
+# Give up on a batch that hasn't ended after this long; the API expires them after 24 hours
+BATCH_TIMEOUT_SECONDS = float(os.getenv("ANTHROPIC_BATCH_TIMEOUT_SECONDS", str(24 * 3600)))
+
+# Request parameters the Messages API takes interactively but batches reject
+_UNBATCHABLE_PARAMS = ("stream", "betas")
+
+
+class BatchResult:
+    """Outcome of one request in a message batch: its text, tool input and usage, or the error."""
+
+    def __init__(self, text: Optional[str] = None, usage: Optional[dict] = None, model: Optional[str] = None,
+                 error: Optional[Exception] = None, tool_input: Optional[dict] = None):
+        self.text = text
+        self.usage = usage
+        self.model = model
+        self.error = error
+        # Input of the first tool call, for requests that force one
+        self.tool_input = tool_input
+
+
+def batch_request_params(llm: ChatAnthropic, messages: List[BaseMessage], **kwargs) -> dict:
+    """The Messages API parameters the chat model would send for these messages.
+
+    `kwargs` are extra request parameters, such as tools, like those bound
+    to the model with `.bind()`.
+    """
+    if not isinstance(llm, ChatAnthropic):
+        raise TypeError(f"Message batches need an Anthropic chat model, got {type(llm).__name__}")
+    params = llm._get_request_payload(messages, **kwargs)
+    for name in _UNBATCHABLE_PARAMS:
+        params.pop(name, None)
+    return params
+
+
+def _usage_metadata(usage) -> dict:
+    """Convert the API's usage block to LangChain's usage metadata shape."""
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_creation = getattr(usage, "cache_creation_input_tokens", None) or 0
+    # Like ChatAnthropic, count cached tokens as part of the input
+    input_tokens = usage.input_tokens + cache_read + cache_creation
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": input_tokens + usage.output_tokens,
+        "input_token_details": {"cache_read": cache_read, "cache_creation": cache_creation},
+    }
+
+
+def _result_from_entry(entry) -> BatchResult:
+    result = entry.result
+    if result.type != "succeeded":
+        detail = getattr(result, "error", None)
+        return BatchResult(error=RuntimeError(f"Batch request {entry.custom_id} {result.type}: {detail}"))
+    message = result.message
+    text = "".join(block.text for block in message.content if block.type == "text")
+    tool_input = next((block.input for block in message.content if block.type == "tool_use"), None)
+    return BatchResult(text=text, usage=_usage_metadata(message.usage), model=message.model, tool_input=tool_input)
+
+
+async def _with_retries(call, *args, idempotent: bool = True, **kwargs):
+    """Retry a batch API call on transient errors.
+
+    Polls are cheap to repeat. A submission is only retried when the API
+    answered with an error status: after a timeout or dropped connection the
+    batch may already exist, and submitting it again would pay for it twice.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await call(*args, **kwargs)
+        except Exception as e:
+            definite = isinstance(e, anthropic.APIStatusError)
+            if not is_retryable(e) or not (idempotent or definite) or attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_seconds(attempt)
+            logger.warning("Message batch call failed, retrying in %.1fs: %r", delay, e)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def _run_one_batch(client, requests: Sequence[dict]) -> Dict[str, BatchResult]:
+    batch = await _with_retries(client.messages.batches.create, requests=list(requests), idempotent=False)
+    logger.info("Submitted message batch %s with %d requests", batch.id, len(requests))
+    deadline = time.monotonic() + BATCH_TIMEOUT_SECONDS
+    while batch.processing_status != "ended":
+        if time.monotonic() > deadline:
+            await _with_retries(client.messages.batches.cancel, batch.id)
+            raise TimeoutError(f"Message batch {batch.id} did not end within {BATCH_TIMEOUT_SECONDS:.0f}s")
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+        batch = await _with_retries(client.messages.batches.retrieve, batch.id)
+        counts = batch.request_counts
+        logger.info("Message batch %s: %s, %d processing, %d succeeded, %d errored",
+                    batch.id, batch.processing_status, counts.processing, counts.succeeded, counts.errored)
+
+    results = {}
+    async for entry in await _with_retries(client.messages.batches.results, batch.id):
+        results[entry.custom_id] = _result_from_entry(entry)
+    return results
+
+
+async def arun_message_batch(llm: ChatAnthropic, requests: Sequence[Tuple[str, List[BaseMessage]]],
+                             **kwargs) -> Dict[str, BatchResult]:
+    """Run chat requests through the Message Batches API and wait for their results.
+
+    `requests` pairs a custom id (1-64 letters, digits, `-` or `_`) with the
+    messages to send; `kwargs` are extra parameters for every request.
+    Requests over BATCH_MAX_REQUESTS are split into several batches that run
+    concurrently. Every id gets a result; requests that errored, expired or
+    were canceled carry the error instead of output.
+    """
+    if not requests:
+        return {}
+    client = llm._async_client
+    params = [
+        {"custom_id": custom_id, "params": batch_request_params(llm, messages, **kwargs)} for custom_id, messages in requests
+    ]
+    submissions = [params[i:i + BATCH_MAX_REQUESTS] for i in range(0, len(params), BATCH_MAX_REQUESTS)]
+    batches = await asyncio.gather(*(_run_one_batch(client, submission) for submission in submissions), return_exceptions=True)
+
+    results: Dict[str, BatchResult] = {}
+    for submission, batch_results in zip(submissions, batches):
+        for request in submission:
+            custom_id = request["custom_id"]
+            if isinstance(batch_results, Exception):
+                results[custom_id] = BatchResult(error=batch_results)
+            else:
+                results[custom_id] = batch_results.get(custom_id) or BatchResult(
+                    error=RuntimeError(f"Batch request {custom_id} has no result")
+                )
+    return results
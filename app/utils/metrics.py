@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.models import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+# USD per million (input, output) tokens, matched on model name prefix
+MODEL_PRICES_PER_MTOK: Dict[str, Tuple[float, float]] = {
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-haiku-4": (1.0, 5.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+# Message Batches requests are billed at half the interactive price
+BATCH_PRICE_FACTOR = 0.5
+
+LATENCY_BUCKETS = tuple(
+    float(bucket) for bucket in os.getenv("CV_METRICS_LATENCY_BUCKETS", "0.1,0.25,0.5,1,2.5,5,10,20,30,60,120").split(",")
+)
+
+_current_stage: ContextVar[Optional[StageMetrics]] = ContextVar("current_stage_metrics", default=None)
+
+
+def model_prices(model: Optional[str]) -> Optional[Tuple[float, float]]:
+    for prefix, prices in MODEL_PRICES_PER_MTOK.items():
+        if model and model.startswith(prefix):
+            return prices
+    return None
+
+
+def call_cost(model: Optional[str], usage: dict, batch: bool = False) -> float:
+    """Estimated USD cost of one model call, or 0.0 for unknown models."""
+    prices = model_prices(model)
+    if prices is None:
+        return 0.0
+    input_price, output_price = prices
+    details = usage.get("input_token_details") or {}
+    cache_read = details.get("cache_read") or 0
+    cache_creation = details.get("cache_creation") or 0
+    # input_tokens includes the cached tokens, which are billed at their own rates
+    uncached = max(0, usage.get("input_tokens", 0) - cache_read - cache_creation)
+    cost = (
+        uncached * input_price
+        + cache_read * input_price * CACHE_READ_PRICE_FACTOR
+        + cache_creation * input_price * CACHE_WRITE_PRICE_FACTOR
+        + usage.get("output_tokens", 0) * output_price
+    )
+    if batch:
+        cost *= BATCH_PRICE_FACTOR
+    return cost / 1_000_000
+
+
+def current_stage_metrics() -> Optional[StageMetrics]:
+    """Metrics of the stage running in this context, if any."""
+    return _current_stage.get()
+
+
+def record_usage(usage: dict, model: Optional[str] = None, batch: bool = False) -> None:
+    """Add the token usage and cost of one model call to the current stage."""
+    metrics = _current_stage.get()
+    if metrics is None:
+        return
+    details = usage.get("input_token_details") or {}
+    metrics.llm_calls += 1
+    metrics.input_tokens += usage.get("input_tokens", 0)
+    metrics.output_tokens += usage.get("output_tokens", 0)
+    metrics.cache_read_tokens += details.get("cache_read") or 0
+    metrics.cache_creation_tokens += details.get("cache_creation") or 0
+    metrics.cost_usd += call_cost(model or metrics.model, usage, batch)
+
+
+def record_retry() -> None:
+    metrics = _current_stage.get()
+    if metrics is not None:
+        metrics.retries += 1
+
+
+def record_cache_hit() -> None:
+    metrics = _current_stage.get()
+    if metrics is not None:
+        metrics.cache_hit = True
+
+
+def record_escalation(stage: str, error: Exception) -> None:
+    """Log a fast-model result that failed validation and is redone by the larger model."""
+    logger.info("stage=%s escalated=true error=%r", stage, error)
+    metrics = _current_stage.get()
+    if metrics is not None:
+        metrics.escalated = True
+
+
+def record_fallback(stage: str, error: Exception) -> None:
+    """Log a stage failure that was replaced by its fallback result."""
+    logger.warning("stage=%s fallback_used=true error=%r", stage, error)
+    metrics = _current_stage.get()
+    if metrics is not None:
+        metrics.fallback_used = True
+
+
+@contextmanager
+def collect_stage_metrics(metrics: StageMetrics) -> Iterator[StageMetrics]:
+    """Attribute the usage, retries, cache hits and fallbacks recorded in the block to `metrics`."""
+    token = _current_stage.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_stage.reset(token)
+
+
+def publish_stage_metrics(metrics: StageMetrics) -> None:
+    """Log a finished stage's metrics and add them to the process-wide histograms."""
+    get_metrics_registry().observe(metrics)
+    logger.info(
+        "stage_metrics stage=%s wall_seconds=%.3f queue_seconds=%.3f input_tokens=%d output_tokens=%d "
+        "cache_read_tokens=%d cache_creation_tokens=%d retries=%d cache_hit=%s escalated=%s fallback_used=%s cost_usd=%.6f",
+        metrics.stage, metrics.wall_seconds, metrics.queue_seconds, metrics.input_tokens, metrics.output_tokens,
+        metrics.cache_read_tokens, metrics.cache_creation_tokens, metrics.retries,
+        str(metrics.cache_hit).lower(), str(metrics.escalated).lower(), str(metrics.fallback_used).lower(), metrics.cost_usd,
+        extra={"stage_metrics": metrics.model_dump()},
+    )
+
+
+@contextmanager
+def stage_scope(stage: str, model: Optional[str] = None, ready_at: Optional[float] = None) -> Iterator[StageMetrics]:
+    """Collect the metrics of one stage while the block runs.
+
+    `ready_at` is the Unix time the stage's inputs became available; the gap
+    until the block starts is reported as queue time. On exit the metrics are
+    logged and added to the process-wide histograms.
+    """
+    started_at = time.time()
+    metrics = StageMetrics(
+        stage=stage,
+        model=model,
+        started_at=started_at,
+        queue_seconds=max(0.0, started_at - ready_at) if ready_at else 0.0,
+    )
+    started = time.perf_counter()
+    try:
+        with collect_stage_metrics(metrics):
+            yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - started
+        publish_stage_metrics(metrics)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Process-wide per-stage latency histograms and usage counters."""
+
+    COUNTERS = {
+        "input_tokens": "Input tokens sent, including cached tokens",
+        "output_tokens": "Output tokens generated",
+        "cache_read_tokens": "Input tokens read from the prompt cache",
+        "cache_creation_tokens": "Input tokens written to the prompt cache",
+        "llm_calls": "Model calls made",
+        "retries": "Model calls retried",
+        "cache_hits": "Stage results served from the stage cache",
+        "escalations": "Fast-model results redone by the larger model",
+        "fallbacks": "Stage results replaced by a fallback",
+        "cost_usd": "Estimated model cost in USD",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Histogram] = {}
+        self._queue_times: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Dict[str, float]] = {name: {} for name in self.COUNTERS}
+
+    def _add(self, name: str, stage: str, value: float) -> None:
+        self._counters[name][stage] = self._counters[name].get(stage, 0) + value
+
+    def observe(self, metrics: StageMetrics) -> None:
+        with self._lock:
+            self._durations.setdefault(metrics.stage, Histogram()).observe(metrics.wall_seconds)
+            self._queue_times.setdefault(metrics.stage, Histogram()).observe(metrics.queue_seconds)
+            for name in ("input_tokens", "output_tokens", "cache_read_tokens", "cache_creation_tokens", "llm_calls", "retries", "cost_usd"):
+                self._add(name, metrics.stage, getattr(metrics, name))
+            self._add("cache_hits", metrics.stage, int(metrics.cache_hit))
+            self._add("escalations", metrics.stage, int(metrics.escalated))
+            self._add("fallbacks", metrics.stage, int(metrics.fallback_used))
+
+    @staticmethod
+    def _render_histogram(lines: list, name: str, help_text: str, histograms: Dict[str, Histogram]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in sorted(histograms.items()):
+            for bucket, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bucket:g}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            self._render_histogram(lines, "cv_review_stage_duration_seconds", "Wall time of each review stage", self._durations)
+            self._render_histogram(lines, "cv_review_stage_queue_seconds", "Time a stage waited after its inputs were ready", self._queue_times)
+            for name, help_text in self.COUNTERS.items():
+                metric = f"cv_review_{name}_total"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for stage, value in sorted(self._counters[name].items()):
+                    lines.append(f'{metric}{{stage="{stage}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
@@ -0,0 +1,114 @@
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from app.models import ProcessingStatus, ProgressEvent, StageMetrics
+
+# Rough stage durations used until real ones have been observed
+DEFAULT_STAGE_SECONDS = {
+    "file_processing": 0.5,
+    "extraction": 15.0,
+    "analysis": 12.0,
+    "feedback": 12.0,
+    "recommendation": 12.0,
+}
+STAGES = tuple(DEFAULT_STAGE_SECONDS)
+PROGRESS_HISTORY_SIZE = int(os.getenv("CV_PROGRESS_HISTORY_SIZE", "50"))
+
+
+class StageDurationHistory:
+    """Rolling window of observed stage durations, shared by all reviews."""
+
+    def __init__(self, size: int = PROGRESS_HISTORY_SIZE):
+        self._durations: Dict[str, Deque[float]] = {stage: deque(maxlen=size) for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._durations.setdefault(stage, deque(maxlen=PROGRESS_HISTORY_SIZE)).append(seconds)
+
+    def expected(self, stage: str) -> float:
+        """Median of the recent durations of a stage, or its default."""
+        with self._lock:
+            durations = self._durations.get(stage)
+            if durations:
+                return statistics.median(durations)
+        return DEFAULT_STAGE_SECONDS.get(stage, 1.0)
+
+
+_history = StageDurationHistory()
+
+
+def get_stage_history() -> StageDurationHistory:
+    return _history
+
+
+class ProgressTracker:
+    """Turn stage start and finish events of one review into progress and an ETA.
+
+    Progress is the share of expected work done, weighting each stage by its
+    typical duration; the ETA follows the graph's critical path, so in the
+    parallel graph only the slower of feedback and recommendations counts.
+    """
+
+    def __init__(self, parallel: bool, on_progress: Optional[Callable[[ProgressEvent], None]] = None,
+                 history: Optional[StageDurationHistory] = None):
+        self.parallel = parallel
+        self.on_progress = on_progress
+        self.history = history or get_stage_history()
+        self.started_at = time.time()
+        self.expected = {stage: self.history.expected(stage) for stage in STAGES}
+        self.running: Dict[str, float] = {}
+        self.completed: Dict[str, float] = {}
+        self.last_event: Optional[ProgressEvent] = None
+
+    def _remaining(self, stage: str, now: float) -> float:
+        if stage in self.completed:
+            return 0.0
+        elapsed = now - self.running[stage] if stage in self.running else 0.0
+        return max(self.expected[stage] - elapsed, 0.0)
+
+    def eta_seconds(self, now: Optional[float] = None) -> float:
+        now = now or time.time()
+        remaining = {stage: self._remaining(stage, now) for stage in STAGES}
+        eta = remaining["file_processing"] + remaining["extraction"] + remaining["analysis"]
+        if self.parallel:
+            return eta + max(remaining["feedback"], remaining["recommendation"])
+        return eta + remaining["feedback"] + remaining["recommendation"]
+
+    def fraction(self, now: Optional[float] = None) -> float:
+        now = now or time.time()
+        total = sum(self.expected.values())
+        done = sum(self.expected[stage] - self._remaining(stage, now) for stage in STAGES)
+        return min(done / total, 1.0) if total else 0.0
+
+    def _publish(self, event: str, stage: str, status: ProcessingStatus) -> ProgressEvent:
+        now = time.time()
+        progress = ProgressEvent(
+            event=event,
+            stage=stage,
+            status=status,
+            fraction=self.fraction(now),
+            eta_seconds=self.eta_seconds(now),
+            elapsed_seconds=now - self.started_at,
+            timestamp=now,
+        )
+        self.last_event = progress
+        if self.on_progress is not None:
+            self.on_progress(progress)
+        return progress
+
+    def stage_started(self, stage: str, status: ProcessingStatus, at: Optional[float] = None) -> ProgressEvent:
+        self.running.setdefault(stage, at or time.time())
+        return self._publish("stage_started", stage, status)
+
+    def stage_completed(self, metrics: StageMetrics, status: ProcessingStatus) -> ProgressEvent:
+        self.running.pop(metrics.stage, None)
+        self.completed[metrics.stage] = metrics.wall_seconds
+        # Cache hits and fallbacks say nothing about how long the real work takes
+        if not (metrics.cache_hit or metrics.fallback_used):
+            self.history.record(metrics.stage, metrics.wall_seconds)
+        return self._publish("stage_completed", metrics.stage, status)
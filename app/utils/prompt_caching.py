@@ -0,0 +1,23 @@
+import os
+
+from langchain_core.prompts import ChatPromptTemplate
+
+# Mark the static instruction and schema prefix of every prompt as cacheable
+PROMPT_CACHING_ENABLED = os.getenv("ANTHROPIC_PROMPT_CACHING", "true").lower() in ("1", "true", "yes")
+
+
+def cached_chat_prompt(instructions: str, data_template: str) -> ChatPromptTemplate:
+    """Build a prompt with a cacheable system prefix and a per-CV human message.
+
+    The system block holds only the instructions; the output schema is sent
+    as the agent's tool, which the API places before the system prompt. So
+    everything but the CV data is identical across requests and can be
+    served from Anthropic's prompt cache.
+    """
+    system_block = {"type": "text", "text": instructions}
+    if PROMPT_CACHING_ENABLED:
+        system_block["cache_control"] = {"type": "ephemeral"}
+    return ChatPromptTemplate.from_messages([
+        ("system", [system_block]),
+        ("human", data_template),
+    ])
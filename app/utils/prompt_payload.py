@@ -0,0 +1,119 @@
+import json
+import logging
+import math
+import os
+from typing import Any, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.models import ExtractedCVData
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CV_TOKEN_BUDGET = int(os.getenv("PROMPT_CV_TOKEN_BUDGET", "0")) or None
+CHARS_PER_TOKEN = 4
+MIN_TRIMMED_CHARS = 80
+
+SHORT_KEYS = {
+    "location": "loc",
+    "experience": "exp",
+    "education": "edu",
+    "certifications": "certs",
+    "languages": "langs",
+    "company": "co",
+    "position": "role",
+    "start_date": "from",
+    "end_date": "to",
+    "description": "desc",
+    "achievements": "wins",
+    "institution": "school",
+    "degree": "deg",
+    "field_of_study": "field",
+    "level": "lvl",
+    "years_experience": "yrs",
+}
+# Appended to the instructions of every prompt that receives compact_cv_payload output
+CV_DATA_KEY_LEGEND = "Keys in the CV data are abbreviated: " + ", ".join(f"{short} = {key}" for key, short in SHORT_KEYS.items()) + "."
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap offline token estimate (roughly four characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def drop_empty(value: Any) -> Any:
+    """Recursively drop None, empty strings and empty collections."""
+    if isinstance(value, dict):
+        items = ((key, drop_empty(item)) for key, item in value.items())
+        return {key: item for key, item in items if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        items = (drop_empty(item) for item in value)
+        return [item for item in items if item not in (None, "", [], {})]
+    return value
+
+
+def _shorten_keys(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {SHORT_KEYS.get(key, key): _shorten_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shorten_keys(item) for item in value]
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _trimmable_fields(data: dict) -> List[Tuple[Any, Any]]:
+    """(container, key) pairs of free-text fields that may be shortened."""
+    fields = []
+    if "summary" in data:
+        fields.append((data, "summary"))
+    for experience in data.get("experience", []):
+        if "description" in experience:
+            fields.append((experience, "description"))
+        achievements = experience.get("achievements", [])
+        fields.extend((achievements, i) for i in range(len(achievements)))
+    return fields
+
+
+def _trim_to_budget(data: dict, token_budget: int) -> None:
+    """Shorten the longest descriptions first until the payload fits the budget.
+
+    If trimming every description to MIN_TRIMMED_CHARS is not enough, the
+    payload is left over budget.
+    """
+    while estimate_tokens(_dumps(_shorten_keys(data))) > token_budget:
+        fields = [(container, key) for container, key in _trimmable_fields(data) if len(container[key]) > MIN_TRIMMED_CHARS + 1]
+        if not fields:
+            return
+        container, key = max(fields, key=lambda field: len(field[0][field[1]]))
+        text = container[key]
+        trimmed = text[:max(MIN_TRIMMED_CHARS, int(len(text) * 0.75))].rstrip() + "…"
+        if len(trimmed) >= len(text):
+            return
+        container[key] = trimmed
+
+
+def compact_cv_payload(extracted_data: ExtractedCVData, token_budget: Optional[int] = PROMPT_CV_TOKEN_BUDGET) -> str:
+    """Serialize extracted CV data for downstream prompts.
+
+    Drops the raw CV text and empty fields and shortens keys; with a token
+    budget, the longest descriptions are trimmed first until it fits.
+    """
+    data = drop_empty(extracted_data.model_dump(mode="json", exclude={"raw_text"}))
+    if token_budget:
+        _trim_to_budget(data, token_budget)
+    return _dumps(_shorten_keys(data))
+
+
+def compact_json(model: BaseModel) -> str:
+    """Serialize a stage result without empty fields or whitespace."""
+    return _dumps(drop_empty(model.model_dump(mode="json")))
+
+
+def log_prompt_tokens(stage: str, prompt, inputs: dict) -> int:
+    """Log the estimated input tokens of a formatted prompt."""
+    input_tokens = estimate_tokens(prompt.format(**inputs))
+    logger.info("stage=%s estimated_input_tokens=%d", stage, input_tokens)
+    return input_tokens
@@ -0,0 +1,229 @@
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import anthropic
+
+logger = logging.getLogger(__name__)
+
+# Per-minute quotas shared by every model call in the process; 0 means "learn
+# the limit from the API's rate-limit headers the first time it is hit"
+RPM_LIMIT = int(os.getenv("ANTHROPIC_RPM_LIMIT", "0"))
+INPUT_TPM_LIMIT = int(os.getenv("ANTHROPIC_INPUT_TPM_LIMIT", "0"))
+OUTPUT_TPM_LIMIT = int(os.getenv("ANTHROPIC_OUTPUT_TPM_LIMIT", "0"))
+MAX_RETRIES = int(os.getenv("ANTHROPIC_MAX_RETRIES", "6"))
+BACKOFF_BASE_SECONDS = float(os.getenv("ANTHROPIC_BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.getenv("ANTHROPIC_BACKOFF_MAX_SECONDS", "60"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `limit` per minute.
+
+    Reservations are taken immediately and may drive the bucket into debt;
+    the caller then waits until its reservation is covered. This queues
+    callers in arrival order instead of letting them race for tokens.
+    """
+
+    def __init__(self, limit: int, burst: Optional[int] = None):
+        self.limit = limit
+        self.capacity = burst or limit
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` tokens and return how long to wait until they are available."""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        # A request larger than the bucket can never fit; let it through once the bucket is full
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens * 60 / self.limit)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Correct an earlier reservation once the real usage is known (negative refunds)."""
+        if self.enabled:
+            self._refill(now)
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def set_limit(self, limit: int) -> None:
+        if limit > 0 and limit != self.limit:
+            self.limit = limit
+            self.capacity = limit
+            self.tokens = min(self.tokens, self.capacity)
+
+    def drain(self, remaining: Optional[int], now: float) -> None:
+        """Align the bucket with the server's view of what is left."""
+        if self.enabled and remaining is not None:
+            self._refill(now)
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class RateGovernor:
+    """Process-wide request and token rate limiter for model calls."""
+
+    def __init__(self, rpm: int = RPM_LIMIT, input_tpm: int = INPUT_TPM_LIMIT, output_tpm: int = OUTPUT_TPM_LIMIT,
+                 burst_requests: Optional[int] = None):
+        self.requests = TokenBucket(rpm, burst_requests)
+        self.input_tokens = TokenBucket(input_tpm)
+        self.output_tokens = TokenBucket(output_tpm)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled_seconds = 0.0
+        self.rate_limited_responses = 0
+
+    def _reserve(self, input_tokens: int, output_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self.paused_until - now,
+                self.requests.reserve(1, now),
+                self.input_tokens.reserve(input_tokens, now),
+                self.output_tokens.reserve(output_tokens, now),
+                0.0,
+            )
+            self.throttled_seconds += delay
+            return delay
+
+    def acquire(self, input_tokens: int, output_tokens: int) -> None:
+        """Block until a call of this size fits within the quotas."""
+        delay = self._reserve(input_tokens, output_tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self, input_tokens: int, output_tokens: int) -> None:
+        delay = self._reserve(input_tokens, output_tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def settle(self, reserved_input: int, reserved_output: int, usage: Optional[dict]) -> None:
+        """Replace the estimated token counts of a finished call with the real ones.
+
+        A failed call passes no usage and gets its whole reservation back.
+        """
+        usage = usage or {}
+        details = usage.get("input_token_details") or {}
+        # Cache reads don't count towards the input token quota
+        actual_input = usage.get("input_tokens", 0) - (details.get("cache_read") or 0)
+        with self._lock:
+            now = time.monotonic()
+            self.input_tokens.adjust(actual_input - reserved_input, now)
+            self.output_tokens.adjust(usage.get("output_tokens", 0) - reserved_output, now)
+
+    def on_rate_limited(self, headers, retry_after: float) -> None:
+        """Pause every caller and sync the buckets with a 429 response's headers."""
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited_responses += 1
+            self.paused_until = max(self.paused_until, now + retry_after)
+            for bucket, name in (
+                (self.requests, "requests"),
+                (self.input_tokens, "input-tokens"),
+                (self.output_tokens, "output-tokens"),
+            ):
+                bucket.set_limit(_int_header(headers, f"anthropic-ratelimit-{name}-limit") or 0)
+                bucket.drain(_int_header(headers, f"anthropic-ratelimit-{name}-remaining"), now)
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers[name]) if headers and name in headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_timestamp(value: str) -> Optional[float]:
+    """Unix time from an RFC 3339 timestamp (rate-limit resets) or an HTTP date (retry-after)."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        pass
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after_seconds(headers) -> Optional[float]:
+    """Seconds to wait from retry-after, or else from the latest rate-limit reset header."""
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+            return seconds / 1000 if name == "retry-after-ms" else seconds
+        except ValueError:
+            timestamp = _parse_timestamp(value)
+            if timestamp is not None:
+                return max(0.0, timestamp - time.time())
+    resets = []
+    for name in ("requests", "tokens", "input-tokens", "output-tokens"):
+        value = headers.get(f"anthropic-ratelimit-{name}-reset")
+        timestamp = _parse_timestamp(value) if value else None
+        if timestamp is not None:
+            resets.append(max(0.0, timestamp - time.time()))
+    return max(resets) if resets else None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        if error.response is not None and error.response.headers.get("x-should-retry") == "false":
+            return False
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def retry_delay(error: Exception, attempt: int, governor: RateGovernor) -> float:
+    """How long this caller should wait before retrying `error`.
+
+    Rate limits pause the governor instead, so every caller waits for the
+    reset rather than only the one that was rejected; the returned delay is
+    then 0 and the next `acquire` does the waiting.
+    """
+    headers = error.response.headers if isinstance(error, anthropic.APIStatusError) and error.response is not None else None
+    retry_after = _retry_after_seconds(headers)
+    if isinstance(error, anthropic.APIStatusError) and error.status_code == 429:
+        # A little jitter keeps the paused callers from all retrying on the same tick
+        wait = (retry_after if retry_after is not None else backoff_seconds(attempt)) + random.uniform(0, 0.25)
+        governor.on_rate_limited(headers, wait)
+        return 0.0
+    if retry_after is not None:
+        return retry_after
+    return backoff_seconds(attempt)
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor()
+        return _governor
@@ -0,0 +1,247 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.models import CVReviewState, ReviewPage, ReviewSummary
+
+logger = logging.getLogger(__name__)
+
+REVIEW_STORE_ENABLED = os.getenv("CV_REVIEW_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+REVIEW_STORE_PATH = os.getenv("CV_REVIEW_STORE_PATH", "data/reviews.sqlite3")
+MAX_PAGE_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_hash TEXT,
+    file_name TEXT,
+    candidate_name TEXT COLLATE NOCASE,
+    candidate_email TEXT COLLATE NOCASE,
+    overall_score REAL,
+    seniority_level TEXT COLLATE NOCASE,
+    created_at REAL NOT NULL,
+    state_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_file_hash ON reviews (file_hash, created_at);
+CREATE INDEX IF NOT EXISTS reviews_candidate_name ON reviews (candidate_name);
+CREATE INDEX IF NOT EXISTS reviews_candidate_email ON reviews (candidate_email);
+CREATE INDEX IF NOT EXISTS reviews_overall_score ON reviews (overall_score);
+CREATE INDEX IF NOT EXISTS reviews_seniority_level ON reviews (seniority_level, overall_score);
+CREATE INDEX IF NOT EXISTS reviews_created_at ON reviews (created_at);
+"""
+
+_SUMMARY_COLUMNS = "id, file_hash, file_name, candidate_name, candidate_email, overall_score, seniority_level, created_at"
+ORDER_COLUMNS = {"created_at": "created_at", "overall_score": "overall_score"}
+
+# Sentinel that asks the writer thread to confirm everything queued before it is written
+_FLUSH = object()
+
+
+class ReviewStore:
+    """SQLite store of finished reviews with indexed history lookups.
+
+    Reviews are written by a background thread, so saving never blocks the
+    review that produced them. The database runs in WAL mode, so reads are
+    not blocked by that writer either; each thread uses its own connection.
+    """
+
+    def __init__(self, path: str = REVIEW_STORE_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._connection().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _row(state: CVReviewState, created_at: float) -> tuple:
+        data = state.extracted_data
+        analysis = state.analysis_results
+        return (
+            state.file_hash,
+            state.file_name,
+            data.name if data else None,
+            data.email.strip().lower() if data and data.email else None,
+            analysis.overall_score if analysis else None,
+            analysis.seniority_level if analysis else None,
+            created_at,
+            # The raw text is kept in extracted_data, so the copy in file_content is dropped
+            state.model_dump_json(exclude={"file_content"}),
+        )
+
+    def save(self, state: CVReviewState, created_at: Optional[float] = None) -> int:
+        """Write a review now and return its id."""
+        row = self._row(state, created_at or time.time())
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                "INSERT INTO reviews (file_hash, file_name, candidate_name, candidate_email, overall_score, "
+                "seniority_level, created_at, state_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            return cursor.lastrowid
+
+    def save_in_background(self, state: CVReviewState) -> None:
+        """Queue a review to be written by the store's writer thread."""
+        self._ensure_writer()
+        self._queue.put((state, time.time()))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until every queued review has been written."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="review-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            item, extra = self._queue.get()
+            if item is _FLUSH:
+                extra.set()
+                continue
+            try:
+                self.save(item, created_at=extra)
+            except Exception as e:
+                logger.warning("Could not store review of %s: %s", item.file_name, e)
+
+    def get(self, review_id: int) -> Optional[CVReviewState]:
+        """Load a stored review as it was when it finished."""
+        row = self._connection().execute("SELECT state_json FROM reviews WHERE id = ?", (review_id,)).fetchone()
+        return CVReviewState.model_validate_json(row[0]) if row else None
+
+    def latest_for_file(self, file_hash: str) -> Optional[CVReviewState]:
+        """The most recent stored review of a file with these exact contents."""
+        row = self._connection().execute(
+            "SELECT state_json FROM reviews WHERE file_hash = ? ORDER BY created_at DESC LIMIT 1", (file_hash,)
+        ).fetchone()
+        return CVReviewState.model_validate_json(row[0]) if row else None
+
+    def recent_for_candidate(self, email: Optional[str] = None, name: Optional[str] = None,
+                             limit: int = 5) -> List[CVReviewState]:
+        """The latest stored reviews of a candidate, matched on email or else on the whole name."""
+        if email:
+            clause, value = "candidate_email = ?", email.strip().lower()
+        elif name:
+            clause, value = "candidate_name = ?", name.strip()
+        else:
+            return []
+        rows = self._connection().execute(
+            f"SELECT state_json FROM reviews WHERE {clause} ORDER BY created_at DESC LIMIT ?", (value, limit)
+        ).fetchall()
+        return [CVReviewState.model_validate_json(row[0]) for row in rows]
+
+    def reviews_after(self, review_id: int = 0, limit: int = 500) -> List[Tuple[int, float, CVReviewState]]:
+        """Up to `limit` stored reviews written after `review_id`, oldest first, with their ids and times."""
+        rows = self._connection().execute(
+            "SELECT id, created_at, state_json FROM reviews WHERE id > ? ORDER BY id LIMIT ?", (review_id, limit)
+        ).fetchall()
+        return [(row[0], row[1], CVReviewState.model_validate_json(row[2])) for row in rows]
+
+    def query(self, name: Optional[str] = None, email: Optional[str] = None, file_hash: Optional[str] = None,
+              min_score: Optional[float] = None, max_score: Optional[float] = None, seniority: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, order_by: str = "created_at",
+              descending: bool = True, page: int = 1, page_size: int = 20) -> ReviewPage:
+        """Page through stored reviews, newest first by default.
+
+        `name` matches the start of the candidate's name and `email` the whole
+        address, both ignoring case; `since` and `until` are Unix times.
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Cannot order reviews by {order_by!r}; use one of {', '.join(ORDER_COLUMNS)}")
+        page = max(1, page)
+        page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+        where, params = self._filters(name, email, file_hash, min_score, max_score, seniority, since, until)
+        connection = self._connection()
+        total = connection.execute(f"SELECT COUNT(*) FROM reviews{where}", params).fetchone()[0]
+        direction = "DESC" if descending else "ASC"
+        rows = connection.execute(
+            f"SELECT {_SUMMARY_COLUMNS} FROM reviews{where} "
+            f"ORDER BY {ORDER_COLUMNS[order_by]} {direction}, id {direction} LIMIT ? OFFSET ?",
+            [*params, page_size, (page - 1) * page_size],
+        ).fetchall()
+        items = [
+            ReviewSummary(
+                review_id=row[0], file_hash=row[1], file_name=row[2], candidate_name=row[3], candidate_email=row[4],
+                overall_score=row[5], seniority_level=row[6], created_at=row[7],
+            )
+            for row in rows
+        ]
+        return ReviewPage(items=items, total=total, page=page, page_size=page_size)
+
+    @staticmethod
+    def _filters(name, email, file_hash, min_score, max_score, seniority, since, until) -> Tuple[str, List]:
+        clauses, params = [], []
+        if name:
+            # Prefix LIKE on a NOCASE column can use its index
+            clauses.append("candidate_name LIKE ? ESCAPE '\\'")
+            params.append(name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if email:
+            clauses.append("candidate_email = ?")
+            params.append(email.strip().lower())
+        if file_hash:
+            clauses.append("file_hash = ?")
+            params.append(file_hash)
+        if min_score is not None:
+            clauses.append("overall_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("overall_score <= ?")
+            params.append(max_score)
+        if seniority:
+            clauses.append("seniority_level = ?")
+            params.append(seniority)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+_review_store: Optional[ReviewStore] = None
+_review_store_lock = threading.Lock()
+
+
+def get_review_store() -> Optional[ReviewStore]:
+    """Get the process-wide review store, or None if disabled or unavailable."""
+    global _review_store
+    if not REVIEW_STORE_ENABLED:
+        return None
+    with _review_store_lock:
+        if _review_store is None:
+            try:
+                _review_store = ReviewStore()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Review store unavailable at %s: %s", REVIEW_STORE_PATH, e)
+                return None
+            # Don't lose reviews still queued when a CLI run exits
+            atexit.register(_review_store.flush, 10)
+        return _review_store
@@ -0,0 +1,123 @@
+import difflib
+import os
+from typing import Dict, List, Optional, Set
+
+from app.models import CVReviewState, ExtractedCVData
+from app.utils.cv_preprocessor import LLM_SECTIONS, PreExtractedCV, pre_extract
+
+# Re-review only what changed when a CV is a revision of one reviewed before
+INCREMENTAL_REVIEW_ENABLED = os.getenv("CV_INCREMENTAL_REVIEW", "true").lower() in ("1", "true", "yes")
+# Share of matching lines above which two documents count as revisions of the same CV
+REVISION_MIN_SIMILARITY = float(os.getenv("CV_REVISION_MIN_SIMILARITY", "0.8"))
+
+# The ExtractedCVData fields each CV section is extracted into; projects usually
+# land in the experience list, so both sections are re-extracted together
+SECTION_GROUPS = {
+    "summary": "summary",
+    "experience": "experience",
+    "projects": "experience",
+    "education": "education",
+    "skills": "skills",
+    "certifications": "certifications",
+    "languages": "languages",
+}
+GROUP_FIELDS = {
+    "header": ("name", "email", "phone", "location"),
+    "summary": ("summary",),
+    "experience": ("experience",),
+    "education": ("education",),
+    "skills": ("skills",),
+    "certifications": ("certifications",),
+    "languages": ("languages",),
+}
+CONTACT_FIELDS = GROUP_FIELDS["header"]
+
+
+def _normalized(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _lines(text: str) -> List[str]:
+    return [_normalized(line) for line in text.splitlines() if line.strip()]
+
+
+def similarity(previous_text: str, text: str) -> float:
+    """Share of matching lines between two CV texts, ignoring whitespace."""
+    matcher = difflib.SequenceMatcher(None, _lines(previous_text), _lines(text), autojunk=False)
+    # The upper bounds are cheap and rule most unrelated documents out
+    if matcher.real_quick_ratio() < REVISION_MIN_SIMILARITY or matcher.quick_ratio() < REVISION_MIN_SIMILARITY:
+        return 0.0
+    return matcher.ratio()
+
+
+def changed_groups(previous_text: str, pre_extracted: PreExtractedCV) -> Set[str]:
+    """Field groups whose source sections differ between two versions of a CV.
+
+    Sections the extraction model never sees (awards, interests, ...) are
+    ignored. A header that isn't only contact details may hold an unheaded
+    summary, so when the part of it the model sees changes, the summary is
+    extracted again along with it.
+    """
+    previous = pre_extract(previous_text)
+    changed = set()
+    for label in LLM_SECTIONS:
+        if _normalized(previous.sections.get(label, "")) != _normalized(pre_extracted.sections.get(label, "")):
+            changed.add(SECTION_GROUPS[label])
+    if _normalized(previous.header) != _normalized(pre_extracted.header):
+        changed.add("header")
+    if _normalized(previous.header_text()) != _normalized(pre_extracted.header_text()):
+        changed.update(("header", "summary"))
+    return changed
+
+
+def changed_sections_text(pre_extracted: PreExtractedCV, groups: Set[str]) -> str:
+    """The text of the sections behind the changed groups, for a partial extraction."""
+    parts = []
+    header = pre_extracted.header_text()
+    if "header" in groups and header:
+        parts.append(header)
+    for label in LLM_SECTIONS:
+        if label in pre_extracted.sections and SECTION_GROUPS[label] in groups:
+            parts.append(f"{label.upper()}\n{pre_extracted.sections[label]}")
+    return "\n\n".join(parts)
+
+
+def patch_extracted_data(previous: ExtractedCVData, partial: Optional[ExtractedCVData], groups: Set[str],
+                         pre_extracted: PreExtractedCV, cv_text: str) -> ExtractedCVData:
+    """Replace the fields of the changed groups with a partial extraction of their sections."""
+    # Sections removed from the CV leave nothing to extract, so their fields are emptied
+    source = partial if partial is not None else ExtractedCVData(raw_text="")
+    update: Dict[str, object] = {"raw_text": cv_text}
+    for group in groups:
+        for field in GROUP_FIELDS[group]:
+            update[field] = getattr(source, field)
+    # Locally read contact details fill in what the model left empty, like in a full extraction
+    if "header" in groups:
+        for field in CONTACT_FIELDS:
+            if not update[field] and getattr(pre_extracted, field):
+                update[field] = getattr(pre_extracted, field)
+    return previous.model_copy(update=update)
+
+
+def is_reusable(state: CVReviewState, pipeline_fingerprint: str) -> bool:
+    """Whether a stored review is complete and came from the current prompts and models."""
+    return (
+        state.pipeline_fingerprint == pipeline_fingerprint
+        and not state.errors
+        and all((state.extracted_data, state.analysis_results, state.feedback, state.recommendations))
+        and bool(state.extracted_data.raw_text)
+        and not any(metrics.fallback_used for metrics in state.stage_metrics.values())
+    )
+
+
+def find_revision_base(cv_text: str, candidates: List[CVReviewState], pipeline_fingerprint: str) -> Optional[CVReviewState]:
+    """The most similar earlier review of a near-identical document, if any."""
+    best, best_similarity = None, REVISION_MIN_SIMILARITY
+    for candidate in candidates:
+        if not is_reusable(candidate, pipeline_fingerprint):
+            continue
+        score = similarity(candidate.extracted_data.raw_text, cv_text)
+        if score >= best_similarity:
+            best, best_similarity = candidate, score
+    return best
+
@@ -0,0 +1,197 @@
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from app.models import CandidateMatch, CVReviewState, ExtractedCVData
+from app.utils.review_store import ReviewStore, get_review_store
+
+logger = logging.getLogger(__name__)
+
+# Candidates a job description is matched against before the model assesses them
+SHORTLIST_SIZE = int(os.getenv("CV_SHORTLIST_SIZE", "20"))
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = float(os.getenv("CV_SHORTLIST_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("CV_SHORTLIST_BM25_B", "0.75"))
+
+# A term counts this many times per occurrence in each part of the CV
+FIELD_WEIGHTS = {
+    "skills": 3.0,
+    "positions": 2.0,
+    "certifications": 2.0,
+    "descriptions": 1.0,
+}
+
+# Keeps terms like c++, c#, node.js and asp.net whole
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to we were will with you
+your who what which while within would should can could must may able about across all also any into more most
+other over such than them then there these they those through under up use using very via well work working years
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase terms of a text, without stopwords."""
+    if not text:
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def weighted_terms(data: ExtractedCVData) -> Dict[str, float]:
+    """Weighted term frequencies of the parts of a CV that say what the candidate can do."""
+    parts = {
+        "skills": [skill.name for skill in data.skills],
+        "positions": [experience.position for experience in data.experience],
+        "certifications": data.certifications,
+        "descriptions": [data.summary] + [
+            text for experience in data.experience for text in (experience.description, *experience.achievements)
+        ],
+    }
+    terms: Dict[str, float] = {}
+    for field, texts in parts.items():
+        weight = FIELD_WEIGHTS[field]
+        for text in texts:
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+def candidate_key(state: CVReviewState) -> str:
+    """Identify the candidate behind a review, so a newer review of them replaces the older one."""
+    data = state.extracted_data
+    if data.email:
+        return "email:" + data.email.strip().lower()
+    if data.name:
+        return "name:" + " ".join(data.name.lower().split())
+    return "file:" + (state.file_hash or "")
+
+
+def _indexable(state: CVReviewState) -> bool:
+    extraction = state.stage_metrics.get("extraction")
+    return state.extracted_data is not None and not (extraction and extraction.fallback_used)
+
+
+class _Document:
+    def __init__(self, review_id: int, state: CVReviewState, terms: Dict[str, float]):
+        self.review_id = review_id
+        self.candidate_name = state.extracted_data.name
+        self.candidate_email = state.extracted_data.email
+        self.file_name = state.file_name
+        self.terms = terms
+        self.length = sum(terms.values())
+
+
+class ShortlistIndex:
+    """In-memory BM25 index of the latest stored review of every candidate.
+
+    Each candidate is one document made of their skills, positions,
+    certifications and experience descriptions, with the fields weighted by
+    FIELD_WEIGHTS. The index follows the review store: `refresh` reads only
+    the reviews written since the last call, so it stays current as reviews
+    finish in any process sharing the database.
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, _Document] = {}
+        # term -> candidate key -> weighted term frequency
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._total_length = 0.0
+        self._last_review_id = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, review_id: int, state: CVReviewState) -> None:
+        """Index a review, replacing any earlier review of the same candidate."""
+        if not _indexable(state):
+            return
+        key = candidate_key(state)
+        document = _Document(review_id, state, weighted_terms(state.extracted_data))
+        with self._lock:
+            self._remove(key)
+            self._documents[key] = document
+            self._total_length += document.length
+            for term, frequency in document.terms.items():
+                self._postings.setdefault(term, {})[key] = frequency
+
+    def _remove(self, key: str) -> None:
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        self._total_length -= document.length
+        for term in document.terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+
+    def refresh(self, store: ReviewStore, batch_size: int = 500) -> int:
+        """Index the reviews stored since the last refresh and return how many were read."""
+        read = 0
+        with self._lock:
+            while True:
+                rows = store.reviews_after(self._last_review_id, batch_size)
+                for review_id, _, state in rows:
+                    self.add(review_id, state)
+                    self._last_review_id = review_id
+                read += len(rows)
+                if len(rows) < batch_size:
+                    return read
+
+    def search(self, query: str, top_k: int = SHORTLIST_SIZE) -> List[CandidateMatch]:
+        """The `top_k` candidates whose CVs best match the query terms, best first."""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._documents)
+            if not count or not query_terms:
+                return []
+            average_length = self._total_length / count or 1.0
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._documents[key].length / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+            matches = []
+            for key, score in heapq.nlargest(top_k, scores.items(), key=lambda item: item[1]):
+                document = self._documents[key]
+                matches.append(CandidateMatch(
+                    review_id=document.review_id,
+                    candidate_name=document.candidate_name,
+                    candidate_email=document.candidate_email,
+                    file_name=document.file_name,
+                    lexical_score=round(score, 4),
+                    matched_terms=sorted(query_terms.intersection(document.terms)),
+                ))
+            return matches
+
+
+_shortlist_index: Optional[ShortlistIndex] = None
+_shortlist_index_lock = threading.Lock()
+
+
+def get_shortlist_index() -> Optional[ShortlistIndex]:
+    """Get the process-wide shortlist index, brought up to date with the review store.
+
+    Returns None if the review store is disabled or unavailable.
+    """
+    global _shortlist_index
+    store = get_review_store()
+    if store is None:
+        return None
+    with _shortlist_index_lock:
+        if _shortlist_index is None:
+            _shortlist_index = ShortlistIndex()
+    read = _shortlist_index.refresh(store)
+    if read:
+        logger.info("Shortlist index: added %d reviews, %d candidates", read, len(_shortlist_index))
+    return _shortlist_index
@@ -0,0 +1,247 @@
+import logging
+import re
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models import CVReviewState, SkillLevel, SkillMatch, SkillRequirement
+from app.utils.review_store import ReviewStore, get_review_store
+from app.utils.shortlist import candidate_key
+from app.utils.skills import SKILL_LEVEL_RANKS, canonical_skill, level_rank
+
+logger = logging.getLogger(__name__)
+
+# Years of use beyond this add nothing to a candidate's strength in a skill
+MAX_STRENGTH_YEARS = 10.0
+MAX_LEVEL_RANK = max(SKILL_LEVEL_RANKS.values())
+
+_COMPARISON_RE = re.compile(r"\s*(?:≥|>=)\s*")
+_YEARS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:y|yrs?|years?)\b")
+_LEVELS = {level.value: level for level in SkillLevel}
+
+
+def parse_requirements(text: str) -> List[SkillRequirement]:
+    """Read requirements written like "Python >= advanced, Kubernetes ≥ 3y, Go".
+
+    Requirements are separated by commas, semicolons or new lines. After the
+    skill, `>=` (or `≥`) takes a level, a number of years, or both.
+    """
+    requirements = []
+    for part in re.split(r"[,;\n]", text):
+        if not part.strip():
+            continue
+        skill, *thresholds = _COMPARISON_RE.split(part.strip(), maxsplit=1)
+        threshold = thresholds[0].lower() if thresholds else ""
+        min_years = None
+        years = _YEARS_RE.search(threshold)
+        if years:
+            min_years = float(years.group(1))
+            threshold = threshold[:years.start()] + threshold[years.end():]
+        min_level = None
+        for word in re.split(r"[\s&+]+|\band\b", threshold):
+            if not word:
+                continue
+            if word not in _LEVELS:
+                raise ValueError(f"Cannot read requirement {part.strip()!r}: expected a level or years after '>='")
+            min_level = _LEVELS[word]
+        if not skill:
+            raise ValueError(f"Requirement {part.strip()!r} names no skill")
+        requirements.append(SkillRequirement(skill=skill, min_level=min_level, min_years=min_years))
+    return requirements
+
+
+class _Candidate:
+    def __init__(self, review_id: int, state: CVReviewState):
+        self.review_id = review_id
+        self.candidate_name = state.extracted_data.name
+        self.candidate_email = state.extracted_data.email
+        self.file_name = state.file_name
+
+
+class SkillMatrix:
+    """Candidate × skill matrix of the latest stored review of every candidate.
+
+    Skill names are canonicalized, so "K8s" and "Kubernetes" or "Python 3.11"
+    and "python" share a column. Each cell holds the level as 1 (beginner)
+    to 4 (expert), inferred from years of use when unrated (beginner if
+    neither is given), and the years.
+    Few of the many distinct skills appear on any one CV, so the matrix is
+    stored column-compressed and a query expands only the columns it asks
+    about into dense NumPy vectors over all candidates.
+
+    Like the shortlist index, `refresh` reads only the reviews stored since
+    the last call. A newer review of a candidate replaces their row.
+    """
+
+    def __init__(self):
+        self._skills: Dict[str, int] = {}
+        self._candidates: List[_Candidate] = []
+        self._rows_by_key: Dict[str, int] = {}
+        self._alive = array("b")
+        # Cells in the order they were added
+        self._cell_rows = array("q")
+        self._cell_columns = array("q")
+        self._cell_levels = array("b")
+        self._cell_years = array("f")
+        self._last_review_id = 0
+        self._built: Optional[Tuple[np.ndarray, ...]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows_by_key)
+
+    def add(self, review_id: int, state: CVReviewState) -> None:
+        """Add a review's skills as a row, replacing any earlier row of the same candidate."""
+        data = state.extracted_data
+        extraction = state.stage_metrics.get("extraction")
+        if data is None or (extraction and extraction.fallback_used):
+            return
+        skills: Dict[str, Tuple[int, float]] = {}
+        for skill in data.skills:
+            name = canonical_skill(skill.name)
+            if not name:
+                continue
+            years = float(skill.years_experience or 0)
+            level = level_rank(skill.level, skill.years_experience)
+            # A skill listed twice keeps its highest level and years
+            previous_level, previous_years = skills.get(name, (0, 0.0))
+            skills[name] = (max(level, previous_level), max(years, previous_years))
+
+        key = candidate_key(state)
+        with self._lock:
+            if key in self._rows_by_key:
+                self._alive[self._rows_by_key[key]] = 0
+            row = len(self._candidates)
+            self._candidates.append(_Candidate(review_id, state))
+            self._rows_by_key[key] = row
+            self._alive.append(1)
+            for name, (level, years) in skills.items():
+                self._cell_rows.append(row)
+                self._cell_columns.append(self._skills.setdefault(name, len(self._skills)))
+                self._cell_levels.append(level)
+                self._cell_years.append(years)
+            self._built = None
+
+    def refresh(self, store: ReviewStore, batch_size: int = 500) -> int:
+        """Add the reviews stored since the last refresh and return how many were read."""
+        read = 0
+        with self._lock:
+            while True:
+                rows = store.reviews_after(self._last_review_id, batch_size)
+                for review_id, _, state in rows:
+                    self.add(review_id, state)
+                    self._last_review_id = review_id
+                read += len(rows)
+                if len(rows) < batch_size:
+                    return read
+
+    def _arrays(self) -> Tuple[np.ndarray, ...]:
+        """Column offsets, cell rows, levels and years sorted by column, and the live-row mask."""
+        if self._built is None:
+            # Copies, so the arrays stay free to grow
+            columns = np.array(self._cell_columns, dtype=np.int64)
+            order = np.argsort(columns, kind="stable")
+            offsets = np.searchsorted(columns[order], np.arange(len(self._skills) + 1))
+            rows = np.array(self._cell_rows, dtype=np.int64)[order]
+            levels = np.array(self._cell_levels, dtype=np.int8)[order]
+            years = np.array(self._cell_years, dtype=np.float32)[order]
+            alive = np.array(self._alive, dtype=bool)
+            self._built = (offsets, rows, levels, years, alive)
+        return self._built
+
+    def _column(self, skill: str, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Dense present, level and years vectors of one skill over every row."""
+        present = np.zeros(count, dtype=bool)
+        levels = np.zeros(count, dtype=np.int8)
+        years = np.zeros(count, dtype=np.float32)
+        column = self._skills.get(canonical_skill(skill))
+        if column is not None:
+            offsets, rows, cell_levels, cell_years, _ = self._arrays()
+            cells = slice(offsets[column], offsets[column + 1])
+            present[rows[cells]] = True
+            levels[rows[cells]] = cell_levels[cells]
+            years[rows[cells]] = cell_years[cells]
+        return present, levels, years
+
+    def search(self, requirements: List[SkillRequirement], top_k: int = 50, require_all: bool = False) -> List[SkillMatch]:
+        """Rank candidates by the weighted share of requirements they meet.
+
+        A requirement is met when the candidate lists the skill at or above
+        its minimum level and years. Equal scores are ranked by strength: the
+        weighted sum of each required skill's level and capped years, both
+        scaled to 0-1. With `require_all`, only candidates meeting every
+        requirement are returned.
+        """
+        if not requirements:
+            return []
+        with self._lock:
+            count = len(self._candidates)
+            if not count:
+                return []
+            alive = self._arrays()[4]
+            weights = np.array([requirement.weight for requirement in requirements], dtype=np.float32)
+            met = np.zeros((len(requirements), count), dtype=bool)
+            strength = np.zeros(count, dtype=np.float32)
+            for i, requirement in enumerate(requirements):
+                present, levels, years = self._column(requirement.skill, count)
+                met[i] = present
+                if requirement.min_level is not None:
+                    met[i] &= levels >= SKILL_LEVEL_RANKS[requirement.min_level]
+                if requirement.min_years is not None:
+                    met[i] &= years >= requirement.min_years
+                strength += weights[i] * (levels / MAX_LEVEL_RANK + np.minimum(years, MAX_STRENGTH_YEARS) / MAX_STRENGTH_YEARS)
+            score = weights @ met / weights.sum()
+
+            eligible = alive & (met.all(axis=0) if require_all else score > 0)
+            candidates = np.flatnonzero(eligible)
+            # lexsort sorts by the last key first
+            ranked = candidates[np.lexsort((-strength[candidates], -score[candidates]))[:top_k]]
+
+            labels = [self._label(requirement) for requirement in requirements]
+            matches = []
+            for row in ranked:
+                candidate = self._candidates[row]
+                matches.append(SkillMatch(
+                    review_id=candidate.review_id,
+                    candidate_name=candidate.candidate_name,
+                    candidate_email=candidate.candidate_email,
+                    file_name=candidate.file_name,
+                    score=round(float(score[row]), 4),
+                    strength=round(float(strength[row]), 4),
+                    met=[label for label, ok in zip(labels, met[:, row]) if ok],
+                    missing=[label for label, ok in zip(labels, met[:, row]) if not ok],
+                ))
+            return matches
+
+    @staticmethod
+    def _label(requirement: SkillRequirement) -> str:
+        thresholds = []
+        if requirement.min_level is not None:
+            thresholds.append(requirement.min_level.value)
+        if requirement.min_years is not None:
+            thresholds.append(f"{requirement.min_years:g}y")
+        return requirement.skill + (" >= " + " ".join(thresholds) if thresholds else "")
+
+
+_skill_matrix: Optional[SkillMatrix] = None
+_skill_matrix_lock = threading.Lock()
+
+
+def get_skill_matrix() -> Optional[SkillMatrix]:
+    """Get the process-wide skill matrix, brought up to date with the review store.
+
+    Returns None if the review store is disabled or unavailable.
+    """
+    global _skill_matrix
+    store = get_review_store()
+    if store is None:
+        return None
+    with _skill_matrix_lock:
+        if _skill_matrix is None:
+            _skill_matrix = SkillMatrix()
+    read = _skill_matrix.refresh(store)
+    if read:
+        logger.info("Skill matrix: added %d reviews, %d candidates", read, len(_skill_matrix))
+    return _skill_matrix
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, Optional
+
+from app.models import SkillLevel
+
+# Canonical skill names and the other ways CVs write them; matching ignores case,
+# punctuation spacing and trailing version numbers, so those need no entries
+SKILL_ALIASES = {
+    "python": ["python3", "python 3", "py"],
+    "javascript": ["js", "ecmascript", "es6", "es2015", "vanilla js"],
+    "typescript": ["ts"],
+    "go": ["golang", "go lang"],
+    "c++": ["cpp", "c plus plus"],
+    "c#": ["csharp", "c sharp"],
+    ".net": ["dotnet", "dot net", ".net core", "asp.net", "asp.net core"],
+    "java": ["java se", "java ee", "j2ee"],
+    "node.js": ["node", "nodejs", "node js"],
+    "react": ["react.js", "reactjs", "react js"],
+    "vue": ["vue.js", "vuejs", "vue js"],
+    "angular": ["angularjs", "angular.js"],
+    "next.js": ["nextjs", "next js"],
+    "kubernetes": ["k8s", "kube"],
+    "docker": ["docker compose", "docker-compose"],
+    "terraform": ["hashicorp terraform"],
+    "aws": ["amazon web services", "amazon aws"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "azure": ["microsoft azure"],
+    "postgresql": ["postgres", "psql", "postgre sql"],
+    "mysql": ["my sql"],
+    "mongodb": ["mongo", "mongo db"],
+    "sql server": ["mssql", "ms sql", "microsoft sql server"],
+    "elasticsearch": ["elastic search"],
+    "kafka": ["apache kafka"],
+    "spark": ["apache spark", "pyspark"],
+    "airflow": ["apache airflow"],
+    "machine learning": ["ml"],
+    "deep learning": ["dl"],
+    "natural language processing": ["nlp"],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "tensorflow": ["tensor flow"],
+    "pytorch": ["torch", "py torch"],
+    "ci/cd": ["cicd", "ci cd", "continuous integration", "continuous delivery"],
+    "linux": ["gnu/linux"],
+    "rest": ["rest api", "rest apis", "restful", "restful apis"],
+    "graphql": ["graph ql"],
+}
+
+_CANONICAL: Dict[str, str] = {}
+for _canonical, _aliases in SKILL_ALIASES.items():
+    for _alias in (_canonical, *_aliases):
+        _CANONICAL[" ".join(_alias.split())] = _canonical
+
+# "Python 3.11", "Java 17", "Angular v15", "Vue 3.x"
+_VERSION_RE = re.compile(r"\s+v?\d+(?:\.(?:\d+|x))*\+?$")
+_PARENTHESIS_RE = re.compile(r"\s*\([^)]*\)")
+
+SKILL_LEVEL_RANKS = {SkillLevel.BEGINNER: 1, SkillLevel.INTERMEDIATE: 2, SkillLevel.ADVANCED: 3, SkillLevel.EXPERT: 4}
+
+
+def canonical_skill(name: Optional[str]) -> str:
+    """The canonical name of a skill: alias-resolved, lowercase and without version."""
+    key = " ".join(_PARENTHESIS_RE.sub("", (name or "").lower()).split())
+    if key in _CANONICAL:
+        return _CANONICAL[key]
+    unversioned = _VERSION_RE.sub("", key)
+    return _CANONICAL.get(unversioned, unversioned)
+
+
+def level_rank(level: Optional[SkillLevel], years: Optional[float] = None) -> int:
+    """A skill level as 1 (beginner) to 4 (expert), inferred from years of use when unrated.
+
+    A listed skill with neither counts as beginner.
+    """
+    if level is not None:
+        return SKILL_LEVEL_RANKS[level]
+    if years is None or years < 1:
+        return 1
+    if years < 3:
+        return 2
+    if years < 6:
+        return 3
+    return 4
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from app.utils.cache import (
+    CACHE_DIR,
+    CACHE_ENABLED,
+    CACHE_MAX_DISK_MB,
+    CACHE_MEMORY_ITEMS,
+    CACHE_TTL_SECONDS,
+    DiskCache,
+    MemoryLRU,
+    TieredCache,
+    hash_key,
+)
+from app.utils.metrics import record_cache_hit
+
+logger = logging.getLogger(__name__)
+
+_PAGE_MARKER_RE = re.compile(
+    r"^[ \t]*(?:page[ \t]*)?\d{1,3}[ \t]*(?:of|/)[ \t]*\d{1,3}[ \t]*$|^[ \t]*-?[ \t]*\d{1,3}[ \t]*-?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_cv_text(text: str) -> str:
+    """Normalize CV text so format-only differences (PDF vs DOCX) share a key."""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\f", "\n")
+    text = _PAGE_MARKER_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+def canonical_json(model: BaseModel) -> str:
+    """Serialize a model deterministically, ignoring the raw CV text."""
+    data = model.model_dump(mode="json", exclude={"raw_text"})
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+class StageCacheStats:
+    """Hit and miss counters for one stage."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_lock = threading.Lock()
+_stage_tiers: Dict[str, TieredCache] = {}
+_stage_stats: Dict[str, StageCacheStats] = {}
+
+
+def _get_stage_tier(stage: str) -> TieredCache:
+    """The process-wide cache of one stage.
+
+    Entries are keyed on the prompt fingerprint, so processes with different
+    prompts or models share the directory without clearing each other's
+    entries; stale ones age out through the size and TTL limits.
+    """
+    with _lock:
+        tier = _stage_tiers.get(stage)
+        if tier is None:
+            tier = TieredCache(
+                MemoryLRU(CACHE_MEMORY_ITEMS * 4, CACHE_TTL_SECONDS),
+                DiskCache(
+                    os.path.join(CACHE_DIR, "stages", stage),
+                    CACHE_MAX_DISK_MB * 1024 * 1024,
+                    CACHE_TTL_SECONDS,
+                ),
+            )
+            _stage_tiers[stage] = tier
+        return tier
+
+
+def get_stage_cache_stats() -> Dict[str, dict]:
+    """Get hit/miss statistics for every stage memo in this process."""
+    return {stage: stats.as_dict() for stage, stats in _stage_stats.items()}
+
+
+class StageMemo:
+    """Memoizes one agent stage, keyed on its prompt fingerprint and normalized inputs."""
+
+    def __init__(self, stage: str, fingerprint: str, output_model: Type[BaseModel]):
+        self.stage = stage
+        self.fingerprint = fingerprint
+        self.output_model = output_model
+        self.cache = _get_stage_tier(stage) if CACHE_ENABLED else None
+        self.stats = _stage_stats.setdefault(stage, StageCacheStats())
+
+    def key(self, *parts: str) -> str:
+        return hash_key(self.fingerprint, *parts)
+
+    def get(self, key: str) -> Optional[BaseModel]:
+        if self.cache is None:
+            return None
+        value = self.cache.get(key)
+        if value is not None:
+            try:
+                result = self.output_model.model_validate_json(value)
+                self.stats.record(hit=True)
+                record_cache_hit()
+                return result
+            except Exception as e:
+                logger.warning("Ignoring unreadable %s cache entry: %s", self.stage, e)
+        self.stats.record(hit=False)
+        return None
+
+    def set(self, key: str, value) -> BaseModel:
+        """Validate and store a stage result, returning it as a model."""
+        result = self.output_model.model_validate(value)
+        if self.cache is not None:
+            try:
+                self.cache.set(key, result.model_dump_json())
+            except Exception as e:
+                logger.warning("Could not cache %s result: %s", self.stage, e)
+        return result
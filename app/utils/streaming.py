@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+_partial_listener: ContextVar[Optional[Callable[[dict], None]]] = ContextVar("partial_listener", default=None)
+
+
+@contextmanager
+def partial_output_listener(listener: Callable[[dict], None]):
+    """Receive the partial outputs agents emit while this context is active."""
+    token = _partial_listener.set(listener)
+    try:
+        yield
+    finally:
+        _partial_listener.reset(token)
+
+
+def emit_partial(partial: Any) -> None:
+    """Forward a partially parsed stage output to the active listener, if any."""
+    listener = _partial_listener.get()
+    if listener is not None and isinstance(partial, dict):
+        listener(partial)
+
+
+async def astream_with_partials(chain, inputs: dict) -> Any:
+    """Stream a chain ending in a structured-output parser, emitting each partial object.
+
+    Returns the last (complete) parsed output, like `ainvoke` would.
+    """
+    result = None
+    async for partial in chain.astream(inputs):
+        emit_partial(partial)
+        result = partial
+    return result
@@ -0,0 +1,36 @@
+from typing import Iterable, List, Type
+
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from pydantic import BaseModel
+
+
+def output_tool(name: str, description: str, output_model: Type[BaseModel], exclude: Iterable[str] = ()) -> dict:
+    """An Anthropic tool whose input schema is the output model's.
+
+    Forcing the model to call it makes the API return the output as
+    schema-shaped tool input instead of free text, with no format
+    instructions in the prompt. Fields in `exclude` are filled in by the
+    agent rather than the model.
+    """
+    schema = output_model.model_json_schema()
+    for field in exclude:
+        schema["properties"].pop(field, None)
+        if field in schema.get("required", []):
+            schema["required"] = [required for required in schema["required"] if required != field]
+    return {"name": name, "description": description, "input_schema": schema}
+
+
+def tool_call_params(tool: dict) -> dict:
+    """Messages API parameters that make the model answer by calling `tool`."""
+    return {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}}
+
+
+def structured_output_chain(prompt, llm, tool: dict, callbacks: List):
+    """Chain the prompt to the model, forced to call `tool`, and return the tool's input.
+
+    While the call streams, the parser emits the partially parsed input as
+    a dict, then the complete one; agents validate it into their Pydantic
+    output model.
+    """
+    parser = JsonOutputKeyToolsParser(key_name=tool["name"], first_tool_only=True)
+    return (prompt | llm.bind(**tool_call_params(tool)) | parser).with_config(callbacks=callbacks)
@@ -0,0 +1,110 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.utils.metrics import record_usage
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUsage:
+    """Token counters for one stage, including prompt cache reads and writes."""
+
+    def __init__(self):
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, usage: dict) -> None:
+        details = usage.get("input_token_details") or {}
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+            self.cache_read_tokens += details.get("cache_read") or 0
+            self.cache_creation_tokens += details.get("cache_creation") or 0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_creation_tokens": self.cache_creation_tokens,
+            "cache_hit_rate": self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0,
+        }
+
+
+_lock = threading.Lock()
+_stage_usage: Dict[str, TokenUsage] = {}
+
+
+def _usage_for(stage: str) -> TokenUsage:
+    with _lock:
+        if stage not in _stage_usage:
+            _stage_usage[stage] = TokenUsage()
+        return _stage_usage[stage]
+
+
+def get_usage_stats() -> Dict[str, dict]:
+    """Token usage per stage since the process started."""
+    with _lock:
+        return {stage: usage.as_dict() for stage, usage in _stage_usage.items()}
+
+
+def usage_from_result(response: Any) -> list:
+    """Usage metadata of every message in an LLMResult."""
+    usages = []
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                usages.append(dict(usage))
+    return usages
+
+
+def record_call_usage(stage: str, usage: dict, model: Optional[str] = None, batch: bool = False) -> None:
+    """Record and log the token usage of one model call made by a stage."""
+    _usage_for(stage).record(usage)
+    record_usage(usage, model, batch)
+    details = usage.get("input_token_details") or {}
+    logger.info(
+        "stage=%s model=%s batch=%s input_tokens=%d output_tokens=%d cache_read_tokens=%d cache_creation_tokens=%d",
+        stage,
+        model,
+        str(batch).lower(),
+        usage.get("input_tokens", 0),
+        usage.get("output_tokens", 0),
+        details.get("cache_read") or 0,
+        details.get("cache_creation") or 0,
+    )
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Record and log the token usage of every model call made by a stage."""
+
+    # Run in the caller's context so usage lands on the stage that made the call
+    run_inline = True
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._models: Dict[UUID, Optional[str]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, invocation_params: Optional[dict] = None, **kwargs: Any) -> None:
+        # Remember which model serves the call, so tiered stages are costed per model
+        self._models[run_id] = (invocation_params or {}).get("model")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._models.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        model = self._models.pop(run_id, None)
+        for usage in usage_from_result(response):
+            record_call_usage(self.stage, usage, model)
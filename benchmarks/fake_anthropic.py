@@ -0,0 +1,273 @@
+"""A local stand-in for the Anthropic Messages API with real rate limiting.
+
+Serves POST /v1/messages (plain and streamed) from a background thread and
+enforces a requests-per-minute and an input-tokens-per-minute token bucket.
+Over-quota requests get a 429 with `retry-after` and `anthropic-ratelimit-*`
+headers shaped like the real API's, so client-side limiting and backoff can
+be exercised without network access or cost.
+
+Requests that force a tool call get the response text back as the tool's
+input, parsed as JSON. The Message Batches endpoints are served too: a batch
+ends `batch_latency` seconds after it is created, and its results are
+streamed as JSONL. Like the real API, batches don't count against the
+per-minute limits.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+
+class _Bucket:
+    def __init__(self, limit: int, burst: Optional[int] = None):
+        self.limit = limit
+        self.capacity = burst or limit
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def try_take(self, amount: float) -> bool:
+        if not self.limit:
+            return True
+        self._refill()
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+    def seconds_until(self, amount: float) -> float:
+        return max(0.0, (amount - self.tokens) * 60 / self.limit) if self.limit else 0.0
+
+
+class FakeAnthropicServer:
+    """Rate-limited fake of the Messages API. Use as a context manager."""
+
+    def __init__(self, rpm: int = 0, input_tpm: int = 0, burst_requests: Optional[int] = None,
+                 latency: float = 0.0, response_text: str = '{"ok": true}', port: int = 0,
+                 respond: Optional[Callable[[dict], str]] = None, batch_latency: float = 0.0):
+        """`respond` maps a request's parameters to the response text; it defaults to `response_text`."""
+        self.requests = _Bucket(rpm, burst_requests)
+        self.input_tokens = _Bucket(input_tpm)
+        self.latency = latency
+        self.response_text = response_text
+        self.respond = respond or (lambda payload: self.response_text)
+        self.batch_latency = batch_latency
+        self.accepted = 0
+        self.rejected = 0
+        self.batches: Dict[str, dict] = {}
+        self.batch_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeAnthropicServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self, input_tokens: int) -> Optional[dict]:
+        """Take quota for a request, or return the headers of a 429 response."""
+        with self._lock:
+            if self.requests.try_take(1):
+                if self.input_tokens.try_take(input_tokens):
+                    self.accepted += 1
+                    return None
+                self.requests.tokens += 1  # the request itself was not used
+            self.rejected += 1
+            wait = max(self.requests.seconds_until(1), self.input_tokens.seconds_until(input_tokens))
+            reset = datetime.fromtimestamp(time.time() + wait, timezone.utc).isoformat().replace("+00:00", "Z")
+            headers = {"retry-after": str(max(1, math.ceil(wait)))}
+            for name, bucket in (("requests", self.requests), ("input-tokens", self.input_tokens)):
+                if bucket.limit:
+                    headers[f"anthropic-ratelimit-{name}-limit"] = str(bucket.limit)
+                    headers[f"anthropic-ratelimit-{name}-remaining"] = str(max(0, int(bucket.tokens)))
+                    headers[f"anthropic-ratelimit-{name}-reset"] = reset
+            return headers
+
+    @staticmethod
+    def _input_tokens(payload: dict) -> int:
+        return len(json.dumps(payload.get("messages", []))) // 4 + len(json.dumps(payload.get("system", ""))) // 4
+
+    @staticmethod
+    def _forced_tool(payload: dict) -> Optional[str]:
+        tool_choice = payload.get("tool_choice") or {}
+        return tool_choice.get("name") if tool_choice.get("type") == "tool" else None
+
+    def _message(self, payload: dict, text: str) -> dict:
+        tool = self._forced_tool(payload)
+        if tool:
+            content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": tool, "input": json.loads(text)}]
+        else:
+            content = [{"type": "text", "text": text}]
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "fake"),
+            "content": content,
+            "stop_reason": "tool_use" if tool else "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": self._input_tokens(payload), "output_tokens": max(1, len(text) // 4)},
+        }
+
+    def _create_batch(self, requests: list) -> dict:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        now = time.time()
+        with self._lock:
+            self.batch_requests += len(requests)
+            self.batches[batch_id] = {
+                "requests": requests,
+                "created_at": now,
+                "ends_at": now + self.batch_latency,
+                "canceled": False,
+            }
+        return self._batch_object(batch_id)
+
+    def _batch_object(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        ended = batch["canceled"] or time.time() >= batch["ends_at"]
+        count = len(batch["requests"])
+
+        def iso(timestamp: float) -> str:
+            return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended and not batch["canceled"] else 0,
+                "errored": 0,
+                "canceled": count if batch["canceled"] else 0,
+                "expired": 0,
+            },
+            "created_at": iso(batch["created_at"]),
+            "expires_at": iso(batch["created_at"] + 24 * 3600),
+            "ended_at": iso(min(time.time(), batch["ends_at"])) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def _batch_results(self, batch_id: str) -> bytes:
+        batch = self.batches[batch_id]
+        lines = []
+        for request in batch["requests"]:
+            if batch["canceled"]:
+                result = {"type": "canceled"}
+            else:
+                result = {"type": "succeeded", "message": self._message(request["params"], self.respond(request["params"]))}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}))
+        return ("\n".join(lines) + "\n").encode()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[:3] == ["v1", "messages", "batches"] and len(parts) >= 4 and parts[3] in server.batches:
+                    if len(parts) == 5 and parts[4] == "results":
+                        body = server._batch_results(parts[3])
+                        self.send_response(200)
+                        self.send_header("content-type", "application/binary")
+                        self.send_header("content-length", str(len(body)))
+                        self.end_headers()
+                        self.wfile.write(body)
+                    else:
+                        self._send_json(200, server._batch_object(parts[3]))
+                elif self.path.startswith("/v1/models"):
+                    self._send_json(200, {"data": [], "has_more": False, "first_id": None, "last_id": None})
+                else:
+                    self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts == ["v1", "messages", "batches"]:
+                    self._send_json(200, server._create_batch(payload["requests"]))
+                    return
+                if parts[:3] == ["v1", "messages", "batches"] and parts[-1] == "cancel" and parts[3] in server.batches:
+                    server.batches[parts[3]]["canceled"] = True
+                    self._send_json(200, server._batch_object(parts[3]))
+                    return
+                if not self.path.startswith("/v1/messages"):
+                    self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                    return
+                input_tokens = server._input_tokens(payload)
+                rejection = server._admit(input_tokens)
+                if rejection is not None:
+                    self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}}, rejection)
+                    return
+                time.sleep(server.latency)
+                text = server.respond(payload)
+                message = server._message(payload, text)
+                if payload.get("stream"):
+                    output_tokens = message["usage"]["output_tokens"]
+                    block = dict(message["content"][0])
+                    message.update(content=[], stop_reason=None, usage={"input_tokens": input_tokens, "output_tokens": 1})
+                    self._stream(message, block, text, output_tokens)
+                else:
+                    self._send_json(200, message)
+
+            def _stream(self, message: dict, block: dict, text: str, output_tokens: int) -> None:
+                if block["type"] == "tool_use":
+                    block["input"] = {}
+                    delta = lambda piece: {"type": "input_json_delta", "partial_json": piece}
+                    stop_reason = "tool_use"
+                else:
+                    block["text"] = ""
+                    delta = lambda piece: {"type": "text_delta", "text": piece}
+                    stop_reason = "end_turn"
+                events = [
+                    ("message_start", {"type": "message_start", "message": message}),
+                    ("content_block_start", {"type": "content_block_start", "index": 0, "content_block": block}),
+                    *(
+                        ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": delta(text[i:i + 20])})
+                        for i in range(0, len(text), 20)
+                    ),
+                    ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                    ("message_delta", {"type": "message_delta", "delta": {"stop_reason": stop_reason, "stop_sequence": None}, "usage": {"input_tokens": message["usage"]["input_tokens"], "output_tokens": output_tokens}}),
+                    ("message_stop", {"type": "message_stop"}),
+                ]
+                body = "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events).encode()
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,135 @@
+"""Run bulk reviews through Message Batches against a local stand-in of the API.
+
+Reviews a set of synthetic CVs twice against FakeAnthropicServer: once as
+interactive calls through CVReviewWorkflow with bounded concurrency, and once
+stage by stage through MessageBatchReviewWorkflow. Reports completed reviews,
+model calls or batches, wall time and the estimated cost of each mode. The
+fake ends every batch after --batch-latency seconds, so the batch wall time
+here says nothing about the real API; the cost and call counts do.
+
+    python -m benchmarks.message_batches --cvs 50 --rpm 600
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import time
+
+# Every review must reach the model, and batches are polled quickly against the fake
+os.environ["CV_CACHE_ENABLED"] = "false"
+os.environ["CV_REVIEW_STORE_ENABLED"] = "false"
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark-placeholder")
+os.environ.setdefault("ANTHROPIC_BATCH_POLL_SECONDS", "0.2")
+
+from app.agents.analysis_agent import AnalysisAgent
+from app.agents.extraction_agent import ExtractionAgent
+from app.agents.feedback_agent import FeedbackAgent
+from app.agents.recommendation_agent import RecommendationAgent
+from app.agents.registry import install_agents
+from app.graph.batch_workflow import MessageBatchReviewWorkflow
+from app.graph.workflow import CVReviewWorkflow
+from app.models import ProcessingStatus
+from app.utils.llm_config import GovernedChatAnthropic, get_stage_model_config
+from app.utils.rate_limit import RateGovernor
+from benchmarks.fake_anthropic import FakeAnthropicServer
+from benchmarks.stub_llm import CANNED_RESPONSES
+from benchmarks.synthetic import make_txt
+
+# Phrases of each agent's system prompt, to answer with the matching canned output
+STAGE_MARKERS = {
+    "expert CV parser": "extraction",
+    "expert CV analyst": "analysis",
+    "expert career coach": "feedback",
+    "career development consultant": "recommendation",
+}
+
+
+def respond(params: dict) -> str:
+    system = json.dumps(params.get("system", ""))
+    for marker, stage in STAGE_MARKERS.items():
+        if marker in system:
+            return json.dumps(CANNED_RESPONSES[stage])
+    return "{}"
+
+
+def _llm(stage: str, url: str, governor: RateGovernor) -> GovernedChatAnthropic:
+    config = get_stage_model_config(stage)
+    return GovernedChatAnthropic(
+        model=config.model, max_tokens=config.max_tokens, temperature=config.temperature,
+        anthropic_api_key="fake", anthropic_api_url=url, max_retries=0, governor=governor,
+    )
+
+
+def _install_agents(url: str, rpm: int) -> None:
+    governor = RateGovernor(rpm=rpm)
+    install_agents(
+        ExtractionAgent(_llm("extraction", url, governor), _llm("extraction_fast", url, governor)),
+        AnalysisAgent(_llm("analysis", url, governor)),
+        FeedbackAgent(_llm("feedback", url, governor)),
+        RecommendationAgent(_llm("recommendation", url, governor)),
+    )
+
+
+def _cv_files(count: int) -> list:
+    files = []
+    for seed in range(count):
+        cv_file = io.BytesIO(make_txt(120, seed))
+        cv_file.name = f"cv-{seed}.txt"
+        files.append(cv_file)
+    return files
+
+
+async def _interactive(count: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def review(cv_file):
+        async with semaphore:
+            async for state in CVReviewWorkflow(cv_file).run_async():
+                pass
+            return state
+
+    return await asyncio.gather(*(review(cv_file) for cv_file in _cv_files(count)))
+
+
+async def _batched(count: int) -> list:
+    return await MessageBatchReviewWorkflow(_cv_files(count)).run()
+
+
+def _report(label: str, states: list, elapsed: float, calls: int) -> None:
+    completed = sum(1 for state in states if state.processing_status == ProcessingStatus.COMPLETED and not state.errors)
+    fallbacks = sum(1 for state in states for metrics in state.stage_metrics.values() if metrics.fallback_used)
+    cost = sum(metrics.cost_usd for state in states for metrics in state.stage_metrics.values())
+    print(f"{label:<18} completed {completed:>4}/{len(states)} | fallbacks {fallbacks:>3} | "
+          f"{calls:>5} {'batches' if label == 'message batches' else 'calls':<7} | {elapsed:6.1f}s | cost ${cost:.4f}")
+
+
+async def _compare(server: FakeAnthropicServer, args) -> None:
+    started = time.perf_counter()
+    states = await _interactive(args.cvs, args.concurrency)
+    _report("interactive", states, time.perf_counter() - started, server.accepted)
+
+    started = time.perf_counter()
+    states = await _batched(args.cvs)
+    _report("message batches", states, time.perf_counter() - started, len(server.batches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cvs", type=int, default=50)
+    parser.add_argument("--rpm", type=int, default=600, help="Interactive requests per minute the fake server allows")
+    parser.add_argument("--concurrency", type=int, default=8, help="Interactive reviews in flight")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds the fake server takes per interactive call")
+    parser.add_argument("--batch-latency", type=float, default=1.0, help="Seconds until the fake server ends a batch")
+    args = parser.parse_args()
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    with FakeAnthropicServer(rpm=args.rpm, latency=args.latency, respond=respond, batch_latency=args.batch_latency) as server:
+        _install_agents(server.base_url, args.rpm)
+        # One event loop for both runs: the agents' pooled clients are bound to it
+        asyncio.run(_compare(server, args))
+
+
+if __name__ == "__main__":
+    main()
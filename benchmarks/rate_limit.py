@@ -0,0 +1,74 @@
+"""Exercise the rate governor against a local rate-limited fake of the API.
+
+Fires a burst of concurrent model calls at FakeAnthropicServer three ways:
+through a plain ChatAnthropic with the SDK's default retries, through the
+governor with no configured limits (it learns them from the first 429), and
+through the governor configured with the quota. Reports completed and failed
+calls, 429 responses and throughput relative to the quota.
+
+    python -m benchmarks.rate_limit --calls 200 --rpm 1200 --burst 10
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from langchain_anthropic import ChatAnthropic
+
+from app.utils.llm_config import GovernedChatAnthropic
+from app.utils.rate_limit import RateGovernor
+from benchmarks.fake_anthropic import FakeAnthropicServer
+
+
+async def _fire(llm, calls: int, stream: bool) -> tuple:
+    async def call(i: int) -> bool:
+        messages = [("human", f"Review CV number {i}")]
+        try:
+            if stream:
+                async for _ in llm.astream(messages):
+                    pass
+            else:
+                await llm.ainvoke(messages)
+            return True
+        except Exception:
+            return False
+
+    results = await asyncio.gather(*(call(i) for i in range(calls)))
+    return sum(results), calls - sum(results)
+
+
+def _run(label: str, make_llm, args) -> None:
+    with FakeAnthropicServer(rpm=args.rpm, burst_requests=args.burst, latency=args.latency) as server:
+        llm = make_llm(server.base_url)
+        started = time.perf_counter()
+        ok, failed = asyncio.run(_fire(llm, args.calls, args.stream))
+        elapsed = time.perf_counter() - started
+    # The best possible time: the burst goes at once, the rest at the refill rate
+    ideal = max(0.0, (args.calls - args.burst) * 60 / args.rpm) + args.latency
+    print(
+        f"{label:<28} ok {ok:>4} | failed {failed:>4} | 429s {server.rejected:>5} | "
+        f"{elapsed:6.1f}s (ideal {ideal:.1f}s) | {ok / elapsed * 60:7.0f} rpm of {args.rpm}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--rpm", type=int, default=1200, help="Requests per minute the fake server allows")
+    parser.add_argument("--burst", type=int, default=10, help="Requests the fake server allows at once")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds the fake server takes per call")
+    parser.add_argument("--stream", action="store_true", help="Stream responses like the review workflow does")
+    args = parser.parse_args()
+    # Retries are expected here; keep the per-retry warnings out of the report
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    common = {"model": "claude-fake", "anthropic_api_key": "fake", "max_tokens": 100}
+    _run("unmanaged (SDK retries)", lambda url: ChatAnthropic(anthropic_api_url=url, **common), args)
+    _run("governor, learned limits", lambda url: GovernedChatAnthropic(
+        anthropic_api_url=url, max_retries=0, governor=RateGovernor(), **common), args)
+    _run("governor, configured", lambda url: GovernedChatAnthropic(
+        anthropic_api_url=url, max_retries=0, governor=RateGovernor(rpm=args.rpm, burst_requests=args.burst), **common), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Offline benchmark suite for file processing and workflow overhead.
+
+Times text extraction from synthetic PDF, DOCX and TXT CVs of several sizes,
+and full reviews through CVReviewWorkflow with stub models that answer after
+a fixed delay, so the workflow numbers measure our own overhead (state
+copies, graph scheduling, serialization). Caches are disabled and nothing
+touches the network. Results are written as JSON; pass an earlier results
+file with --compare to see the change per benchmark.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --output bench.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+# Every run must do the full work, so caches stay off for the whole suite
+os.environ["CV_CACHE_ENABLED"] = "false"
+os.environ["CV_REVIEW_STORE_ENABLED"] = "false"
+os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark-placeholder")
+
+SIZES = {"small": 60, "medium": 300, "large": 1500}
+LINES_PER_PDF_PAGE = 50
+
+
+def _summarize(timings: List[float]) -> dict:
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[max(0, int(len(ordered) * 0.95 + 0.5) - 1)] * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+    }
+
+
+def _time(function: Callable[[], object], repeat: int) -> List[float]:
+    function()  # warm-up run, e.g. imports and pool start
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _named_file(data: bytes, name: str) -> io.BytesIO:
+    cv_file = io.BytesIO(data)
+    cv_file.name = name
+    cv_file.size = len(data)
+    return cv_file
+
+
+def bench_file_processing(repeat: int) -> List[dict]:
+    from app.utils.file_processor import (
+        extract_text_from_docx,
+        extract_text_from_pdf,
+        extract_text_from_txt,
+        process_uploaded_file,
+    )
+    from benchmarks.synthetic import make_docx, make_pdf, make_txt
+
+    formats = {
+        "pdf": (lambda lines: make_pdf(max(1, lines // LINES_PER_PDF_PAGE), LINES_PER_PDF_PAGE), extract_text_from_pdf),
+        "docx": (make_docx, extract_text_from_docx),
+        "txt": (make_txt, extract_text_from_txt),
+    }
+    results = []
+    for extension, (make, extract) in formats.items():
+        for size, lines in SIZES.items():
+            data = make(lines)
+            name = f"cv.{extension}"
+            for function_name, function in (
+                (extract.__name__, lambda: extract(io.BytesIO(data))),
+                ("process_uploaded_file", lambda: process_uploaded_file(_named_file(data, name))),
+            ):
+                results.append({
+                    "benchmark": f"{function_name}[{extension}-{size}]",
+                    "bytes": len(data),
+                    **_summarize(_time(function, repeat)),
+                })
+    return results
+
+
+async def _review(data: bytes, parallel: bool) -> tuple:
+    from app.graph.workflow import CVReviewWorkflow
+    from app.models import ProcessingStatus
+
+    started = time.perf_counter()
+    workflow = CVReviewWorkflow(_named_file(data, "cv.txt"), parallel=parallel)
+    updates = 0
+    async for state in workflow.run_async():
+        updates += 1
+    if state.processing_status != ProcessingStatus.COMPLETED:
+        raise RuntimeError(f"Review did not complete: {state.errors}")
+    return time.perf_counter() - started, updates
+
+
+async def _bench_workflow(reviews: int, delay: float) -> List[dict]:
+    from benchmarks.synthetic import make_txt
+
+    data = make_txt(SIZES["medium"])
+    results = []
+    for parallel in (False, True):
+        await _review(data, parallel)  # warm-up: graph compilation, schema generation
+        timings, updates = [], 0
+        for _ in range(reviews):
+            elapsed, updates = await _review(data, parallel)
+            timings.append(elapsed)
+        # Four sequential model calls; the parallel graph overlaps two of them
+        model_seconds = delay * (3 if parallel else 4)
+        overhead = [elapsed - model_seconds for elapsed in timings]
+        mode = "parallel" if parallel else "sequential"
+        results.append({
+            "benchmark": f"workflow[{mode}]",
+            "stub_delay_s": delay,
+            "state_updates": updates,
+            **_summarize(timings),
+            "overhead_median_ms": round(statistics.median(overhead) * 1000, 3),
+        })
+    return results
+
+
+def bench_workflow(reviews: int, delay: float) -> List[dict]:
+    from benchmarks.stub_llm import install_stub_agents
+
+    install_stub_agents(delay)
+    return asyncio.run(_bench_workflow(reviews, delay))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline: List[dict]) -> None:
+    """Print the change in median time against a baseline results file."""
+    previous = {result["benchmark"]: result for result in baseline}
+    print(f"\n{'benchmark':<42} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for result in results:
+        before = previous.get(result["benchmark"])
+        if before is None or not before["median_ms"]:
+            continue
+        change = (result["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+        print(f"{result['benchmark']:<42} {before['median_ms']:>12.2f} {result['median_ms']:>12.2f} {change:>+7.1f}%")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON file to write results to")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per file-processing benchmark")
+    parser.add_argument("--reviews", type=int, default=10, help="Reviews per workflow benchmark")
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub model delay per call in seconds")
+    parser.add_argument("--skip-workflow", action="store_true", help="Only run the file-processing benchmarks")
+    args = parser.parse_args(argv)
+
+    results = bench_file_processing(args.repeat)
+    if not args.skip_workflow:
+        results.extend(bench_workflow(args.reviews, args.delay))
+
+    for result in results:
+        print(f"{result['benchmark']:<42} median {result['median_ms']:>9.2f} ms | p95 {result['p95_ms']:>9.2f} ms")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f)["results"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
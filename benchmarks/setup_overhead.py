@@ -0,0 +1,46 @@
+"""Measure per-review setup overhead of CVReviewWorkflow.
+
+Compares building fresh agents and clients for every review (the old
+behaviour) with reusing the process-wide shared agents. No API calls are made.
+
+    python -m benchmarks.setup_overhead --reviews 20
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+
+
+def _measure(reviews: int, shared_agents: bool) -> list:
+    from app.graph.workflow import CVReviewWorkflow
+
+    timings = []
+    for _ in range(reviews):
+        cv_file = io.BytesIO(b"Jane Doe\nSoftware Engineer")
+        cv_file.name = "cv.txt"
+        started = time.perf_counter()
+        CVReviewWorkflow(cv_file, shared_agents=shared_agents)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=20, help="Number of workflows to build per mode")
+    args = parser.parse_args()
+
+    # Building clients needs a key but never contacts the API
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark-placeholder")
+
+    for label, shared_agents in (("fresh agents", False), ("shared agents", True)):
+        timings = _measure(args.reviews, shared_agents)
+        print(
+            f"{label:>14}: first {timings[0]:8.2f} ms | "
+            f"median {statistics.median(timings):8.2f} ms | "
+            f"max {max(timings):8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""A local stand-in for the Anthropic chat model.
+
+Returns canned JSON for each stage after a fixed delay, streamed in small
+chunks like the real API, so a full review can run with no network and the
+remaining time is our own overhead. When the request forces a tool call, as
+the agents' requests do, the JSON comes back as the tool's input.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CANNED_RESPONSES = {
+    "extraction": {
+        "name": "Jane Doe",
+        "email": "jane.doe@example.com",
+        "location": "Berlin, Germany",
+        "summary": "Engineer with a track record of shipping reliable distributed systems.",
+        "experience": [
+            {
+                "company": "Acme Corp",
+                "position": "Senior Software Engineer",
+                "start_date": "2020",
+                "end_date": "2024",
+                "description": "Led the migration of the billing platform to event-driven services.",
+                "achievements": ["Reduced p95 latency by 40%", "Mentored four engineers"],
+            },
+            {
+                "company": "Globex",
+                "position": "Software Engineer",
+                "start_date": "2016",
+                "end_date": "2020",
+                "description": "Built data pipelines and internal tooling.",
+                "achievements": ["Cut infrastructure cost by 25%"],
+            },
+        ],
+        "education": [{"institution": "Technical University of Munich", "degree": "BSc", "field_of_study": "Computer Science"}],
+        "skills": [
+            {"name": "Python", "level": "expert", "years_experience": 8},
+            {"name": "Kubernetes", "level": "advanced", "years_experience": 4},
+            {"name": "PostgreSQL", "level": "advanced", "years_experience": 6},
+        ],
+        "certifications": ["AWS Certified Solutions Architect"],
+        "languages": ["English", "German"],
+    },
+    "analysis": {
+        "overall_score": 78,
+        "strengths": ["Clear progression", "Quantified achievements", "Modern stack"],
+        "weaknesses": ["Thin education section", "No leadership examples before 2020"],
+        "experience_analysis": {"depth": "strong", "progression": "steady"},
+        "skills_analysis": {"relevance": "high", "gaps": ["Go", "Terraform"]},
+        "education_analysis": {"relevance": "medium"},
+        "market_alignment": {"fit": "good"},
+        "years_experience": 8,
+        "seniority_level": "senior",
+    },
+    "feedback": {
+        "general_feedback": "A strong, well-structured CV with measurable impact.",
+        "experience_feedback": "Lead each role with its biggest outcome.",
+        "skills_feedback": "Group skills by domain and drop dated tools.",
+        "education_feedback": "Add relevant coursework or a thesis topic.",
+        "presentation_feedback": "Keep it to two pages with consistent date formats.",
+        "specific_improvements": ["Add a short headline", "Quantify the Globex role", "Link to a portfolio"],
+        "positive_aspects": ["Quantified results", "Clear career progression"],
+    },
+    "recommendation": {
+        "skill_development": ["Terraform", "Go"],
+        "experience_gaps": ["People management"],
+        "career_path_suggestions": ["Staff engineer", "Engineering manager"],
+        "immediate_actions": ["Rewrite the summary", "Add metrics to every role"],
+        "long_term_goals": ["Lead a platform team"],
+        "industry_trends": ["Platform engineering", "LLM tooling"],
+    },
+}
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that answers with a canned JSON document after `delay` seconds."""
+
+    response: dict
+    delay: float = 0.0
+    chunk_chars: int = 40
+    model: str = "stub"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _text(self) -> str:
+        return json.dumps(self.response)
+
+    def _usage(self, messages: List[BaseMessage]) -> dict:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        output_tokens = len(self._text()) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _chunks(self) -> List[str]:
+        text = self._text()
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    @staticmethod
+    def _forced_tool(kwargs: dict) -> Optional[str]:
+        tool_choice = kwargs.get("tool_choice") or {}
+        return tool_choice.get("name") if tool_choice.get("type") == "tool" else None
+
+    def _message(self, messages: List[BaseMessage], kwargs: dict) -> AIMessage:
+        tool = self._forced_tool(kwargs)
+        if tool:
+            tool_call = {"name": tool, "args": self.response, "id": "toolu_stub"}
+            return AIMessage(content="", tool_calls=[tool_call], usage_metadata=self._usage(messages))
+        return AIMessage(content=self._text(), usage_metadata=self._usage(messages))
+
+    def _chunk(self, text: str, first: bool, kwargs: dict) -> ChatGenerationChunk:
+        tool = self._forced_tool(kwargs)
+        if tool:
+            tool_call_chunk = {"name": tool if first else None, "args": text, "id": "toolu_stub" if first else None, "index": 0}
+            return ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk]))
+        return ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, kwargs))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, kwargs))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        chunks = self._chunks()
+        for i, chunk in enumerate(chunks):
+            time.sleep(self.delay / len(chunks))
+            yield self._chunk(chunk, i == 0, kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        chunks = self._chunks()
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(self.delay / len(chunks))
+            yield self._chunk(chunk, i == 0, kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages)))
+
+
+def install_stub_agents(delay: float = 0.0) -> None:
+    """Replace the shared agents with agents served by stub models.
+
+    Must run before the first CVReviewWorkflow is built, since the compiled
+    graph binds the agents it was created with.
+    """
+    from app.agents.analysis_agent import AnalysisAgent
+    from app.agents.extraction_agent import ExtractionAgent
+    from app.agents.feedback_agent import FeedbackAgent
+    from app.agents.recommendation_agent import RecommendationAgent
+    from app.agents.registry import install_agents
+
+    install_agents(
+        ExtractionAgent(StubChatModel(response=CANNED_RESPONSES["extraction"], delay=delay)),
+        AnalysisAgent(StubChatModel(response=CANNED_RESPONSES["analysis"], delay=delay)),
+        FeedbackAgent(StubChatModel(response=CANNED_RESPONSES["feedback"], delay=delay)),
+        RecommendationAgent(StubChatModel(response=CANNED_RESPONSES["recommendation"], delay=delay)),
+    )
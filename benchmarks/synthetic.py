@@ -0,0 +1,101 @@
+"""Synthetic CV documents for offline benchmarks."""
+import io
+import random
+
+FIRST_NAMES = ["Jane", "John", "Amira", "Kenji", "Lucia", "Olu", "Priya", "Tomas"]
+LAST_NAMES = ["Doe", "Smith", "Haddad", "Tanaka", "Rossi", "Adeyemi", "Sharma", "Novak"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Enterprises"]
+POSITIONS = ["Software Engineer", "Senior Software Engineer", "Data Scientist", "Engineering Manager", "DevOps Engineer"]
+SKILLS = ["Python", "Kubernetes", "PostgreSQL", "React", "AWS", "Terraform", "Go", "Machine Learning", "Docker", "Kafka"]
+SENTENCE_WORDS = (
+    "designed built led migrated optimized scalable distributed services pipelines platform "
+    "reducing latency cost improving reliability throughput team customers data infrastructure "
+    "deployment monitoring architecture delivered"
+).split()
+
+
+def cv_lines(target_lines: int, seed: int = 0) -> list:
+    """Generate plausible CV text lines, repeating experience blocks to reach the target size."""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{name.lower().replace(' ', '.')}@example.com | +1 555 010 {rng.randint(1000, 9999)} | Berlin, Germany",
+        "",
+        "SUMMARY",
+        "Engineer with a track record of shipping reliable distributed systems.",
+        "",
+        "SKILLS",
+        ", ".join(rng.sample(SKILLS, 6)),
+        "",
+        "EXPERIENCE",
+    ]
+    year = 2024
+    while len(lines) < target_lines:
+        lines.append(f"{rng.choice(POSITIONS)} - {rng.choice(COMPANIES)} ({year - 2} - {year})")
+        for _ in range(4):
+            words = rng.sample(SENTENCE_WORDS, 12)
+            lines.append("- " + " ".join(words).capitalize() + ".")
+        lines.append("")
+        year -= 2
+    lines.extend(["EDUCATION", "BSc Computer Science - Technical University of Munich (2010 - 2014)"])
+    return lines
+
+
+def make_txt(target_lines: int, seed: int = 0) -> bytes:
+    return "\n".join(cv_lines(target_lines, seed)).encode("utf-8")
+
+
+def make_docx(target_lines: int, seed: int = 0) -> bytes:
+    from docx import Document
+
+    document = Document()
+    for line in cv_lines(target_lines, seed):
+        document.add_paragraph(line)
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int, lines_per_page: int = 50, seed: int = 0) -> bytes:
+    """Build a minimal multi-page text PDF without any PDF-writing dependency."""
+    lines = cv_lines(pages * lines_per_page, seed)
+    page_streams = []
+    for page in range(pages):
+        page_lines = lines[page * lines_per_page:(page + 1) * lines_per_page]
+        commands = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+        for line in page_lines:
+            commands.append(f"({_pdf_escape(line)}) Tj T*")
+        commands.append("ET")
+        page_streams.append("\n".join(commands).encode("latin-1", "replace"))
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then a page and content stream per page
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {pages} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, stream in zip(page_ids, page_streams):
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode()
+        objects[page_id + 1] = f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output += f"{object_id} 0 obj\n".encode() + objects[object_id] + b"\nendobj\n"
+    xref_offset = len(output)
+    count = len(objects) + 1
+    output += f"xref\n0 {count}\n0000000000 65535 f \n".encode()
+    for object_id in sorted(objects):
+        output += f"{offsets[object_id]:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(output)
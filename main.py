@@ -1,11 +1,18 @@
 import streamlit as st
-from app.ui.sections import render_left_section, render_right_section
+from app.ui.sections import render_history_section, render_left_section, render_right_section
 from app.utils.llm_config import validate_api_key
+from app.agents.registry import warm_up
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+@st.cache_resource(show_spinner=False)
+def warm_up_agents() -> bool:
+    """Build the shared agents and open the API connection once per process."""
+    warm_up()
+    return True
+
 
 def main():
     """Main Streamlit application."""
@@ -49,6 +56,11 @@ def main():
         st.info("Please set your ANTHROPIC_API_KEY in the .env file")
         st.stop()
 
+    warm_up_agents()
+
+    with st.sidebar:
+        render_history_section()
+
     # Main content area
     left_col, right_col = st.columns([1, 1])
     with left_col:
@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from app.batch import build_record
+from app.models import CVReviewState, ProcessingStatus, StageMetrics
+
+
+def _state(fallback_used: bool) -> CVReviewState:
+    return CVReviewState(
+        file_name="cv.txt",
+        processing_status=ProcessingStatus.COMPLETED,
+        stage_metrics={"extraction": StageMetrics(stage="extraction", started_at=0.0, fallback_used=fallback_used)},
+    )
+
+
+def test_completed_review_is_recorded_as_completed():
+    assert build_record(Path("cv.txt"), _state(False), 1.0)["status"] == "completed"
+
+
+def test_review_with_a_fallback_is_recorded_as_failed():
+    assert build_record(Path("cv.txt"), _state(True), 1.0)["status"] == "failed"
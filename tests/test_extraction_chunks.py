@@ -0,0 +1,19 @@
+import pytest
+
+from app.agents.extraction_agent import _merge_chunk_results
+
+
+def test_empty_chunk_merges_as_empty_part():
+    merged = _merge_chunk_results([{"name": "Jane Doe", "skills": [{"name": "Go"}]}, {}])
+    assert merged["name"] == "Jane Doe"
+    assert [skill["name"] for skill in merged["skills"]] == ["Go"]
+
+
+def test_failed_chunk_fails_the_merge():
+    with pytest.raises(ValueError, match="1 of 2"):
+        _merge_chunk_results([{"name": "Jane Doe"}, ValueError("timeout")])
+
+
+def test_merge_with_no_content_fails():
+    with pytest.raises(ValueError, match="no CV content"):
+        _merge_chunk_results([{}, {}])
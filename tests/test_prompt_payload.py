@@ -0,0 +1,39 @@
+from app.models import Experience, ExtractedCVData, Skill
+from app.utils.prompt_payload import MIN_TRIMMED_CHARS, compact_cv_payload, estimate_tokens
+
+
+def _cv(skills: int = 200) -> ExtractedCVData:
+    return ExtractedCVData(
+        raw_text="",
+        name="Jane Doe",
+        summary="Backend engineer building payment systems. " * 20,
+        experience=[
+            Experience(company=f"Company {i}", position="Engineer", description="Built and ran services. " * 30,
+                       achievements=["Cut latency in half across the platform. " * 5])
+            for i in range(5)
+        ],
+        skills=[Skill(name=f"Skill {i}") for i in range(skills)],
+    )
+
+
+def test_unreachable_budget_returns_trimmed_payload():
+    payload = compact_cv_payload(_cv(), token_budget=10)
+    assert estimate_tokens(payload) > 10
+    assert "…" in payload
+
+
+def test_realistic_budget_with_many_skills_terminates():
+    untrimmed = compact_cv_payload(_cv(), token_budget=None)
+    payload = compact_cv_payload(_cv(), token_budget=1000)
+    assert len(payload) < len(untrimmed)
+
+
+def test_reachable_budget_is_met():
+    untrimmed = estimate_tokens(compact_cv_payload(_cv(skills=0), token_budget=None))
+    budget = untrimmed // 2
+    assert estimate_tokens(compact_cv_payload(_cv(skills=0), token_budget=budget)) <= budget
+
+
+def test_short_fields_are_not_trimmed():
+    cv = ExtractedCVData(raw_text="", summary="x" * (MIN_TRIMMED_CHARS + 1))
+    assert "…" not in compact_cv_payload(cv, token_budget=1)